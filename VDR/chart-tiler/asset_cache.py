@@ -0,0 +1,67 @@
+"""In-memory cache for static style, sprite, glyph and dictionary assets.
+
+Files below ``server-styling/dist`` are read lazily on first request and kept
+as :class:`~tile_cache.CachedTile` entries holding the bytes, a precomputed
+``ETag`` and precompressed variants.  Each lookup only ``stat``\\ s the file;
+an entry is reloaded when its modification time or size changes so a rebuilt
+style is picked up without restarting the server.
+"""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from tile_cache import CachedTile, etag_for_bytes, precompress
+
+
+class _Entry(NamedTuple):
+    mtime_ns: int
+    size: int
+    asset: CachedTile
+
+
+class AssetCache:
+    """Map paths relative to ``root`` to cached, precompressed payloads."""
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._entries: Dict[Path, _Entry] = {}
+
+    def get(self, rel: str | Path, *, compress: bool = True) -> Optional[CachedTile]:
+        """Return the asset at ``rel`` or ``None`` if it does not exist.
+
+        ``compress`` should be ``False`` for formats that are already
+        compressed such as PNG.
+        """
+
+        path = self.root / rel
+        try:
+            st = path.stat()
+        except OSError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            return entry.asset
+        data = path.read_bytes()
+        etag = etag_for_bytes(data)
+        asset = precompress(data, etag) if compress else CachedTile(data, etag)
+        with self._lock:
+            self._entries[path] = _Entry(st.st_mtime_ns, st.st_size, asset)
+        return asset
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+__all__ = ["AssetCache"]
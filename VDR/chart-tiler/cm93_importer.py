@@ -17,6 +17,8 @@ from typing import Dict, Iterable, List
 from shapely.geometry import shape, mapping
 from shapely.affinity import translate
 
+import cm93_store
+
 
 OffsetDict = Dict[str, tuple[float, float]]
 
@@ -77,22 +79,25 @@ def stream_to_db(
     features: Iterable[Dict[str, object]],
     offsets: OffsetDict,
     conn: sqlite3.Connection,
-    *,
-    bulk: bool = False,
 ) -> None:
     """Import adjusted features into ``cm93_*`` tables.
 
-    ``conn`` must provide the required tables.  Existing rows for affected
+    The tables of :mod:`cm93_store` are created if missing (or converted
+    from the earlier WKT layout).  Geometries are stored as WKB and indexed
+    in the tables' R*Trees.  Lights go to ``cm93_lights`` only; features with
+    ``text`` also get a ``cm93_labels`` row.  Existing rows for affected
     cells are removed before insertion so re-imports replace previous data.
+    Rows are inserted in batches.
     """
 
     adjusted = apply_offsets(features, offsets)
+    cm93_store.create_schema(conn)
 
-    pts: List[tuple[int, str]] = []
-    ln: List[tuple[int, str]] = []
-    ar: List[tuple[int, str]] = []
-    labels: List[tuple[int, str, str]] = []
-    lights: List[tuple[int, str, str]] = []
+    pts: List[cm93_store.Row] = []
+    ln: List[cm93_store.Row] = []
+    ar: List[cm93_store.Row] = []
+    labels: List[cm93_store.Row] = []
+    lights: List[cm93_store.Row] = []
     cell_meta: Dict[int, Dict[str, object]] = {}
 
     for feat in adjusted:
@@ -115,47 +120,30 @@ def stream_to_db(
         b[3] = max(b[3], bbox[3])
         entry["hash"].update(json.dumps(props, sort_keys=True).encode())
 
-        wkt = geom.wkt
+        objl = str(props.get("objl") or props.get("OBJL") or "")
+        attrs = {k: v for k, v in props.items() if k not in {"cell_id", "objl", "OBJL", "text"}}
         gtype = geom.geom_type
-        if gtype in {"Point", "MultiPoint"}:
-            pts.append((cell_id, wkt))
+        if objl == "LIGHTS":
+            lights.append((cell_id, objl, geom, attrs, None))
+        elif gtype in {"Point", "MultiPoint"}:
+            pts.append((cell_id, objl, geom, attrs, None))
         elif gtype in {"LineString", "MultiLineString"}:
-            ln.append((cell_id, wkt))
+            ln.append((cell_id, objl, geom, attrs, None))
         elif gtype in {"Polygon", "MultiPolygon"}:
-            ar.append((cell_id, wkt))
+            ar.append((cell_id, objl, geom, attrs, None))
 
         text = props.get("text")
         if text:
-            labels.append((cell_id, str(text), wkt))
-        if props.get("objl") == "LIGHTS":
-            lights.append((cell_id, wkt, json.dumps(props, sort_keys=True)))
-
-    cell_ids = list(cell_meta.keys())
-    for cid in cell_ids:
-        conn.execute("DELETE FROM cm93_pts WHERE cell_id=?", (cid,))
-        conn.execute("DELETE FROM cm93_ln WHERE cell_id=?", (cid,))
-        conn.execute("DELETE FROM cm93_ar WHERE cell_id=?", (cid,))
-        conn.execute("DELETE FROM cm93_labels WHERE cell_id=?", (cid,))
-        conn.execute("DELETE FROM cm93_lights WHERE cell_id=?", (cid,))
-        conn.execute("DELETE FROM cm93_cells WHERE cell_id=?", (cid,))
-
-    if bulk:
-        conn.executemany("INSERT INTO cm93_pts(cell_id, geom) VALUES (?, ?)", pts)
-        conn.executemany("INSERT INTO cm93_ln(cell_id, geom) VALUES (?, ?)", ln)
-        conn.executemany("INSERT INTO cm93_ar(cell_id, geom) VALUES (?, ?)", ar)
-        conn.executemany("INSERT INTO cm93_labels(cell_id, text, geom) VALUES (?, ?, ?)", labels)
-        conn.executemany("INSERT INTO cm93_lights(cell_id, geom, attrs) VALUES (?, ?, ?)", lights)
-    else:
-        for row in pts:
-            conn.execute("INSERT INTO cm93_pts(cell_id, geom) VALUES (?, ?)", row)
-        for row in ln:
-            conn.execute("INSERT INTO cm93_ln(cell_id, geom) VALUES (?, ?)", row)
-        for row in ar:
-            conn.execute("INSERT INTO cm93_ar(cell_id, geom) VALUES (?, ?)", row)
-        for row in labels:
-            conn.execute("INSERT INTO cm93_labels(cell_id, text, geom) VALUES (?, ?, ?)", row)
-        for row in lights:
-            conn.execute("INSERT INTO cm93_lights(cell_id, geom, attrs) VALUES (?, ?, ?)", row)
+            labels.append((cell_id, objl, geom, {}, str(text)))
+
+    for cid in cell_meta:
+        cm93_store.delete_cell(conn, cid)
+
+    cm93_store.insert_rows(conn, "cm93_pts", pts)
+    cm93_store.insert_rows(conn, "cm93_ln", ln)
+    cm93_store.insert_rows(conn, "cm93_ar", ar)
+    cm93_store.insert_rows(conn, "cm93_labels", labels)
+    cm93_store.insert_rows(conn, "cm93_lights", lights)
 
     for cid, meta in cell_meta.items():
         bbox_str = ",".join(str(v) for v in meta["bbox"])
@@ -173,7 +161,6 @@ def main() -> None:  # pragma: no cover - CLI helper
     parser.add_argument("input", help="GeoJSON file of features")
     parser.add_argument("--offsets", required=True, help="CSV file with offsets")
     parser.add_argument("--dsn", required=True, help="SQLite database DSN/path")
-    parser.add_argument("--bulk", action="store_true", help="Use bulk insertion")
     parser.add_argument("--use-gdal", action="store_true", help="Use ogr2ogr for loading")
     args = parser.parse_args()
 
@@ -194,7 +181,7 @@ def main() -> None:  # pragma: no cover - CLI helper
                 ]
             )
         else:
-            stream_to_db(features, offsets, conn, bulk=args.bulk)
+            stream_to_db(features, offsets, conn)
     finally:
         conn.close()
 
@@ -0,0 +1,256 @@
+"""SQLite CM93 feature store with R*Tree spatial indexes.
+
+:func:`cm93_importer.stream_to_db` writes CM93 features into the ``cm93_pts``,
+``cm93_ln``, ``cm93_ar``, ``cm93_labels`` and ``cm93_lights`` tables created
+here.  Geometries are stored as WKB; every table has an R*Tree virtual table
+``<table>_rtree`` holding the envelope of each row under the same ``id``.
+
+:class:`CM93Store` serves the tile server's CM93 endpoints from such a
+database (``CM93_DB``) without PostGIS.  A tile query joins the R*Trees
+against the tile envelope, so it reads only the rows near the tile and its
+cost follows the tile's content rather than the table size.  Clipping,
+classification and encoding then happen in the usual Python render path.
+
+Databases written by earlier importers kept WKT text in tables without
+``id``/``objl`` columns or R*Trees; :func:`create_schema` converts them.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import shapely
+
+from mvt_builder import EXTENT, MVT_BUFFER
+
+Bounds = Tuple[float, float, float, float]
+
+FEATURE_TABLES = ("cm93_ar", "cm93_ln", "cm93_pts", "cm93_lights", "cm93_labels")
+
+_SCHEMA = "\n".join(
+    f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    cell_id INTEGER NOT NULL,
+    objl TEXT NOT NULL,
+    geom BLOB NOT NULL,
+    attrs TEXT{", text TEXT" if table == "cm93_labels" else ""}
+);
+CREATE INDEX IF NOT EXISTS idx_{table}_cell ON {table} (cell_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_rtree USING rtree(id, minx, maxx, miny, maxy);
+"""
+    for table in FEATURE_TABLES
+) + """
+CREATE TABLE IF NOT EXISTS cm93_cells (
+    cell_id INTEGER PRIMARY KEY,
+    bbox TEXT,
+    offset_dx REAL,
+    offset_dy REAL,
+    meta_hash TEXT
+);
+"""
+
+
+# ``(cell_id, objl, geometry, attrs, text)`` as taken by :func:`insert_rows`.
+Row = Tuple[int, str, Any, Dict[str, Any], Optional[str]]
+
+
+def _legacy_tables(conn: sqlite3.Connection) -> List[str]:
+    """Return the feature tables still in the WKT layout (no ``objl``)."""
+
+    legacy = []
+    for table in FEATURE_TABLES:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if columns and "objl" not in columns:
+            legacy.append(table)
+    return legacy
+
+
+def _legacy_rows(conn: sqlite3.Connection, table: str, source: str) -> List[Row]:
+    """Read ``source`` (the WKT layout of ``table``) as :func:`insert_rows` rows.
+
+    Only lights kept their attributes; other rows get an empty ``objl``.
+    """
+
+    extra = {"cm93_labels": "text", "cm93_lights": "attrs"}.get(table, "NULL")
+    rows: List[Row] = []
+    for cell_id, wkt, value in conn.execute(f"SELECT cell_id, geom, {extra} FROM {source}").fetchall():
+        geom = shapely.from_wkt(wkt)
+        if table == "cm93_labels":
+            rows.append((cell_id, "", geom, {}, value))
+        elif table == "cm93_lights":
+            props = json.loads(value) if value else {}
+            attrs = {k: v for k, v in props.items() if k not in {"cell_id", "objl", "OBJL", "text"}}
+            rows.append((cell_id, "LIGHTS", geom, attrs, None))
+        else:
+            rows.append((cell_id, "", geom, {}, None))
+    return rows
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    """Create the CM93 tables and their R*Trees in ``conn`` if missing.
+
+    Feature tables in the earlier WKT layout are converted in place: they
+    are recreated with this schema and their rows re-inserted as WKB with
+    R*Tree entries.  Statements run one by one (not ``executescript``) and a
+    conversion opens a transaction if none is open, so it is committed with
+    the caller's import or not at all.
+    """
+
+    legacy = _legacy_tables(conn)
+    if legacy and not conn.in_transaction:
+        conn.execute("BEGIN")
+    for table in legacy:
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    for statement in _SCHEMA.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+    for table in legacy:
+        insert_rows(conn, table, _legacy_rows(conn, table, f"{table}_legacy"))
+        conn.execute(f"DROP TABLE {table}_legacy")
+
+
+def insert_rows(conn: sqlite3.Connection, table: str, rows: Sequence[Row]) -> None:
+    """Insert ``(cell_id, objl, geometry, attrs, text)`` rows into ``table``.
+
+    Geometries are shapely objects; they are written as WKB and their
+    envelopes go into the table's R*Tree under the row id.
+    """
+
+    if not rows:
+        return
+    start = conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+    geoms = [row[2] for row in rows]
+    wkb = shapely.to_wkb(geoms)
+    bounds = shapely.bounds(geoms)
+    ids = range(start, start + len(rows))
+    if table == "cm93_labels":
+        conn.executemany(
+            "INSERT INTO cm93_labels(id, cell_id, objl, geom, attrs, text) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (i, cell, objl, blob, json.dumps(attrs, sort_keys=True), text)
+                for i, (cell, objl, _, attrs, text), blob in zip(ids, rows, wkb)
+            ],
+        )
+    else:
+        conn.executemany(
+            f"INSERT INTO {table}(id, cell_id, objl, geom, attrs) VALUES (?, ?, ?, ?, ?)",
+            [
+                (i, cell, objl, blob, json.dumps(attrs, sort_keys=True))
+                for i, (cell, objl, _, attrs, _), blob in zip(ids, rows, wkb)
+            ],
+        )
+    conn.executemany(
+        f"INSERT INTO {table}_rtree(id, minx, maxx, miny, maxy) VALUES (?, ?, ?, ?, ?)",
+        [(i, b[0], b[2], b[1], b[3]) for i, b in zip(ids, bounds.tolist())],
+    )
+
+
+def delete_cell(conn: sqlite3.Connection, cell_id: int) -> None:
+    """Remove the rows (and their R*Tree entries) imported for ``cell_id``."""
+
+    for table in FEATURE_TABLES:
+        conn.execute(
+            f"DELETE FROM {table}_rtree WHERE id IN (SELECT id FROM {table} WHERE cell_id=?)",
+            (cell_id,),
+        )
+        conn.execute(f"DELETE FROM {table} WHERE cell_id=?", (cell_id,))
+    conn.execute("DELETE FROM cm93_cells WHERE cell_id=?", (cell_id,))
+
+
+class CM93Store:
+    """Read-only tile queries against a CM93 SQLite database.
+
+    :attr:`version` re-reads the file's mtime at most every
+    ``check_interval`` seconds.
+    """
+
+    def __init__(self, path: Path | str, *, check_interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._local = threading.local()
+        self._version = ""
+        self._checked = float("-inf")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    @property
+    def version(self) -> str:
+        """Change marker of the database file for cache versions."""
+
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._version = str(self.path.stat().st_mtime_ns)
+            self._checked = now
+        return self._version
+
+    def query(self, bbox: Bounds) -> List[Dict[str, Any]]:
+        """Return the features whose envelope intersects ``bbox``.
+
+        Features are ``{"geometry", "properties"}`` dicts with shapely
+        geometries and the stored attributes plus ``OBJL`` (and ``text`` for
+        labels).
+        """
+
+        minx, miny, maxx, maxy = bbox
+        conn = self._conn()
+        blobs: List[bytes] = []
+        props: List[Dict[str, Any]] = []
+        for table in FEATURE_TABLES:
+            text = ", t.text" if table == "cm93_labels" else ""
+            rows = conn.execute(
+                f"SELECT t.objl, t.geom, t.attrs{text} FROM {table}_rtree AS r"
+                f" JOIN {table} AS t ON t.id = r.id"
+                " WHERE r.minx <= ? AND r.maxx >= ? AND r.miny <= ? AND r.maxy >= ?"
+                " ORDER BY t.id",
+                (maxx, minx, maxy, miny),
+            )
+            for row in rows:
+                attrs = json.loads(row[2]) if row[2] else {}
+                attrs["OBJL"] = row[0]
+                if text and row[3] is not None:
+                    attrs["text"] = row[3]
+                blobs.append(row[1])
+                props.append(attrs)
+        geoms = shapely.from_wkb(blobs) if blobs else []
+        return [{"geometry": geom, "properties": p} for geom, p in zip(geoms, props)]
+
+    def features_for_tile(self, bbox: Bounds, z: int, x: int, y: int) -> List[Dict[str, Any]]:
+        """Return features for the tile ``bbox`` padded by the MVT clip buffer.
+
+        Same signature as :func:`datasource_stub.features_for_tile`.
+        """
+
+        minx, miny, maxx, maxy = bbox
+        bx = (maxx - minx) * MVT_BUFFER / EXTENT
+        by = (maxy - miny) * MVT_BUFFER / EXTENT
+        return self.query((minx - bx, miny - by, maxx + bx, maxy + by))
+
+
+def from_env() -> CM93Store | None:
+    """Return a store for the ``CM93_DB`` database or ``None`` if unset."""
+
+    path = os.environ.get("CM93_DB")
+    return CM93Store(path) if path else None
+
+
+__all__ = [
+    "FEATURE_TABLES",
+    "CM93Store",
+    "Row",
+    "create_schema",
+    "insert_rows",
+    "delete_cell",
+    "from_env",
+]
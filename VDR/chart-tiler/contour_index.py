@@ -0,0 +1,246 @@
+"""Dataset-wide index of depth contour values.
+
+When no contour matches the mariner's safety depth exactly, S-52 promotes the
+nearest deeper contour (or the deepest shallower one) to safety contour.
+:meth:`S52PreClassifier.finalize_tile` makes that choice from the DEPCNT
+features of a single tile, so neighbouring tiles can disagree and every render
+repeats the scan.  :class:`ContourIndex` holds the sorted ``VALDCO`` values of a
+whole dataset and answers the same question with a binary search; every tile
+of the dataset then promotes the same depth.
+
+The values are written to the dataset's MBTiles metadata (``contours``) at
+import.  For older files they are collected once from the tiles at the
+dataset's highest zoom level; :class:`ContourIndexCache` runs that scan in the
+background and tiles rendered meanwhile keep their per-tile choice.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import sqlite3
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from mapbox_vector_tile import decode as mvt_decode
+
+METADATA_KEY = "contours"
+
+logger = logging.getLogger(__name__)
+
+
+class ContourIndex:
+    """Sorted, de-duplicated contour depths of one dataset."""
+
+    def __init__(self, values: Iterable[float] = ()) -> None:
+        self.values = sorted({float(v) for v in values})
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def neighbours(self, depth: float) -> Tuple[Optional[float], Optional[float]]:
+        """Return ``(shallower, deeper)`` contours around ``depth``.
+
+        ``deeper`` is the first value ``>= depth``; ``shallower`` the last
+        value ``< depth``.  Either is ``None`` when no such contour exists.
+        """
+
+        i = bisect_left(self.values, depth)
+        shallower = self.values[i - 1] if i > 0 else None
+        deeper = self.values[i] if i < len(self.values) else None
+        return shallower, deeper
+
+    def safety_contour(self, safety: float) -> Optional[float]:
+        """Return the depth drawn as safety contour for ``safety``."""
+
+        shallower, deeper = self.neighbours(safety)
+        return deeper if deeper is not None else shallower
+
+    @classmethod
+    def from_features(cls, features: Iterable[Dict[str, Any]]) -> "ContourIndex":
+        """Collect ``VALDCO`` from GeoJSON-like or decoded MVT features."""
+
+        values = []
+        for feat in features:
+            try:
+                values.append(float(feat.get("properties", {})["VALDCO"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return cls(values)
+
+    @classmethod
+    def from_metadata(cls, path: Path | str) -> Optional["ContourIndex"]:
+        """Load the index stored at import, or ``None`` if the file has none.
+
+        Missing or unreadable files give an empty index.
+        """
+
+        try:
+            conn = sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return cls()
+        try:
+            row = conn.execute(
+                "SELECT value FROM metadata WHERE name=?", (METADATA_KEY,)
+            ).fetchone()
+        except sqlite3.Error:
+            return cls()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return cls(float(v) for v in str(row[0]).split(",") if v)
+
+    @classmethod
+    def from_mbtiles(cls, path: Path | str) -> "ContourIndex":
+        """Load the index of an MBTiles dataset; missing files give an empty one.
+
+        Files without stored contours are scanned, which decodes every tile
+        of the highest zoom level.
+        """
+
+        index = cls.from_metadata(path)
+        if index is not None:
+            return index
+        try:
+            conn = sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return cls()
+        try:
+            return cls(_scan_tiles(conn))
+        except sqlite3.Error:
+            return cls()
+        finally:
+            conn.close()
+
+
+def _scan_tiles(conn: sqlite3.Connection) -> Iterable[float]:
+    """Yield ``VALDCO`` values of the tiles at the highest zoom level."""
+
+    (maxzoom,) = conn.execute("SELECT MAX(zoom_level) FROM tiles").fetchone()
+    if maxzoom is None:
+        return
+    for (data,) in conn.execute("SELECT tile_data FROM tiles WHERE zoom_level=?", (maxzoom,)):
+        if data[:2] == b"\x1f\x8b":
+            data = gzip.decompress(data)
+        for layer in mvt_decode(data).values():
+            yield from ContourIndex.from_features(layer["features"]).values
+
+
+def write_contours(path: Path | str, values: Iterable[float]) -> None:
+    """Store contour depths in the ``metadata`` table of an MBTiles file."""
+
+    index = ContourIndex(values)
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO metadata(name, value) VALUES (?, ?)",
+            (METADATA_KEY, ",".join(f"{v:g}" for v in index.values)),
+        )
+    conn.close()
+
+
+def contour_marks(contours: list[Dict[str, Any]], depth: float, safety: float) -> set[int]:
+    """Return indexes of ``contours`` at ``depth`` to promote for ``safety``.
+
+    Mirrors :meth:`S52PreClassifier.finalize_tile`: when ``depth`` equals
+    ``safety`` the classifier already flagged those contours.
+    """
+
+    if depth == safety:
+        return set()
+    marks = set()
+    for idx, feat in enumerate(contours):
+        try:
+            if float(feat.get("properties", {}).get("VALDCO")) == depth:
+                marks.add(idx)
+        except (TypeError, ValueError):
+            continue
+    return marks
+
+
+class ContourIndexCache:
+    """Keep one :class:`ContourIndex` per dataset, rebuilt when its version changes.
+
+    Stored contours are read on the caller's thread.  Datasets without them
+    are scanned on a background thread; :meth:`get` returns ``None`` until
+    the scan is done.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ds_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, Tuple[Hashable, ContourIndex]] = {}
+        self._building: Dict[str, Tuple[Hashable, threading.Thread]] = {}
+
+    def get(
+        self,
+        ds: str,
+        version: Hashable,
+        load: Callable[[], Optional[ContourIndex]],
+        build: Callable[[], ContourIndex],
+    ) -> Optional[ContourIndex]:
+        """Return the index of ``ds`` at ``version``, or ``None`` while building.
+
+        ``load`` returns the stored index or ``None``; ``build`` computes it
+        and is only ever run in the background, once per dataset version.
+        """
+
+        with self._lock:
+            entry = self._entries.get(ds)
+            ds_lock = self._ds_locks.setdefault(ds, threading.Lock())
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with ds_lock:
+            with self._lock:
+                entry = self._entries.get(ds)
+                building = self._building.get(ds)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            if building is not None and building[0] == version:
+                return None
+            index = load()
+            if index is not None:
+                with self._lock:
+                    self._entries[ds] = (version, index)
+                return index
+            thread = threading.Thread(
+                target=self._build, args=(ds, version, build), name=f"contours-{ds}", daemon=True
+            )
+            with self._lock:
+                self._building[ds] = (version, thread)
+            thread.start()
+        return None
+
+    def wait(self, ds: str, timeout: float | None = None) -> None:
+        """Block until a background build of ``ds`` (if any) has finished."""
+
+        with self._lock:
+            building = self._building.get(ds)
+        if building is not None:
+            building[1].join(timeout)
+
+    def _build(self, ds: str, version: Hashable, build: Callable[[], ContourIndex]) -> None:
+        try:
+            index = build()
+        except Exception:  # pragma: no cover - keep per-tile contours on failure
+            logger.exception("contour index build failed for %s", ds)
+            index = ContourIndex()
+        with self._lock:
+            self._entries[ds] = (version, index)
+            if self._building.get(ds, (None,))[0] == version:
+                del self._building[ds]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+__all__ = [
+    "ContourIndex",
+    "ContourIndexCache",
+    "contour_marks",
+    "write_contours",
+    "METADATA_KEY",
+]
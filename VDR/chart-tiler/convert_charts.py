@@ -15,7 +15,9 @@ Example
     $ python convert_charts.py ENC_ROOT/US5MD11M.000 out_dir
 
 The script will generate two files inside ``out_dir``:
-``US5MD11M.mbtiles`` (vector tiles) and ``US5MD11M.tif`` (COG raster).
+``US5MD11M.mbtiles`` (vector tiles) and ``US5MD11M.tif`` (COG raster).  With
+``--pmtiles`` the vector tiles are also written as a single-file
+``US5MD11M.pmtiles`` archive for distribution.
 
 Uploading to a remote Hostinger VPS is optional and can be enabled with the
 ``--upload`` flag together with SSH credentials.  The upload uses SFTP over
@@ -36,6 +38,10 @@ from typing import Iterable, Optional, List, Dict
 import csv
 from pathlib import Path
 
+from contour_index import ContourIndex, write_contours
+from mbtiles_store import compact
+from pmtiles_archive import mbtiles_to_pmtiles
+
 try:  # pragma: no cover - GDAL optional in tests
     from osgeo import gdal, ogr
 except Exception:  # pragma: no cover
@@ -181,7 +187,11 @@ def s57_to_mbtiles(
     piped to ``tippecanoe`` which builds the MBTiles database.  Both commands
     are invoked via ``subprocess`` to avoid any C++ dependencies.  When
     ``respect_scamin`` is true each feature gains a ``tippecanoe`` property
-    derived from the ``SCAMIN`` attribute using :func:`scamin_to_zoom`.
+    derived from the ``SCAMIN`` attribute using :func:`scamin_to_zoom`.  The
+    dataset's depth contour values are stored in the ``contours`` metadata
+    row for the tile server's contour index.  The output is converted to
+    the deduplicated ``map``/``images`` schema (:func:`mbtiles_store.compact`)
+    so identical tiles are stored once.
     """
 
     layers = _s57_layers(s57_path)
@@ -200,8 +210,9 @@ def s57_to_mbtiles(
             ]
         )
 
+        data = json.loads(geojson.read_text())
+        contours = ContourIndex.from_features(data.get("features", [])).values
         if respect_scamin:
-            data = json.loads(geojson.read_text())
             for feat in data.get("features", []):
                 props = feat.get("properties", {})
                 scamin = props.get("SCAMIN")
@@ -224,6 +235,8 @@ def s57_to_mbtiles(
             tippecanoe_cmd.extend(["--include", attr])
         tippecanoe_cmd.append(str(geojson))
         subprocess.check_call(tippecanoe_cmd)
+    compact(output_mbtiles)
+    write_contours(output_mbtiles, contours)
 
 
 def encode_s57_to_mbtiles(
@@ -314,6 +327,11 @@ def main(argv: Optional[Iterable[str]] = None) -> int:
         action="store_true",
         help="Disable SCAMIN to tippecanoe minzoom mapping",
     )
+    parser.add_argument(
+        "--pmtiles",
+        action="store_true",
+        help="Also write the vector tiles as a PMTiles archive",
+    )
     args = parser.parse_args(argv)
 
     chart_path = pathlib.Path(args.chart)
@@ -337,14 +355,18 @@ def main(argv: Optional[Iterable[str]] = None) -> int:
         respect_scamin=not args.no_respect_scamin,
     )
     s57_to_cog(str(s57_path), str(cog))
+    outputs = [str(mbtiles), str(cog)]
+    if args.pmtiles:
+        pmtiles = out_dir / f"{stem}.pmtiles"
+        mbtiles_to_pmtiles(mbtiles, pmtiles)
+        outputs.append(str(pmtiles))
 
     if args.upload:
         if not all([args.host, args.user, args.password]):
             parser.error("--upload requires --host, --user and --password")
         upload_to_host(
             UploadTarget(args.host, args.user, args.password, args.remote_dir),
-            str(mbtiles),
-            str(cog),
+            *outputs,
         )
 
     return 0
@@ -1,36 +1,190 @@
 """Tiny helper around MBTiles used for tests and the dev tile server."""
 
 import os
+import queue
 import sqlite3
-from functools import lru_cache
-from typing import Optional, Dict, List
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import mbtiles_pool_connections, mbtiles_pool_wait_seconds
+from tile_cache import TileCache
+
+TileKey = Tuple[int, int, int]
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_MMAP_BYTES = 256 * 1024 * 1024
+DEFAULT_PAGE_CACHE_KIB = 16 * 1024
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# Bulk reads bind at most this many tiles per statement (3 parameters each).
+_BULK_CHUNK = 256
+
+_TILE_SQL = "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?"
+
+
+def _bulk_sql(n: int) -> str:
+    # CROSS JOIN keeps the key list as the outer loop so every key is an
+    # index lookup; a row-value ``IN`` would scan the tiles table instead.
+    values = ",".join(["(?,?,?)"] * n)
+    return (
+        f"WITH k(z, x, y) AS (VALUES {values})"
+        " SELECT t.zoom_level, t.tile_column, t.tile_row, t.tile_data FROM k"
+        " CROSS JOIN tiles AS t"
+        " ON t.zoom_level = k.z AND t.tile_column = k.x AND t.tile_row = k.y"
+    )
+
+
+class _ConnectionPool:
+    """Bounded pool of read-only connections to one MBTiles file.
+
+    A connection is used by one thread at a time; up to ``size`` are opened
+    lazily and further readers wait for one to be returned.  Connections keep
+    their prepared statements (``cached_statements``) between checkouts.
+
+    :meth:`close` closes the idle connections at once and the checked-out
+    ones when they are returned.  Readers still using a closed pool get a
+    connection of their own that is closed after use.
+    """
+
+    def __init__(self, path: str, size: int, *, immutable: bool = False) -> None:
+        self.path = path
+        self.size = max(1, size)
+        self.immutable = immutable
+        # ``None`` is queued once the pool is closed to wake waiting readers.
+        self._idle: "queue.LifoQueue[Optional[sqlite3.Connection]]" = queue.LifoQueue()
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        uri = f"{Path(self.path).resolve().as_uri()}?mode=ro"
+        if self.immutable:
+            # Only for files that never change while served: SQLite skips
+            # locking and change detection entirely.
+            uri += "&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=64)
+        mmap_bytes = int(os.environ.get("MBTILES_MMAP_BYTES", DEFAULT_MMAP_BYTES))
+        page_cache = int(os.environ.get("MBTILES_PAGE_CACHE_KIB", DEFAULT_PAGE_CACHE_KIB))
+        conn.execute(f"PRAGMA mmap_size={mmap_bytes}")
+        conn.execute(f"PRAGMA cache_size=-{page_cache}")
+        conn.execute("PRAGMA query_only=1")
+        return conn
+
+    def _grow(self, force: bool = False) -> Optional[sqlite3.Connection]:
+        """Open a new connection if the pool has room (always with ``force``)."""
+
+        with self._lock:
+            if not force and self._opened >= self.size:
+                return None
+            self._opened += 1
+        try:
+            conn = self._open()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+        mbtiles_pool_connections.inc()
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        conn.close()
+        with self._lock:
+            self._opened -= 1
+        mbtiles_pool_connections.dec()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection, recording how long the caller waited."""
+
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._grow()
+            if conn is None:
+                conn = self._idle.get()
+        if conn is None:
+            # Closed: pass the wake-up on to the next waiter.
+            self._idle.put(None)
+            conn = self._grow(force=True)
+        mbtiles_pool_wait_seconds.observe(time.perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                keep = not self._closed
+                if keep:
+                    self._idle.put(conn)
+            if not keep:
+                self._discard(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            self._idle.put(None)
+        for conn in idle:
+            self._discard(conn)
+
+
+# Decoded tiles shared by every data source, bounded by ``MBTILES_CACHE_BYTES``.
+_TILE_CACHE: TileCache[bytes] = TileCache(
+    int(os.environ.get("MBTILES_CACHE_BYTES", DEFAULT_CACHE_BYTES))
+)
 
 
 class MBTilesDataSource:
     """Lightweight reader for MBTiles storing Mapbox Vector Tiles.
 
     The interface intentionally stays very small: :meth:`get_tile` returns the
-    raw tile bytes for ``(z, x, y)`` if present.  Metadata from the ``metadata``
-    table is exposed via :meth:`metadata` for informational endpoints.  A tiny
-    in‑process LRU cache keeps recently used tiles in memory; the cache size can
-    be tuned via the ``MBTILES_CACHE_SIZE`` environment variable.
+    raw tile bytes for ``(z, x, y)`` if present and :meth:`get_tiles` reads
+    many tiles with one query per chunk.  Metadata from the ``metadata`` table
+    is exposed via :meth:`metadata` for informational endpoints.
+
+    Reads go through a pool of read-only connections (``MBTILES_POOL_SIZE``,
+    tuned with ``MBTILES_MMAP_BYTES`` and ``MBTILES_PAGE_CACHE_KIB``) so
+    concurrent requests do not serialise on one connection.  Recently used
+    tiles are kept in an in-process cache bounded by ``MBTILES_CACHE_BYTES``.
+    Pass ``immutable=True`` only for files that are never rewritten while
+    served; SQLite then skips locking and change detection.
+    ``version`` (e.g. the file's mtime) is part of the tile cache keys so a
+    replaced file never serves tiles cached from its predecessor.
     """
 
-    def __init__(self, path: str, cache_size: int | None = None) -> None:
+    def __init__(
+        self,
+        path: str,
+        pool_size: int | None = None,
+        *,
+        immutable: bool = False,
+        cache: TileCache[bytes] | None = None,
+        version: str = "",
+    ) -> None:
         self.path = path
-        # ``check_same_thread=False`` allows usage from FastAPI threads.
-        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self.version = version
+        size = pool_size or int(os.environ.get("MBTILES_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self._pool = _ConnectionPool(path, size, immutable=immutable)
+        self._cache = _TILE_CACHE if cache is None else cache
 
-        size = cache_size or int(os.environ.get("MBTILES_CACHE_SIZE", "1024"))
+    def close(self) -> None:
+        """Close the pooled connections; checked-out ones close when returned."""
 
-        # lru_cache needs to wrap a function defined at runtime so we create an
-        # instance specific accessor which forwards to the real implementation.
-        self._cached_get = lru_cache(maxsize=size)(self._get_tile_uncached)
+        self._pool.close()
 
     # -- metadata ---------------------------------------------------------
     def metadata(self) -> Dict[str, str]:
-        cur = self._conn.execute("SELECT name, value FROM metadata")
-        return {name: value for name, value in cur.fetchall()}
+        with self._pool.connection() as conn:
+            cur = conn.execute("SELECT name, value FROM metadata")
+            return {name: value for name, value in cur.fetchall()}
 
     def summary(self) -> Dict[str, object]:
         """Return a small metadata summary with numeric bounds."""
@@ -59,31 +213,79 @@ class MBTilesDataSource:
         """Convert TMS tile row to XYZ."""
         return (2 ** z - 1) - y
 
+    def _key(self, z: int, x: int, y: int) -> str:
+        return f"{self.path}@{self.version}:{z}/{x}/{y}"
+
     def _get_tile_uncached(self, z: int, x: int, y: int) -> Optional[bytes]:
         tms_y = self._xyz_to_tms(z, y)
-        cur = self._conn.execute(
-            "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
-            (z, x, tms_y),
-        )
-        row = cur.fetchone()
+        with self._pool.connection() as conn:
+            row = conn.execute(_TILE_SQL, (z, x, tms_y)).fetchone()
         return row[0] if row else None
 
     def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
         """Return raw tile bytes for ``z/x/y`` or ``None`` if missing."""
 
-        return self._cached_get(z, x, y)
+        key = self._key(z, x, y)
+        data = self._cache.get(key, "mbtiles")
+        if data is None:
+            data = self._get_tile_uncached(z, x, y)
+            if data is not None:
+                self._cache.put(key, data, kind="mbtiles", dataset=self.path)
+        return data
+
+    def get_tiles(self, keys: Iterable[TileKey]) -> Dict[TileKey, bytes]:
+        """Return the stored tiles among ``keys`` (XYZ ``(z, x, y)`` tuples).
+
+        Cached tiles are served from memory; the rest are read with one
+        statement per chunk of up to 256 tiles.  Chunks are padded to a power
+        of two so the pooled connections reuse a handful of prepared
+        statements.  Missing tiles are left out of the result.
+        """
+
+        found: Dict[TileKey, bytes] = {}
+        wanted: List[TileKey] = []
+        for z, x, y in dict.fromkeys(keys):
+            data = self._cache.get(self._key(z, x, y), "mbtiles")
+            if data is None:
+                wanted.append((z, x, y))
+            else:
+                found[(z, x, y)] = data
+        if not wanted:
+            return found
+        with self._pool.connection() as conn:
+            for start in range(0, len(wanted), _BULK_CHUNK):
+                chunk = wanted[start : start + _BULK_CHUNK]
+                n = 1 << (len(chunk) - 1).bit_length()
+                padded = chunk + [chunk[-1]] * (n - len(chunk))
+                params = [v for z, x, y in padded for v in (z, x, self._xyz_to_tms(z, y))]
+                for z, x, tms_y, data in conn.execute(_bulk_sql(n), params):
+                    key = (z, x, self._tms_to_xyz(z, tms_y))
+                    found[key] = data
+                    self._cache.put(self._key(*key), data, kind="mbtiles", dataset=self.path)
+        return found
 
 
 # -- connection cache ---------------------------------------------------------
 
 _DS_CACHE: Dict[str, MBTilesDataSource] = {}
+_DS_LOCK = threading.Lock()
+
 
+def get_datasource(path: str, version: str = "") -> MBTilesDataSource:
+    """Return a cached :class:`MBTilesDataSource` for ``path``.
 
-def get_datasource(path: str) -> MBTilesDataSource:
-    """Return a cached :class:`MBTilesDataSource` for ``path``."""
+    A different ``version`` replaces the cached source, closing its pool, so
+    files swapped in place (e.g. by ``import_enc``) are reopened.  Files are
+    opened ``immutable`` only with ``MBTILES_IMMUTABLE=1``, for deployments
+    whose MBTiles are never rewritten while the server runs.
+    """
 
-    ds = _DS_CACHE.get(path)
-    if ds is None:
-        ds = MBTilesDataSource(path)
-        _DS_CACHE[path] = ds
+    with _DS_LOCK:
+        ds = _DS_CACHE.get(path)
+        if ds is None or ds.version != version:
+            if ds is not None:
+                ds.close()
+            immutable = os.environ.get("MBTILES_IMMUTABLE", "0") == "1"
+            ds = MBTilesDataSource(path, immutable=immutable, version=version)
+            _DS_CACHE[path] = ds
     return ds
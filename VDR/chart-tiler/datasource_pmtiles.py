@@ -0,0 +1,113 @@
+"""Memory-mapped reader for PMTiles archives written by ``pmtiles_archive``."""
+
+import json
+import mmap
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from pmtiles_archive import (
+    HEADER_SIZE,
+    Entry,
+    Header,
+    decompress,
+    deserialize_directory,
+    find_entry,
+    zxy_to_tileid,
+)
+
+# Leaf directories are decoded once and kept per archive.
+_DIRECTORY_CACHE = 256
+# The root plus at most three levels of leaves (PMTiles spec limit).
+_MAX_DEPTH = 4
+
+
+class PMTilesDataSource:
+    """Read-only view of one PMTiles archive.
+
+    The file is memory mapped once and shared by every thread; :meth:`get_tile`
+    returns a ``memoryview`` slice of the mapping, so serving a tile copies
+    nothing in Python.  Tiles keep the archive's ``tile_compression``
+    (``header.tile_compression``), typically gzip.  Decoded directories are
+    cached, so a lookup is a bisection in memory after the first request for
+    a region.
+    """
+
+    def __init__(self, path: str, version: str = "") -> None:
+        self.path = path
+        self.version = version
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self.header = Header.unpack(self._view[:HEADER_SIZE])
+        self._directory = lru_cache(maxsize=_DIRECTORY_CACHE)(self._read_directory)
+
+    def close(self) -> None:
+        """Unmap the archive; raises ``BufferError`` while tile views are alive."""
+
+        self._view.release()
+        self._mmap.close()
+
+    def _read_directory(self, offset: int, length: int) -> Tuple[List[Entry], List[int]]:
+        entries = deserialize_directory(
+            self._view[offset : offset + length], self.header.internal_compression
+        )
+        return entries, [e.tile_id for e in entries]
+
+    # -- metadata ---------------------------------------------------------
+    def metadata(self) -> Dict[str, Any]:
+        h = self.header
+        raw = self._view[h.metadata_offset : h.metadata_offset + h.metadata_length]
+        return json.loads(decompress(raw, h.internal_compression) or b"{}")
+
+    def summary(self) -> Dict[str, object]:
+        """Return a small metadata summary with numeric bounds."""
+        h = self.header
+        return {
+            "name": self.metadata().get("name"),
+            "bounds": [h.min_lon, h.min_lat, h.max_lon, h.max_lat],
+            "minzoom": h.min_zoom,
+            "maxzoom": h.max_zoom,
+        }
+
+    # -- tiles ------------------------------------------------------------
+    def get_tile(self, z: int, x: int, y: int) -> Optional[memoryview]:
+        """Return the stored bytes of XYZ tile ``z/x/y`` or ``None`` if missing."""
+
+        h = self.header
+        if z < h.min_zoom or z > h.max_zoom:
+            return None
+        tile_id = zxy_to_tileid(z, x, y)
+        offset, length = h.root_offset, h.root_length
+        for _ in range(_MAX_DEPTH):
+            entries, tile_ids = self._directory(offset, length)
+            entry = find_entry(entries, tile_ids, tile_id)
+            if entry is None:
+                return None
+            if entry.run_length > 0:
+                start = h.tile_data_offset + entry.offset
+                return self._view[start : start + entry.length]
+            offset, length = h.leaf_offset + entry.offset, entry.length
+        return None
+
+
+# -- archive cache ------------------------------------------------------------
+
+_DS_CACHE: Dict[str, PMTilesDataSource] = {}
+_DS_LOCK = threading.Lock()
+
+
+def get_datasource(path: str, version: str = "") -> PMTilesDataSource:
+    """Return a cached :class:`PMTilesDataSource` for ``path``.
+
+    A different ``version`` maps the file again.  The previous mapping is
+    only dropped, not closed: responses may still hold slices of it, and it
+    is unmapped once they are released.
+    """
+
+    with _DS_LOCK:
+        ds = _DS_CACHE.get(path)
+        if ds is None or ds.version != version:
+            ds = PMTilesDataSource(path, version)
+            _DS_CACHE[path] = ds
+    return ds
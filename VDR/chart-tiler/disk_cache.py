@@ -0,0 +1,288 @@
+"""Write-through disk tier for rendered tiles.
+
+Rendered tiles are persisted to MBTiles-style SQLite files, one file per
+*partition* (tile kind and dataset), so a restarted tile server does not have
+to re-render tiles it produced before.  Rows are keyed by tile address and a
+*variant* (the normalised mariner configuration), so arbitrary client
+parameters add rows under the byte cap rather than files.  Each row records
+the dataset version the tile was rendered from; a lookup with a different
+version is treated as a miss and the stale row is dropped.
+
+The total size of all partitions is capped by ``max_bytes``.  When the cap is
+exceeded the oldest rows of the largest partition are deleted first and
+partitions left empty are removed.  Files are opened in WAL mode; at most
+``max_connections`` connections are kept open, shared by all threads with one
+lock per connection.  Callers run on the request threadpool, never on the
+event loop.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from metrics import disk_cache_bytes, disk_cache_hits_total, disk_cache_misses_total
+from tile_cache import CachedTile, etag_for_bytes
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_MAX_CONNECTIONS = 16
+# Evict down to this fraction of the cap so eviction is not run on every put.
+_LOW_WATER = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    variant TEXT NOT NULL DEFAULT '',
+    tile_data BLOB NOT NULL,
+    version TEXT NOT NULL,
+    etag TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (zoom_level, tile_column, tile_row, variant)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_tiles_created ON tiles(created_at);
+"""
+
+_WHERE = "zoom_level=? AND tile_column=? AND tile_row=? AND variant=?"
+
+
+class DiskKey(NamedTuple):
+    """Location of a tile in the disk tier."""
+
+    partition: str
+    z: int
+    x: int
+    y: int
+    version: str
+    variant: str = ""
+
+
+def partition_name(*parts: object) -> str:
+    """Return a filesystem safe partition name built from ``parts``."""
+
+    raw = ".".join(str(p) if p not in (None, "") else "_" for p in parts)
+    return re.sub(r"[^A-Za-z0-9_.,-]", "_", raw)
+
+
+class _Connection:
+    """A partition's connection and the lock serialising its users."""
+
+    __slots__ = ("conn", "lock")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn: sqlite3.Connection | None = conn
+        self.lock = threading.Lock()
+
+
+class DiskTileCache:
+    """Size-capped SQLite tile store shared by all render paths."""
+
+    def __init__(
+        self,
+        root: Path | str,
+        max_bytes: int | None = None,
+        *,
+        max_connections: int | None = None,
+    ) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("TILE_DISK_CACHE_BYTES", DEFAULT_MAX_BYTES))
+        if max_connections is None:
+            max_connections = int(
+                os.environ.get("TILE_DISK_CACHE_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+            )
+        self.max_bytes = int(max_bytes)
+        self.max_connections = max(1, max_connections)
+        self._lock = threading.Lock()
+        self._conns: "OrderedDict[str, _Connection]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        for path in self.root.glob("*.mbtiles"):
+            with self._use(path.stem) as conn:
+                total = conn.execute("SELECT COALESCE(SUM(length(tile_data)), 0) FROM tiles").fetchone()[0]
+            if total:
+                self._sizes[path.stem] = int(total)
+            else:
+                self._remove(path.stem)
+        disk_cache_bytes.set(self.nbytes)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._sizes.values())
+
+    @property
+    def partitions(self) -> int:
+        """Return the number of partition files."""
+
+        with self._lock:
+            return len(self._sizes)
+
+    # -- connections ---------------------------------------------------------
+    def _open(self, partition: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.root / f"{partition}.mbtiles", timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(tiles)")}
+        if cols and "variant" not in cols:
+            # Files from the one-file-per-configuration layout; only a cache.
+            conn.execute("DROP TABLE tiles")
+        conn.executescript(_SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO metadata (name, value) VALUES ('name', ?)", (partition,))
+        conn.commit()
+        return conn
+
+    @contextmanager
+    def _use(self, partition: str) -> Iterator[sqlite3.Connection]:
+        """Yield ``partition``'s connection, opening it if needed.
+
+        The least recently used connection beyond ``max_connections`` is
+        closed once its current user is done.
+        """
+
+        while True:
+            closing = None
+            with self._lock:
+                entry = self._conns.get(partition)
+                if entry is None:
+                    entry = self._conns[partition] = _Connection(self._open(partition))
+                    self._sizes.setdefault(partition, 0)
+                    if len(self._conns) > self.max_connections:
+                        _, closing = self._conns.popitem(last=False)
+                else:
+                    self._conns.move_to_end(partition)
+            if closing is not None:
+                self._close(closing)
+            with entry.lock:
+                if entry.conn is not None:
+                    yield entry.conn
+                    return
+            # closed by another thread between lookup and lock; reopen
+
+    @staticmethod
+    def _close(entry: _Connection) -> None:
+        with entry.lock:
+            if entry.conn is not None:
+                entry.conn.close()
+                entry.conn = None
+
+    def _remove(self, partition: str) -> None:
+        """Close ``partition`` and delete its files."""
+
+        with self._lock:
+            entry = self._conns.pop(partition, None)
+            self._sizes.pop(partition, None)
+        if entry is not None:
+            self._close(entry)
+        for suffix in (".mbtiles", ".mbtiles-wal", ".mbtiles-shm"):
+            try:
+                (self.root / f"{partition}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _tms(z: int, y: int) -> int:
+        return (2 ** z - 1) - y
+
+    # -- public API -----------------------------------------------------------
+    def get(self, key: DiskKey) -> Optional[CachedTile]:
+        """Return the stored tile for ``key`` or ``None`` if missing or stale."""
+
+        with self._lock:
+            known = key.partition in self._sizes
+        if not known:
+            disk_cache_misses_total.inc()
+            return None
+        with self._use(key.partition) as conn:
+            row = conn.execute(
+                f"SELECT tile_data, version, etag FROM tiles WHERE {_WHERE}",
+                (key.z, key.x, self._tms(key.z, key.y), key.variant),
+            ).fetchone()
+        if row is None:
+            disk_cache_misses_total.inc()
+            return None
+        data, version, etag = row
+        if version != key.version:
+            self._delete(key)
+            disk_cache_misses_total.inc()
+            return None
+        disk_cache_hits_total.inc()
+        data = bytes(data)
+        return CachedTile(data, etag or etag_for_bytes(data))
+
+    def put(self, key: DiskKey, tile: CachedTile) -> None:
+        """Store ``tile`` for ``key`` replacing any previous version."""
+
+        data = tile.data
+        where = (key.z, key.x, self._tms(key.z, key.y), key.variant)
+        with self._use(key.partition) as conn, conn:
+            old = conn.execute(f"SELECT length(tile_data) FROM tiles WHERE {_WHERE}", where).fetchone()
+            conn.execute(
+                "REPLACE INTO tiles"
+                " (zoom_level, tile_column, tile_row, variant, tile_data, version, etag, created_at)"
+                " VALUES (?,?,?,?,?,?,?,?)",
+                (*where, sqlite3.Binary(data), key.version, tile.etag, time.time()),
+            )
+        with self._lock:
+            self._sizes[key.partition] = self._sizes.get(key.partition, 0) + len(data) - (old[0] if old else 0)
+            over = self.nbytes > self.max_bytes
+        if over:
+            self._evict()
+        disk_cache_bytes.set(self.nbytes)
+
+    # -- internals --------------------------------------------------------------
+    def _delete(self, key: DiskKey) -> None:
+        where = (key.z, key.x, self._tms(key.z, key.y), key.variant)
+        with self._use(key.partition) as conn, conn:
+            row = conn.execute(f"SELECT length(tile_data) FROM tiles WHERE {_WHERE}", where).fetchone()
+            conn.execute(f"DELETE FROM tiles WHERE {_WHERE}", where)
+            left = conn.execute("SELECT EXISTS (SELECT 1 FROM tiles)").fetchone()[0]
+        if not left:
+            self._remove(key.partition)
+        elif row:
+            with self._lock:
+                self._sizes[key.partition] = self._sizes.get(key.partition, 0) - row[0]
+
+    def _evict(self) -> None:
+        target = int(self.max_bytes * _LOW_WATER)
+        while True:
+            with self._lock:
+                if self.nbytes <= target or not self._sizes:
+                    return
+                partition = max(self._sizes, key=self._sizes.__getitem__)
+                excess = self.nbytes - target
+            freed = 0
+            with self._use(partition) as conn, conn:
+                rows = conn.execute(
+                    "SELECT zoom_level, tile_column, tile_row, variant, length(tile_data) FROM tiles"
+                    " ORDER BY created_at LIMIT 256"
+                ).fetchall()
+                for z, x, tms, variant, size in rows:
+                    conn.execute(f"DELETE FROM tiles WHERE {_WHERE}", (z, x, tms, variant))
+                    freed += size
+                    if freed >= excess:
+                        break
+                left = conn.execute("SELECT EXISTS (SELECT 1 FROM tiles)").fetchone()[0]
+            if not left:
+                self._remove(partition)
+                continue
+            with self._lock:
+                self._sizes[partition] = self._sizes.get(partition, 0) - freed
+
+
+def from_env() -> DiskTileCache | None:
+    """Return a cache rooted at ``TILE_DISK_CACHE_DIR`` or ``None`` if unset."""
+
+    root = os.environ.get("TILE_DISK_CACHE_DIR")
+    return DiskTileCache(root) if root else None
+
+
+__all__ = ["DiskKey", "DiskTileCache", "partition_name", "from_env"]
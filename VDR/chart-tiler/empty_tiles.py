@@ -0,0 +1,103 @@
+"""Negative cache of tiles known to render empty.
+
+Open-ocean tiles are requested constantly and always encode to the same empty
+tile.  :class:`EmptyTileIndex` remembers them per dataset version and zoom in a
+sparse bitset: tiles are grouped into 256×256 blocks and each block that holds
+at least one empty tile gets an 8 KiB bit array.  Unlike a Bloom filter the
+index has no false positives, so a tile with chart content is never dropped.
+
+When more than ``max_blocks`` blocks are allocated the least recently touched
+block is discarded; a forgotten tile is simply rendered again.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+_BLOCK_SHIFT = 8
+_BLOCK_SIZE = 1 << _BLOCK_SHIFT
+_BLOCK_BYTES = _BLOCK_SIZE * _BLOCK_SIZE // 8
+DEFAULT_MAX_BLOCKS = 1024
+
+_BlockKey = Tuple[Hashable, int, int, int]
+
+
+def tile_outside_bounds(
+    tile_bbox: Tuple[float, float, float, float], bounds: list[float] | None
+) -> bool:
+    """Return ``True`` if ``tile_bbox`` does not intersect ``bounds``.
+
+    ``bounds`` is ``[west, south, east, north]`` as stored in MBTiles metadata;
+    ``west > east`` denotes a dataset crossing the antimeridian.  Missing or
+    all-zero bounds are treated as unknown and never exclude a tile.
+    """
+
+    if not bounds or len(bounds) != 4 or not any(bounds):
+        return False
+    west, south, east, north = bounds
+    minx, miny, maxx, maxy = tile_bbox
+    if maxy < south or miny > north:
+        return True
+    if west <= east:
+        return maxx < west or minx > east
+    return maxx < west and minx > east
+
+
+class EmptyTileIndex:
+    """Exact sparse bitset of empty tiles keyed by ``(dataset, zoom)``."""
+
+    def __init__(self, max_blocks: int = DEFAULT_MAX_BLOCKS) -> None:
+        self.max_blocks = max_blocks
+        self._lock = threading.Lock()
+        self._blocks: "OrderedDict[_BlockKey, bytearray]" = OrderedDict()
+        self._versions: Dict[str, Hashable] = {}
+
+    @staticmethod
+    def _locate(dataset: Hashable, z: int, x: int, y: int) -> tuple[_BlockKey, int]:
+        key = (dataset, z, x >> _BLOCK_SHIFT, y >> _BLOCK_SHIFT)
+        bit = (y & (_BLOCK_SIZE - 1)) * _BLOCK_SIZE + (x & (_BLOCK_SIZE - 1))
+        return key, bit
+
+    def add(self, ds: str, version: Hashable, z: int, x: int, y: int) -> None:
+        """Record ``z/x/y`` of ``ds`` at ``version`` as empty."""
+
+        key, bit = self._locate((ds, version), z, x, y)
+        with self._lock:
+            if self._versions.get(ds) != version:
+                self._drop(ds)
+                self._versions[ds] = version
+            block = self._blocks.get(key)
+            if block is None:
+                block = self._blocks[key] = bytearray(_BLOCK_BYTES)
+                while len(self._blocks) > self.max_blocks:
+                    self._blocks.popitem(last=False)
+            else:
+                self._blocks.move_to_end(key)
+            block[bit >> 3] |= 1 << (bit & 7)
+
+    def __contains__(self, item: tuple[str, Hashable, int, int, int]) -> bool:
+        ds, version, z, x, y = item
+        key, bit = self._locate((ds, version), z, x, y)
+        with self._lock:
+            block = self._blocks.get(key)
+            return block is not None and bool(block[bit >> 3] & (1 << (bit & 7)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+            self._versions.clear()
+
+    def __len__(self) -> int:
+        """Return the number of allocated blocks."""
+
+        with self._lock:
+            return len(self._blocks)
+
+    def _drop(self, ds: str) -> None:
+        for key in [k for k in self._blocks if k[0][0] == ds]:
+            del self._blocks[key]
+
+
+__all__ = ["EmptyTileIndex", "tile_outside_bounds", "DEFAULT_MAX_BLOCKS"]
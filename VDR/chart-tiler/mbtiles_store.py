@@ -0,0 +1,161 @@
+"""Deduplicated MBTiles storage: the ``map``/``images`` schema.
+
+Open-ocean and inland tiles are often byte-identical, so instead of one blob
+per row in a plain ``tiles`` table the tiler's MBTiles writers store each
+distinct payload once in ``images`` (keyed by its MD5 ``tile_id``) and point
+``map`` rows at it.  A ``tiles`` view joins the two, so every MBTiles reader
+(:mod:`datasource_mbtiles`, :mod:`contour_index`, tippecanoe tools) keeps
+working unchanged.  This is the normalised layout written by ``mbutil``.
+
+:func:`compact` converts an existing file with a plain ``tiles`` table in
+place and reports how many rows shared a payload.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Iterable, NamedTuple, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+CREATE TABLE IF NOT EXISTS map (
+    zoom_level INTEGER,
+    tile_column INTEGER,
+    tile_row INTEGER,
+    tile_id TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS map_index ON map (zoom_level, tile_column, tile_row);
+CREATE TABLE IF NOT EXISTS images (tile_data BLOB, tile_id TEXT);
+CREATE UNIQUE INDEX IF NOT EXISTS images_id ON images (tile_id);
+CREATE VIEW IF NOT EXISTS tiles AS
+    SELECT map.zoom_level AS zoom_level,
+           map.tile_column AS tile_column,
+           map.tile_row AS tile_row,
+           images.tile_data AS tile_data
+    FROM map JOIN images ON images.tile_id = map.tile_id;
+"""
+
+# ``(zoom_level, tile_column, tile_row, tile_data)`` with a TMS row.
+TileRow = Tuple[int, int, int, bytes]
+
+
+class CompactStats(NamedTuple):
+    """Outcome of :func:`compact` for one file."""
+
+    tiles: int
+    images: int
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def dedupe_ratio(self) -> float:
+        """Tiles per stored payload (1.0 when nothing was shared)."""
+
+        return self.tiles / self.images if self.images else 1.0
+
+
+def tile_id(data: bytes) -> str:
+    """Return the ``images.tile_id`` of a payload."""
+
+    return hashlib.md5(data).hexdigest()
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    """Create the ``metadata``, ``map``, ``images`` tables and ``tiles`` view.
+
+    Statements run one by one (not ``executescript``) so an open transaction
+    is not committed.
+    """
+
+    for statement in _SCHEMA.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def is_deduplicated(conn: sqlite3.Connection) -> bool:
+    """Return ``True`` unless ``tiles`` is a plain table."""
+
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'tiles'").fetchone()
+    return row is None or row[0] != "table"
+
+
+def put_tiles(conn: sqlite3.Connection, rows: Iterable[TileRow]) -> None:
+    """Store TMS ``(z, x, y, data)`` rows, replacing tiles at the same address.
+
+    Payloads already present in ``images`` are referenced, not stored again.
+    Images no longer referenced after a replacement are left for
+    :func:`prune_images`.
+    """
+
+    for z, x, y, data in rows:
+        key = tile_id(data)
+        conn.execute(
+            "INSERT OR IGNORE INTO images (tile_data, tile_id) VALUES (?, ?)",
+            (sqlite3.Binary(data), key),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO map (zoom_level, tile_column, tile_row, tile_id) VALUES (?, ?, ?, ?)",
+            (z, x, y, key),
+        )
+
+
+def prune_images(conn: sqlite3.Connection) -> int:
+    """Delete images no ``map`` row refers to; return how many were removed."""
+
+    cur = conn.execute(
+        "DELETE FROM images WHERE tile_id NOT IN (SELECT DISTINCT tile_id FROM map)"
+    )
+    return cur.rowcount
+
+
+def compact(path: Path | str) -> CompactStats:
+    """Convert the MBTiles file ``path`` to the deduplicated schema in place.
+
+    The plain ``tiles`` table is replaced by ``map``/``images`` and the
+    ``tiles`` view in one transaction, then the file is vacuumed so the
+    freed pages are returned.  Files that are already deduplicated (or use
+    another view-based layout) are left untouched.
+    """
+
+    path = Path(path)
+    before = path.stat().st_size
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        if not is_deduplicated(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("ALTER TABLE tiles RENAME TO tiles_plain")
+                create_schema(conn)
+                # A second cursor streams the old rows while the first writes.
+                rows = conn.cursor().execute(
+                    "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles_plain"
+                )
+                put_tiles(conn, rows)
+                conn.execute("DROP TABLE tiles_plain")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            conn.execute("VACUUM")
+        (tiles,) = conn.execute("SELECT COUNT(*) FROM tiles").fetchone()
+        try:
+            (images,) = conn.execute("SELECT COUNT(*) FROM images").fetchone()
+        except sqlite3.OperationalError:  # another view-based layout
+            images = tiles
+    finally:
+        conn.close()
+    return CompactStats(tiles, images, before, path.stat().st_size)
+
+
+__all__ = [
+    "CompactStats",
+    "TileRow",
+    "compact",
+    "create_schema",
+    "is_deduplicated",
+    "prune_images",
+    "put_tiles",
+    "tile_id",
+]
@@ -38,6 +38,176 @@ tile_size_bytes = Gauge(
     registry=REGISTRY,
 )
 
+# Histogram of encoded MVT layer sizes for rendered tiles by layer name
+# (see mvt_layers.layer_sizes).
+tile_layer_bytes = Histogram(
+    "tile_layer_bytes",
+    "Encoded size of vector tile layers in bytes",
+    ["layer"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+    registry=REGISTRY,
+)
+
+# Counter recording requests that waited on another request's in-flight render
+# for the same tile instead of rendering it themselves.
+tile_coalesced_total = Counter(
+    "tile_coalesced_total",
+    "Tile requests served by joining an in-flight render",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+# In-memory tile cache accounting (see tile_cache.TileCache).
+tile_cache_bytes = Gauge(
+    "tile_cache_bytes",
+    "Bytes held by the in-memory tile cache",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+tile_cache_entries = Gauge(
+    "tile_cache_entries",
+    "Entries held by the in-memory tile cache",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+tile_cache_dataset_bytes = Gauge(
+    "tile_cache_dataset_bytes",
+    "Bytes held by the in-memory tile cache per dataset",
+    ["dataset"],
+    registry=REGISTRY,
+)
+
+tile_cache_hits_total = Counter(
+    "tile_cache_hits_total",
+    "In-memory tile cache hits",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+tile_cache_misses_total = Counter(
+    "tile_cache_misses_total",
+    "In-memory tile cache misses",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+tile_cache_evictions_total = Counter(
+    "tile_cache_evictions_total",
+    "Entries evicted from the in-memory tile cache",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+# Persistent disk tier accounting (see disk_cache.DiskTileCache).
+disk_cache_bytes = Gauge(
+    "disk_cache_bytes",
+    "Tile bytes stored in the disk cache",
+    registry=REGISTRY,
+)
+
+disk_cache_hits_total = Counter(
+    "disk_cache_hits_total",
+    "Disk tile cache hits",
+    registry=REGISTRY,
+)
+
+disk_cache_misses_total = Counter(
+    "disk_cache_misses_total",
+    "Disk tile cache misses (including stale versions)",
+    registry=REGISTRY,
+)
+
+# MBTiles read connection pools (see datasource_mbtiles.MBTilesDataSource).
+mbtiles_pool_wait_seconds = Histogram(
+    "mbtiles_pool_wait_seconds",
+    "Time spent waiting for a pooled MBTiles connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+    registry=REGISTRY,
+)
+
+mbtiles_pool_connections = Gauge(
+    "mbtiles_pool_connections",
+    "Open read-only MBTiles connections across all pools",
+    registry=REGISTRY,
+)
+
+# Projected, clipped and simplified tile geometries reused across mariner
+# settings (see simplify.GeometryCache).
+tile_geometry_cache_hits_total = Counter(
+    "tile_geometry_cache_hits_total",
+    "Tile renders that reused cached simplified geometries",
+    registry=REGISTRY,
+)
+
+tile_geometry_cache_misses_total = Counter(
+    "tile_geometry_cache_misses_total",
+    "Tile renders that projected, clipped and simplified geometries",
+    registry=REGISTRY,
+)
+
+tile_geometry_cache_bytes = Gauge(
+    "tile_geometry_cache_bytes",
+    "Estimated bytes held by the tile geometry cache",
+    registry=REGISTRY,
+)
+
+tile_geometry_cache_entries = Gauge(
+    "tile_geometry_cache_entries",
+    "Tiles held by the tile geometry cache",
+    registry=REGISTRY,
+)
+
+# Empty tiles answered without rendering, by reason ("bounds" or "negative").
+tile_empty_total = Counter(
+    "tile_empty_total",
+    "Tiles served as the shared empty tile without rendering",
+    ["reason"],
+    registry=REGISTRY,
+)
+
+# Render executor load (see render_pool.RenderExecutor).
+tile_render_queue_depth = Gauge(
+    "tile_render_queue_depth",
+    "Tile renders waiting for a render worker",
+    registry=REGISTRY,
+)
+
+tile_render_inflight = Gauge(
+    "tile_render_inflight",
+    "Tile renders queued or running",
+    registry=REGISTRY,
+)
+
+tile_render_rejected_total = Counter(
+    "tile_render_rejected_total",
+    "Tile renders shed with 503 because the render queue was full",
+    registry=REGISTRY,
+)
+
+# Process render backend (see render_pool.ProcessRenderBackend); ``worker``
+# is a slot number that a recycled worker's replacement takes over.
+tile_render_worker_tasks_total = Counter(
+    "tile_render_worker_tasks_total",
+    "Tiles rendered per render worker process",
+    ["worker"],
+    registry=REGISTRY,
+)
+
+tile_render_worker_seconds_total = Counter(
+    "tile_render_worker_seconds_total",
+    "Render time spent per render worker process",
+    ["worker"],
+    registry=REGISTRY,
+)
+
+tile_render_worker_restarts_total = Counter(
+    "tile_render_worker_restarts_total",
+    "Render worker pools restarted after a failed health check or crash",
+    registry=REGISTRY,
+)
+
 # Gauge tracking resident memory usage of the tile server process.
 process_resident_memory_bytes = Gauge(
     "process_resident_memory_bytes",
@@ -50,6 +220,30 @@ __all__ = [
     "tile_render_seconds",
     "tile_bytes_total",
     "tile_size_bytes",
+    "tile_layer_bytes",
+    "tile_coalesced_total",
+    "tile_cache_bytes",
+    "tile_cache_entries",
+    "tile_cache_dataset_bytes",
+    "tile_cache_hits_total",
+    "tile_cache_misses_total",
+    "tile_cache_evictions_total",
+    "disk_cache_bytes",
+    "disk_cache_hits_total",
+    "disk_cache_misses_total",
+    "mbtiles_pool_wait_seconds",
+    "mbtiles_pool_connections",
+    "tile_geometry_cache_hits_total",
+    "tile_geometry_cache_misses_total",
+    "tile_geometry_cache_bytes",
+    "tile_geometry_cache_entries",
+    "tile_empty_total",
+    "tile_render_queue_depth",
+    "tile_render_inflight",
+    "tile_render_rejected_total",
+    "tile_render_worker_tasks_total",
+    "tile_render_worker_seconds_total",
+    "tile_render_worker_restarts_total",
     "process_resident_memory_bytes",
     "CONTENT_TYPE_LATEST",
     "generate_latest",
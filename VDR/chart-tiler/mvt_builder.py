@@ -7,35 +7,151 @@ The module provides two helpers:
 ``encode_mvt``
     Encodes a mapping of layer names to feature iterables.  A plain iterable of
     features is still accepted for backwards compatibility and is encoded in a
-    single layer named ``features``.
+    single layer named ``features``.  ``TILE_MVT_ENCODER=fast`` switches from
+    ``mapbox_vector_tile`` to the NumPy encoder in :mod:`mvt_fast`.  With the
+    tile's ``bbox`` the lon/lat geometries are projected to Web-Mercator tile
+    space and clipped like ``ST_AsMVTGeom(geom, bounds, 4096, buffer, true)``.
+
+``tile_geometries`` / ``clip_to_tile``
+    The projection/clipping/simplification step on its own, for geometry
+    arrays or features.
 
 ``fetch_mvt``
     Executes the :func:`enc_mvt` SQL function and concatenates the returned
     layer tiles into a single MVT byte string.
 """
 
-from typing import Iterable, Dict, Any, Mapping, Sequence, Tuple
+import os
+from typing import Iterable, Dict, Any, List, Mapping, Optional, Sequence, Tuple
 
+import numpy as np
+import shapely
 from mapbox_vector_tile import encode as mvt_encode
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+
+import mvt_fast
+from simplify import simplify_geometries
 
 try:  # pragma: no cover - optional dependency in tests
     import psycopg2  # type: ignore
 except Exception:  # pragma: no cover
     psycopg2 = None  # type: ignore
 
+MVT_ENCODER = os.environ.get("TILE_MVT_ENCODER", "mapbox")
+EXTENT = 4096
+# Tile-space buffer kept around clipped geometries, as in the SQL path.
+MVT_BUFFER = int(os.environ.get("TILE_MVT_BUFFER", "64"))
+
+Bounds = Tuple[float, float, float, float]
+
+_MAX_LAT = 85.0511287798066
+_POINT_TYPES = (0, 4)  # shapely type ids of Point and MultiPoint
+_POLYGON_TYPES = (3, 6)
+_COLLECTION = 7
+
+
+def _mercator(lon: Any, lat: Any) -> Tuple[Any, Any]:
+    lat = np.clip(lat, -_MAX_LAT, _MAX_LAT)
+    return np.radians(lon), np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+
+
+def _geometry(spec: Any) -> Optional[BaseGeometry]:
+    if spec is None or isinstance(spec, BaseGeometry):
+        return spec
+    try:
+        return shape(spec)
+    except (ValueError, TypeError, AttributeError, shapely.errors.GEOSException):
+        return None
+
+
+def tile_geometries(
+    geometries: Sequence[Any],
+    bbox: Bounds,
+    extent: int = EXTENT,
+    buffer: Optional[int] = None,
+    tolerance: float = 0.0,
+) -> np.ndarray:
+    """Project lon/lat ``geometries`` into the tile ``bbox`` and clip them.
+
+    Coordinates become tile units (``0..extent``, y up as expected by the
+    encoders). Every geometry is clipped to the tile plus ``buffer`` units,
+    simplified with ``tolerance`` (see :mod:`simplify`) and snapped to the
+    integer grid, each step in one vectorised call.  Returns an array of
+    shapely geometries aligned with the input; entries that end up empty,
+    collapse on the grid or become collections are ``None``.
+    """
+
+    geoms = np.array([_geometry(g) for g in geometries], dtype=object)
+    if not len(geoms):
+        return geoms
+    pad = MVT_BUFFER if buffer is None else buffer
+    west, south, east, north = bbox
+    x0, y0 = _mercator(west, south)
+    x1, y1 = _mercator(east, north)
+    sx, sy = extent / (x1 - x0), extent / (y1 - y0)
+
+    def project(coords: np.ndarray) -> np.ndarray:
+        x, y = _mercator(coords[:, 0], coords[:, 1])
+        return np.column_stack(((x - x0) * sx, (y - y0) * sy))
+
+    geoms = shapely.transform(geoms, project)
+    geoms = shapely.clip_by_rect(geoms, -pad, -pad, extent + pad, extent + pad)
+    geoms = simplify_geometries(geoms, tolerance)
+    geoms = shapely.set_precision(geoms, 1.0)
+    kind = shapely.get_type_id(geoms)
+    keep = ~shapely.is_missing(geoms) & ~shapely.is_empty(geoms) & (kind != _COLLECTION)
+    keep &= np.isin(kind, _POINT_TYPES) | (shapely.length(geoms) > 0)
+    keep &= ~np.isin(kind, _POLYGON_TYPES) | (shapely.area(geoms) > 0)
+    geoms[~keep] = None
+    return geoms
+
+
+def clip_to_tile(
+    features: Iterable[Dict[str, Any]],
+    bbox: Bounds,
+    extent: int = EXTENT,
+    buffer: Optional[int] = None,
+    tolerance: float = 0.0,
+) -> List[Dict[str, Any]]:
+    """Return ``features`` with geometries from :func:`tile_geometries`.
+
+    Features whose geometry is dropped are left out; the others are copied
+    and carry shapely geometries in tile units.
+    """
+
+    feats = list(features)
+    geoms = tile_geometries([f.get("geometry") for f in feats], bbox, extent, buffer, tolerance)
+    return [{**feat, "geometry": geom} for feat, geom in zip(feats, geoms) if geom is not None]
+
 
-def encode_mvt(layers: Mapping[str, Iterable[Dict[str, Any]]] | Iterable[Dict[str, Any]]) -> bytes:
+def encode_mvt(
+    layers: Mapping[str, Iterable[Dict[str, Any]]] | Iterable[Dict[str, Any]],
+    encoder: Optional[str] = None,
+    bbox: Optional[Bounds] = None,
+    buffer: Optional[int] = None,
+    tolerance: float = 0.0,
+) -> bytes:
     """Encode features into a Mapbox Vector Tile.
 
     ``layers`` may be a mapping of layer name to iterable of features or an
     iterable of features for the legacy single ``features`` layer.
+    ``encoder`` overrides the ``TILE_MVT_ENCODER`` setting.  Without
+    ``bbox`` coordinates are taken as tile units; with it they are lon/lat
+    and go through :func:`clip_to_tile` (``buffer`` defaults to
+    ``TILE_MVT_BUFFER``; ``tolerance`` simplifies in tile units).
     """
 
     if isinstance(layers, Mapping):
         tile_layers = [{"name": name, "features": list(feats)} for name, feats in layers.items()]
     else:  # backwards compatibility
         tile_layers = [{"name": "features", "features": list(layers)}]
-    return mvt_encode(tile_layers, extents=4096)
+    if bbox is not None:
+        for layer in tile_layers:
+            layer["features"] = clip_to_tile(layer["features"], bbox, EXTENT, buffer, tolerance)
+    if (encoder or MVT_ENCODER) == "fast":
+        return mvt_fast.encode(tile_layers, extents=EXTENT)
+    return mvt_encode(tile_layers, default_options={"extents": EXTENT})
 
 
 def fetch_mvt(conn, z: int, x: int, y: int) -> bytes:
@@ -0,0 +1,164 @@
+"""Semantic layer split for Python-rendered vector tiles.
+
+By default the Python render path encodes every feature into one ``features``
+layer.  With ``TILE_MVT_LAYERS=split`` features are instead routed into the
+layers declared in ``config/mvt_layers.json`` (soundings, labels, areas,
+lines, points), the Python counterpart of the layers ``sql/enc_mvt.sql``
+emits.  Each layer carries its own key/value table, and layers with an
+``attributes`` list only keep those properties, so e.g. soundings do not
+repeat the portrayal attributes of the area objects.
+
+The same schema file is read by ``server-styling/build_style_json.py
+--split-layers`` to point style layers at the right ``source-layer`` and is
+documented in ``docs/mvt_schema.md``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_BASE = Path(__file__).resolve().parent
+SCHEMA_PATH = _BASE / "config" / "mvt_layers.json"
+
+# "single" keeps the legacy ``features`` layer; "split" uses the schema.
+MVT_LAYERS = os.environ.get("TILE_MVT_LAYERS", "single")
+
+with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+    SCHEMA: Dict[str, Any] = json.load(f)
+
+LAYER_NAMES: List[str] = [layer["name"] for layer in SCHEMA["layers"]]
+
+
+def _geometry_type(geom: Any) -> Optional[str]:
+    if geom is None:
+        return None
+    name = geom.get("type") if isinstance(geom, dict) else getattr(geom, "geom_type", None)
+    return name[5:] if name and name.startswith("Multi") else name
+
+
+def layer_for(objl: str, props: Dict[str, Any], geom: Any) -> Optional[str]:
+    """Return the schema layer for a feature of class ``objl``.
+
+    Layers are tried in schema order; a layer matches when the object class
+    is among its ``objects``, the feature carries its ``property`` and the
+    geometry type (ignoring ``Multi``) is among its ``geometry`` types.
+    Features matching no layer (e.g. geometry collections) yield ``None``.
+    """
+
+    kind = _geometry_type(geom)
+    for layer in SCHEMA["layers"]:
+        if "objects" in layer and objl not in layer["objects"]:
+            continue
+        if "property" in layer and layer["property"] not in props:
+            continue
+        if "geometry" in layer and kind not in layer["geometry"]:
+            continue
+        return layer["name"]
+    return None
+
+
+def split_features(
+    pairs: Iterable[Tuple[str, Dict[str, Any]]],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Group ``(objl, feature)`` pairs into schema layers.
+
+    Returns a mapping of layer name to features in schema order, ready for
+    :func:`mvt_builder.encode_mvt`.  Empty layers are left out.  Features of
+    layers with an ``attributes`` list are copied with only those properties.
+    """
+
+    attributes = {layer["name"]: layer.get("attributes") for layer in SCHEMA["layers"]}
+    layers: Dict[str, List[Dict[str, Any]]] = {name: [] for name in LAYER_NAMES}
+    for objl, feat in pairs:
+        props = feat.get("properties") or {}
+        name = layer_for(objl, props, feat.get("geometry"))
+        if name is None:
+            continue
+        keep = attributes[name]
+        if keep is not None:
+            feat = {**feat, "properties": {k: props[k] for k in keep if k in props}}
+        layers[name].append(feat)
+    return {name: feats for name, feats in layers.items() if feats}
+
+
+def vector_layers() -> List[Dict[str, Any]]:
+    """Return TileJSON ``vector_layers`` entries for the schema layers."""
+
+    return [
+        {
+            "id": layer["name"],
+            "description": layer.get("description", ""),
+            "fields": {attr: "" for attr in layer.get("attributes", [])},
+        }
+        for layer in SCHEMA["layers"]
+    ]
+
+
+def _varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _skip(data: bytes, pos: int, wire: int) -> int:
+    if wire == 0:
+        return _varint(data, pos)[1]
+    if wire == 1:
+        return pos + 8
+    if wire == 2:
+        size, pos = _varint(data, pos)
+        return pos + size
+    if wire == 5:
+        return pos + 4
+    raise ValueError(f"unsupported protobuf wire type {wire}")
+
+
+def layer_sizes(data: bytes) -> Dict[str, int]:
+    """Return the encoded size in bytes of every layer of the tile ``data``.
+
+    Only the layer envelopes and names are read; features are not decoded.
+    Layers of the same name (concatenated tiles) are summed.
+    """
+
+    sizes: Dict[str, int] = {}
+    pos = 0
+    while pos < len(data):
+        head = pos
+        tag, pos = _varint(data, pos)
+        if tag != 0x1A:  # Tile.layers, field 3, length-delimited
+            pos = _skip(data, pos, tag & 7)
+            continue
+        size, start = _varint(data, pos)
+        end = start + size
+        name = ""
+        cur = start
+        while cur < end:
+            field, cur = _varint(data, cur)
+            if field == 0x0A:  # Layer.name, field 1
+                length, cur = _varint(data, cur)
+                name = bytes(data[cur : cur + length]).decode("utf-8")
+                break
+            cur = _skip(data, cur, field & 7)
+        sizes[name] = sizes.get(name, 0) + end - head
+        pos = end
+    return sizes
+
+
+__all__ = [
+    "MVT_LAYERS",
+    "SCHEMA",
+    "SCHEMA_PATH",
+    "LAYER_NAMES",
+    "layer_for",
+    "split_features",
+    "vector_layers",
+    "layer_sizes",
+]
@@ -0,0 +1,78 @@
+"""Derive vector tiles beyond a dataset's maxzoom from an ancestor tile.
+
+A tile ``dz`` levels below its ancestor covers ``1 / 2**dz`` of the ancestor
+in each direction.  :func:`overzoom_tile` decodes the ancestor, clips every
+geometry to the child's footprint (plus a buffer so strokes do not show seams
+at tile edges) and rescales the result into the child's extent.  No chart data
+is queried, so high-zoom views of a dataset cost one decode/encode pass.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from mapbox_vector_tile import decode as mvt_decode
+from mapbox_vector_tile import encode as mvt_encode
+from shapely.affinity import affine_transform
+from shapely.geometry import mapping, shape
+from shapely.ops import clip_by_rect
+
+DEFAULT_BUFFER = 64
+
+# Keep tile-space coordinates as stored so clipping rectangles stay simple.
+_OPTIONS = {"y_coord_down": True}
+
+
+def overzoom_tile(
+    data: bytes,
+    dz: int,
+    dx: int,
+    dy: int,
+    *,
+    buffer: int = DEFAULT_BUFFER,
+) -> bytes:
+    """Return the child tile at offset ``(dx, dy)`` ``dz`` levels below ``data``.
+
+    ``dx`` and ``dy`` are the child's column and row within the ancestor, in
+    ``range(2**dz)``.  ``buffer`` is given in child tile units.
+    """
+
+    if dz <= 0:
+        return data
+    scale = 2 ** dz
+    layers: List[Dict[str, Any]] = []
+    per_layer: Dict[str, Dict[str, Any]] = {}
+    for name, layer in mvt_decode(data, default_options=_OPTIONS).items():
+        extent = layer.get("extent", 4096)
+        span = extent / scale
+        pad = buffer / scale
+        minx = dx * span - pad
+        miny = dy * span - pad
+        maxx = (dx + 1) * span + pad
+        maxy = (dy + 1) * span + pad
+        transform = [scale, 0, 0, scale, -dx * extent, -dy * extent]
+        features = []
+        for feat in layer["features"]:
+            geom = shape(feat["geometry"])
+            gx0, gy0, gx1, gy1 = geom.bounds
+            if gx1 < minx or gx0 > maxx or gy1 < miny or gy0 > maxy:
+                continue
+            if geom.geom_type not in ("Point", "MultiPoint"):
+                geom = clip_by_rect(geom, minx, miny, maxx, maxy)
+                if geom.is_empty:
+                    continue
+            child = {
+                "geometry": mapping(affine_transform(geom, transform)),
+                "properties": feat.get("properties", {}),
+            }
+            if "id" in feat:
+                child["id"] = feat["id"]
+            features.append(child)
+        layers.append({"name": name, "features": features})
+        per_layer[name] = {**_OPTIONS, "extents": extent}
+    if not layers:
+        return data
+    return mvt_encode(layers, per_layer_options=per_layer, default_options=_OPTIONS)
+
+
+__all__ = ["overzoom_tile", "DEFAULT_BUFFER"]
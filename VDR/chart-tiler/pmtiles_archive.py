@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""Write PMTiles v3 archives from MBTiles or the tile pipeline.
+
+A PMTiles archive is one file holding a fixed 127-byte header, a root
+directory, JSON metadata, optional leaf directories and the tile data.  Tiles
+are addressed by a Hilbert-curve tile id, so neighbouring tiles sit next to
+each other in the directory and on disk.  Unlike MBTiles the file needs no
+SQLite and can be memory mapped and served with plain slices
+(:mod:`datasource_pmtiles`), which makes it a convenient single-file
+distribution format for one region.
+
+:class:`PMTilesWriter` accepts tiles in any order.  Identical tile payloads
+are stored once and consecutive tile ids sharing a payload collapse into one
+run-length directory entry, so open-ocean and land tiles cost next to
+nothing.  Directories and metadata are gzip compressed; tiles are stored
+gzip compressed as well (``tile_compression``).
+
+Example
+-------
+    $ python pmtiles_archive.py data/enc/us5md11m.mbtiles us5md11m.pmtiles
+
+See https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import sqlite3
+import struct
+import tempfile
+from bisect import bisect_right
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b"PMTiles"
+VERSION = 3
+HEADER_SIZE = 127
+# Clients fetch the header and root directory with one 16 KiB read.
+ROOT_MAX_BYTES = 16384 - HEADER_SIZE
+
+COMPRESSION_UNKNOWN = 0
+COMPRESSION_NONE = 1
+COMPRESSION_GZIP = 2
+COMPRESSION_BROTLI = 3
+COMPRESSION_ZSTD = 4
+
+TILE_TYPE_UNKNOWN = 0
+TILE_TYPE_MVT = 1
+TILE_TYPE_PNG = 2
+TILE_TYPE_JPEG = 3
+TILE_TYPE_WEBP = 4
+TILE_TYPE_AVIF = 5
+
+# MBTiles ``format`` metadata values per PMTiles tile type.
+_MBTILES_FORMATS = {
+    "pbf": TILE_TYPE_MVT,
+    "mvt": TILE_TYPE_MVT,
+    "png": TILE_TYPE_PNG,
+    "jpg": TILE_TYPE_JPEG,
+    "jpeg": TILE_TYPE_JPEG,
+    "webp": TILE_TYPE_WEBP,
+    "avif": TILE_TYPE_AVIF,
+}
+_GZIP_MAGIC = b"\x1f\x8b"
+_HEADER = struct.Struct("<7sB11Q6B4iB2i")
+
+
+# -- tile ids ----------------------------------------------------------------
+
+
+def _rotate(n: int, x: int, y: int, rx: int, ry: int) -> Tuple[int, int]:
+    if ry == 0:
+        if rx == 1:
+            x = n - 1 - x
+            y = n - 1 - y
+        x, y = y, x
+    return x, y
+
+
+def zxy_to_tileid(z: int, x: int, y: int) -> int:
+    """Return the PMTiles (Hilbert) tile id of the XYZ tile ``z/x/y``."""
+
+    if z > 31:
+        raise ValueError("tile zoom exceeds 31")
+    n = 1 << z
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"tile {z}/{x}/{y} outside zoom {z}")
+    # Ids of all lower zoom levels come first: (4**z - 1) / 3 of them.
+    acc = ((1 << (2 * z)) - 1) // 3
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        x, y = _rotate(n, x, y, rx, ry)
+        s >>= 1
+    return acc + d
+
+
+def tileid_to_zxy(tile_id: int) -> Tuple[int, int, int]:
+    """Inverse of :func:`zxy_to_tileid`."""
+
+    z = 0
+    acc = 0
+    while True:
+        count = 1 << (2 * z)
+        if tile_id < acc + count:
+            break
+        acc += count
+        z += 1
+        if z > 31:
+            raise ValueError("tile id exceeds zoom 31")
+    t = tile_id - acc
+    x = y = 0
+    s = 1
+    n = 1 << z
+    while s < n:
+        rx = 1 & (t >> 1)
+        ry = 1 & (t ^ rx)
+        x, y = _rotate(s, x, y, rx, ry)
+        x += s * rx
+        y += s * ry
+        t >>= 2
+        s <<= 1
+    return z, x, y
+
+
+# -- directories ---------------------------------------------------------------
+
+
+class Entry(NamedTuple):
+    """Directory entry; ``run_length == 0`` points at a leaf directory."""
+
+    tile_id: int
+    offset: int
+    length: int
+    run_length: int
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: Sequence[int], pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def compress(data: bytes, compression: int) -> bytes:
+    """Encode ``data`` with a PMTiles compression id."""
+
+    if compression == COMPRESSION_GZIP:
+        return gzip.compress(data, mtime=0)
+    if compression == COMPRESSION_NONE:
+        return data
+    raise ValueError(f"unsupported PMTiles compression {compression}")
+
+
+def decompress(data: bytes, compression: int) -> bytes:
+    """Decode ``data`` stored with a PMTiles compression id."""
+
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    if compression in (COMPRESSION_NONE, COMPRESSION_UNKNOWN):
+        return bytes(data)
+    raise ValueError(f"unsupported PMTiles compression {compression}")
+
+
+def serialize_directory(entries: Sequence[Entry], compression: int) -> bytes:
+    """Encode ``entries`` (sorted by tile id) as a compressed directory."""
+
+    out = bytearray()
+    _write_varint(out, len(entries))
+    last = 0
+    for e in entries:
+        _write_varint(out, e.tile_id - last)
+        last = e.tile_id
+    for e in entries:
+        _write_varint(out, e.run_length)
+    for e in entries:
+        _write_varint(out, e.length)
+    for i, e in enumerate(entries):
+        prev = entries[i - 1] if i else None
+        if prev is not None and e.offset == prev.offset + prev.length:
+            # Contiguous with the previous entry; stored as 0.
+            _write_varint(out, 0)
+        else:
+            _write_varint(out, e.offset + 1)
+    return compress(bytes(out), compression)
+
+
+def deserialize_directory(data: bytes, compression: int) -> List[Entry]:
+    """Decode a directory written by :func:`serialize_directory`."""
+
+    raw = decompress(data, compression)
+    n, pos = _read_varint(raw, 0)
+    ids: List[int] = []
+    last = 0
+    for _ in range(n):
+        delta, pos = _read_varint(raw, pos)
+        last += delta
+        ids.append(last)
+    runs: List[int] = []
+    for _ in range(n):
+        value, pos = _read_varint(raw, pos)
+        runs.append(value)
+    lengths: List[int] = []
+    for _ in range(n):
+        value, pos = _read_varint(raw, pos)
+        lengths.append(value)
+    entries: List[Entry] = []
+    for i in range(n):
+        value, pos = _read_varint(raw, pos)
+        if value == 0 and i > 0:
+            offset = entries[i - 1].offset + entries[i - 1].length
+        else:
+            offset = value - 1
+        entries.append(Entry(ids[i], offset, lengths[i], runs[i]))
+    return entries
+
+
+def find_entry(entries: Sequence[Entry], tile_ids: Sequence[int], tile_id: int) -> Optional[Entry]:
+    """Return the entry covering ``tile_id`` or the leaf that may hold it.
+
+    ``tile_ids`` are the entries' tile ids, kept alongside for bisection.
+    """
+
+    i = bisect_right(tile_ids, tile_id) - 1
+    if i < 0:
+        return None
+    entry = entries[i]
+    if entry.run_length == 0 or tile_id - entry.tile_id < entry.run_length:
+        return entry
+    return None
+
+
+def _leaf_directories(
+    entries: Sequence[Entry], leaf_size: int, compression: int
+) -> Tuple[bytes, bytes]:
+    root: List[Entry] = []
+    leaves = bytearray()
+    for start in range(0, len(entries), leaf_size):
+        chunk = entries[start : start + leaf_size]
+        data = serialize_directory(chunk, compression)
+        root.append(Entry(chunk[0].tile_id, len(leaves), len(data), 0))
+        leaves += data
+    return serialize_directory(root, compression), bytes(leaves)
+
+
+def build_directories(entries: Sequence[Entry], compression: int) -> Tuple[bytes, bytes]:
+    """Return ``(root, leaves)`` with the root small enough for the first read."""
+
+    root = serialize_directory(entries, compression)
+    if len(root) <= ROOT_MAX_BYTES:
+        return root, b""
+    leaf_size = max(4096, len(entries) // 3500)
+    while True:
+        root, leaves = _leaf_directories(entries, leaf_size, compression)
+        if len(root) <= ROOT_MAX_BYTES:
+            return root, leaves
+        leaf_size = int(leaf_size * 1.2)
+
+
+# -- header --------------------------------------------------------------------
+
+
+@dataclass
+class Header:
+    """The fixed-size PMTiles v3 header."""
+
+    root_offset: int = HEADER_SIZE
+    root_length: int = 0
+    metadata_offset: int = 0
+    metadata_length: int = 0
+    leaf_offset: int = 0
+    leaf_length: int = 0
+    tile_data_offset: int = 0
+    tile_data_length: int = 0
+    addressed_tiles: int = 0
+    tile_entries: int = 0
+    tile_contents: int = 0
+    clustered: bool = True
+    internal_compression: int = COMPRESSION_GZIP
+    tile_compression: int = COMPRESSION_GZIP
+    tile_type: int = TILE_TYPE_MVT
+    min_zoom: int = 0
+    max_zoom: int = 0
+    min_lon: float = -180.0
+    min_lat: float = -85.0
+    max_lon: float = 180.0
+    max_lat: float = 85.0
+    center_zoom: int = 0
+    center_lon: float = 0.0
+    center_lat: float = 0.0
+
+    def pack(self) -> bytes:
+        return _HEADER.pack(
+            MAGIC,
+            VERSION,
+            self.root_offset,
+            self.root_length,
+            self.metadata_offset,
+            self.metadata_length,
+            self.leaf_offset,
+            self.leaf_length,
+            self.tile_data_offset,
+            self.tile_data_length,
+            self.addressed_tiles,
+            self.tile_entries,
+            self.tile_contents,
+            int(self.clustered),
+            self.internal_compression,
+            self.tile_compression,
+            self.tile_type,
+            self.min_zoom,
+            self.max_zoom,
+            round(self.min_lon * 1e7),
+            round(self.min_lat * 1e7),
+            round(self.max_lon * 1e7),
+            round(self.max_lat * 1e7),
+            self.center_zoom,
+            round(self.center_lon * 1e7),
+            round(self.center_lat * 1e7),
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "Header":
+        if len(data) < HEADER_SIZE:
+            raise ValueError("truncated PMTiles header")
+        fields = _HEADER.unpack_from(data)
+        if fields[0] != MAGIC:
+            raise ValueError("not a PMTiles archive")
+        if fields[1] != VERSION:
+            raise ValueError(f"unsupported PMTiles version {fields[1]}")
+        ints = fields[2:19]
+        e7 = [v / 1e7 for v in fields[19:23]]
+        return cls(
+            *ints[:11],
+            bool(ints[11]),
+            *ints[12:17],
+            *e7,
+            fields[23],
+            fields[24] / 1e7,
+            fields[25] / 1e7,
+        )
+
+
+# -- writer --------------------------------------------------------------------
+
+
+class PMTilesWriter:
+    """Build a PMTiles archive from tiles added in any order.
+
+    Tile payloads are spooled to a temporary file, deduplicated by content
+    hash, and laid out in tile id order by :meth:`finalize`.  Payloads are
+    stored with ``tile_compression``: uncompressed input is gzip encoded and
+    gzip input passed through as it is.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        tile_type: int = TILE_TYPE_MVT,
+        tile_compression: int = COMPRESSION_GZIP,
+        internal_compression: int = COMPRESSION_GZIP,
+    ) -> None:
+        self.path = Path(path)
+        self.tile_type = tile_type
+        self.tile_compression = tile_compression
+        self.internal_compression = internal_compression
+        self._spool = tempfile.TemporaryFile()
+        self._spool_size = 0
+        # content hash -> (spool offset, length)
+        self._contents: Dict[bytes, Tuple[int, int]] = {}
+        self._tiles: Dict[int, Tuple[int, int]] = {}
+
+    def add_tile(self, z: int, x: int, y: int, data: bytes) -> None:
+        """Add the XYZ tile ``z/x/y``; a repeated address replaces the tile."""
+
+        data = bytes(data)
+        gzipped = data[:2] == _GZIP_MAGIC
+        # Hash the decoded payload so gzip headers (mtime) do not defeat dedupe.
+        raw = gzip.decompress(data) if gzipped else data
+        digest = hashlib.sha1(raw).digest()
+        content = self._contents.get(digest)
+        if content is None:
+            if self.tile_compression == COMPRESSION_GZIP and not gzipped:
+                data = compress(raw, COMPRESSION_GZIP)
+            elif self.tile_compression == COMPRESSION_NONE:
+                data = raw
+            self._spool.write(data)
+            content = (self._spool_size, len(data))
+            self._spool_size += len(data)
+            self._contents[digest] = content
+        self._tiles[zxy_to_tileid(z, x, y)] = content
+
+    def finalize(self, metadata: Optional[Dict[str, Any]] = None, **header: Any) -> Header:
+        """Write the archive and return its header.
+
+        ``header`` overrides :class:`Header` fields such as the bounds and
+        center; zoom levels default to the range of the added tiles.
+        """
+
+        # Lay tile data out in tile id order; duplicates point at the first copy.
+        placed: Dict[Tuple[int, int], int] = {}
+        order: List[Tuple[int, int]] = []
+        entries: List[Entry] = []
+        size = 0
+        for tile_id in sorted(self._tiles):
+            content = self._tiles[tile_id]
+            offset = placed.get(content)
+            if offset is None:
+                offset = placed[content] = size
+                order.append(content)
+                size += content[1]
+            last = entries[-1] if entries else None
+            if (
+                last is not None
+                and last.offset == offset
+                and last.tile_id + last.run_length == tile_id
+            ):
+                entries[-1] = last._replace(run_length=last.run_length + 1)
+            else:
+                entries.append(Entry(tile_id, offset, content[1], 1))
+
+        root, leaves = build_directories(entries, self.internal_compression)
+        meta = compress(
+            json.dumps(metadata or {}, separators=(",", ":")).encode("utf-8"),
+            self.internal_compression,
+        )
+        min_zoom = max_zoom = 0
+        if entries:
+            min_zoom = tileid_to_zxy(entries[0].tile_id)[0]
+            max_zoom = tileid_to_zxy(entries[-1].tile_id + entries[-1].run_length - 1)[0]
+        head = Header(
+            root_length=len(root),
+            metadata_offset=HEADER_SIZE + len(root),
+            metadata_length=len(meta),
+            leaf_offset=HEADER_SIZE + len(root) + len(meta),
+            leaf_length=len(leaves),
+            tile_data_offset=HEADER_SIZE + len(root) + len(meta) + len(leaves),
+            tile_data_length=size,
+            addressed_tiles=len(self._tiles),
+            tile_entries=len(entries),
+            tile_contents=len(order),
+            internal_compression=self.internal_compression,
+            tile_compression=self.tile_compression,
+            tile_type=self.tile_type,
+            min_zoom=min_zoom,
+            max_zoom=max_zoom,
+            center_zoom=min_zoom,
+        )
+        for name, value in header.items():
+            setattr(head, name, value)
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as out:
+            out.write(head.pack())
+            out.write(root)
+            out.write(meta)
+            out.write(leaves)
+            for offset, length in order:
+                self._spool.seek(offset)
+                out.write(self._spool.read(length))
+        tmp.replace(self.path)
+        self._spool.close()
+        return head
+
+    def close(self) -> None:
+        """Discard the spooled tiles without writing an archive."""
+
+        self._spool.close()
+
+
+# -- MBTiles conversion ----------------------------------------------------------
+
+
+def _mbtiles_header(meta: Dict[str, str]) -> Dict[str, Any]:
+    header: Dict[str, Any] = {}
+    if meta.get("minzoom"):
+        header["min_zoom"] = int(meta["minzoom"])
+    if meta.get("maxzoom"):
+        header["max_zoom"] = int(meta["maxzoom"])
+    try:
+        bounds = [float(v) for v in meta.get("bounds", "").split(",")]
+    except ValueError:
+        bounds = []
+    if len(bounds) == 4:
+        header.update(min_lon=bounds[0], min_lat=bounds[1], max_lon=bounds[2], max_lat=bounds[3])
+        header.update(center_lon=(bounds[0] + bounds[2]) / 2, center_lat=(bounds[1] + bounds[3]) / 2)
+    try:
+        center = [float(v) for v in meta.get("center", "").split(",")]
+    except ValueError:
+        center = []
+    if len(center) == 3:
+        header.update(center_lon=center[0], center_lat=center[1], center_zoom=int(center[2]))
+    elif "min_zoom" in header:
+        header["center_zoom"] = header["min_zoom"]
+    return header
+
+
+def mbtiles_to_pmtiles(src: Path | str, dst: Path | str) -> Header:
+    """Convert the MBTiles file ``src`` into the PMTiles archive ``dst``.
+
+    The MBTiles metadata rows become the archive's JSON metadata (the
+    tippecanoe ``json`` row is merged in, so ``vector_layers`` survive), and
+    bounds, center and zoom range go into the header.
+    """
+
+    conn = sqlite3.connect(f"file:{Path(src).resolve()}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT name, value FROM metadata").fetchall())
+        writer = PMTilesWriter(
+            dst, tile_type=_MBTILES_FORMATS.get(meta.get("format", "pbf"), TILE_TYPE_UNKNOWN)
+        )
+        if writer.tile_type not in (TILE_TYPE_MVT, TILE_TYPE_UNKNOWN):
+            # Images are already compressed; store them as they are.
+            writer.tile_compression = COMPRESSION_NONE
+        try:
+            rows = conn.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles")
+            for z, x, tms_y, data in rows:
+                writer.add_tile(z, x, (1 << z) - 1 - tms_y, data)
+        except BaseException:
+            writer.close()
+            raise
+    finally:
+        conn.close()
+    metadata: Dict[str, Any] = {k: v for k, v in meta.items() if k != "json"}
+    if meta.get("json"):
+        metadata.update(json.loads(meta["json"]))
+    return writer.finalize(metadata, **_mbtiles_header(meta))
+
+
+def write_pmtiles(
+    dst: Path | str,
+    tiles: Iterable[Tuple[int, int, int, bytes]],
+    metadata: Optional[Dict[str, Any]] = None,
+    **header: Any,
+) -> Header:
+    """Write XYZ ``(z, x, y, data)`` tiles straight into the archive ``dst``."""
+
+    writer = PMTilesWriter(dst)
+    try:
+        for z, x, y, data in tiles:
+            writer.add_tile(z, x, y, data)
+    except BaseException:
+        writer.close()
+        raise
+    return writer.finalize(metadata, **header)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert MBTiles to a PMTiles v3 archive")
+    parser.add_argument("mbtiles", help="Source .mbtiles file")
+    parser.add_argument("pmtiles", help="Destination .pmtiles file")
+    args = parser.parse_args(argv)
+    header = mbtiles_to_pmtiles(args.mbtiles, args.pmtiles)
+    summary = asdict(header)
+    summary["bytes"] = Path(args.pmtiles).stat().st_size
+    print(json.dumps({k: summary[k] for k in ("addressed_tiles", "tile_entries", "tile_contents", "bytes")}))
+    return 0
+
+
+__all__ = [
+    "Entry",
+    "Header",
+    "PMTilesWriter",
+    "build_directories",
+    "deserialize_directory",
+    "find_entry",
+    "mbtiles_to_pmtiles",
+    "serialize_directory",
+    "tileid_to_zxy",
+    "write_pmtiles",
+    "zxy_to_tileid",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,221 @@
+"""Bounded executor for tile renders with admission control.
+
+Tile handlers run on Starlette's threadpool.  Cache hits are answered there
+directly, but every render (shapely work, S-52 classification, MVT encoding)
+is handed to a dedicated :class:`RenderExecutor` sized by
+``TILE_RENDER_WORKERS``.  At most ``TILE_RENDER_QUEUE`` renders may wait for a
+worker; beyond that :meth:`RenderExecutor.run` raises
+:class:`RenderOverloaded`, which the tile server turns into ``503`` with a
+``Retry-After`` header.  Shedding early keeps request threads free so cached
+tiles stay fast during a burst of misses.
+
+With ``TILE_RENDER_BACKEND=process`` the CPU-heavy part of each render is
+additionally shipped to a :class:`ProcessRenderBackend` so renders are not
+serialised on the GIL.  Worker processes preload the tile server once (see
+:mod:`render_worker`), are recycled after ``TILE_RENDER_MAX_TASKS`` renders and
+the pool is rebuilt when a health check or a render finds it broken.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, TypeVar
+
+import render_worker
+from metrics import (
+    tile_render_inflight,
+    tile_render_queue_depth,
+    tile_render_rejected_total,
+    tile_render_worker_restarts_total,
+    tile_render_worker_seconds_total,
+    tile_render_worker_tasks_total,
+)
+
+T = TypeVar("T")
+
+DEFAULT_RETRY_AFTER = 1
+DEFAULT_MAX_TASKS_PER_CHILD = 500
+
+
+class RenderOverloaded(RuntimeError):
+    """Raised when the render queue is full."""
+
+    def __init__(self, retry_after: int = DEFAULT_RETRY_AFTER) -> None:
+        super().__init__("render queue full")
+        self.retry_after = retry_after
+
+
+class RenderExecutor:
+    """Run render callables on a bounded pool, shedding load when saturated."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_queue: int | None = None,
+        *,
+        retry_after: int | None = None,
+    ) -> None:
+        if workers is None:
+            workers = int(os.environ.get("TILE_RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+        if max_queue is None:
+            max_queue = int(os.environ.get("TILE_RENDER_QUEUE", 4 * workers))
+        if retry_after is None:
+            retry_after = int(os.environ.get("TILE_RENDER_RETRY_AFTER", DEFAULT_RETRY_AFTER))
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor: Executor = ThreadPoolExecutor(self.workers, thread_name_prefix="tile-render")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of renders waiting for a worker."""
+
+        with self._lock:
+            return self._pending - self._running
+
+    def run(self, fn: Callable[[], T]) -> T:
+        """Run ``fn`` on the pool and return its result.
+
+        Raises :class:`RenderOverloaded` without running ``fn`` when
+        ``workers + max_queue`` renders are already pending.  ``fn`` must not
+        wait on other renders: a worker blocked on work queued behind it
+        deadlocks a small pool.
+        """
+
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                tile_render_rejected_total.inc()
+                raise RenderOverloaded(self.retry_after)
+            self._pending += 1
+            self._update()
+        try:
+            return self._executor.submit(self._call, fn).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._update()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    # -- internals ---------------------------------------------------------
+    def _call(self, fn: Callable[[], T]) -> T:
+        with self._lock:
+            self._running += 1
+            self._update()
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._update()
+
+    def _update(self) -> None:
+        tile_render_inflight.set(self._pending)
+        tile_render_queue_depth.set(self._pending - self._running)
+
+
+class ProcessRenderBackend:
+    """Render tiles by renderer name on a pool of worker processes."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_tasks_per_child: int | None = None,
+    ) -> None:
+        if workers is None:
+            workers = int(os.environ.get("TILE_RENDER_WORKERS", os.cpu_count() or 1))
+        if max_tasks_per_child is None:
+            max_tasks_per_child = int(
+                os.environ.get("TILE_RENDER_MAX_TASKS", DEFAULT_MAX_TASKS_PER_CHILD)
+            )
+        self.workers = max(1, workers)
+        self.max_tasks_per_child = max(1, max_tasks_per_child)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Each pool gets its own slot flags so workers of a replaced pool that
+        # are still exiting cannot hold slots of the new one.
+        slots = self._ctx.Array("b", self.workers)
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=self._ctx,
+            initializer=render_worker.init_worker,
+            initargs=(slots,),
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is not broken:
+                return  # another thread already replaced it
+            tile_render_worker_restarts_total.inc()
+            self._pool = self._new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, kind: str, *args: Any) -> Any:
+        """Return ``tileserver._RENDERERS[kind](*args)`` computed in a worker.
+
+        A render that finds the pool broken (a worker crashed) rebuilds it and
+        is retried once.
+        """
+
+        for attempt in (0, 1):
+            pool = self._pool
+            try:
+                slot, elapsed, result = pool.submit(render_worker.run, kind, *args).result()
+                break
+            except BrokenProcessPool:
+                self._restart(pool)
+                if attempt:
+                    raise
+        worker = str(slot)
+        tile_render_worker_tasks_total.labels(worker=worker).inc()
+        tile_render_worker_seconds_total.labels(worker=worker).inc(elapsed)
+        return result
+
+    def check(self) -> bool:
+        """Return ``True`` unless the pool is broken or a worker died.
+
+        Only the worker processes are inspected; nothing is queued, so a pool
+        saturated with renders still reports healthy.  A broken pool is
+        replaced before returning ``False``.
+        """
+
+        pool = self._pool
+        # Recycled workers exit with status 0 before being replaced.
+        processes = list((pool._processes or {}).values())
+        if not pool._broken and all(p.is_alive() or p.exitcode == 0 for p in processes):
+            return True
+        self._restart(pool)
+        return False
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def backend_from_env() -> ProcessRenderBackend | None:
+    """Return a process backend if ``TILE_RENDER_BACKEND=process``."""
+
+    if os.environ.get("TILE_RENDER_BACKEND", "thread") == "process":
+        return ProcessRenderBackend()
+    return None
+
+
+__all__ = [
+    "RenderExecutor",
+    "RenderOverloaded",
+    "ProcessRenderBackend",
+    "backend_from_env",
+    "DEFAULT_RETRY_AFTER",
+    "DEFAULT_MAX_TASKS_PER_CHILD",
+]
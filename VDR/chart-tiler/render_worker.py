@@ -0,0 +1,64 @@
+"""Entry points executed inside render worker processes.
+
+Each worker imports :mod:`tileserver` once in :func:`init_worker`, which loads
+the S-52 colour tables, symbols and bridge bindings, and warms the default
+classifier.  Renders are then requested by renderer name and plain, picklable
+arguments; only the encoded tile bytes travel back to the parent.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from multiprocessing import util
+from typing import Any, Tuple
+
+_slot = 0
+
+
+def init_worker(slots: Any) -> None:
+    """Preload the tile server in a freshly started worker process.
+
+    ``slots`` is a shared array with one flag per pool slot.  The worker
+    claims a free slot for its metrics label and releases it on exit, so a
+    recycled worker's replacement reuses the same series.
+    """
+
+    global _slot
+    _slot = _claim_slot(slots)
+    # The worker renders in-process; never start a nested process pool.
+    os.environ["TILE_RENDER_BACKEND"] = "thread"
+    import tileserver
+
+    tileserver._get_classifier(tileserver.DEFAULT_CONFIG)
+
+
+def _claim_slot(slots: Any) -> int:
+    with slots.get_lock():
+        for slot, taken in enumerate(slots):
+            if not taken:
+                slots[slot] = 1
+                break
+        else:
+            # Only if a replacement starts before its predecessor exited.
+            return os.getpid()
+    util.Finalize(None, _release_slot, args=(slots, slot), exitpriority=10)
+    return slot
+
+
+def _release_slot(slots: Any, slot: int) -> None:
+    with slots.get_lock():
+        slots[slot] = 0
+
+
+def run(kind: str, *args: Any) -> Tuple[int, float, Any]:
+    """Render with ``tileserver._RENDERERS[kind]`` returning slot, time and result."""
+
+    import tileserver
+
+    start = time.perf_counter()
+    result = tileserver._RENDERERS[kind](*args)
+    return _slot, time.perf_counter() - start, result
+
+
+__all__ = ["init_worker", "run"]
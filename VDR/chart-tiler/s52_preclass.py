@@ -3,7 +3,9 @@ from __future__ import annotations
 """Minimal S-52 Day palette pre-classification."""
 
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
 
 
 @dataclass(frozen=True)
@@ -14,14 +16,136 @@ class ContourConfig:
     hazardBuffer: float | None = None
 
 
+# Objects whose portrayal depends on the mariner's safety settings.
+MARINER_OBJECTS = frozenset({"DEPARE", "DEPCNT", "SOUNDG", "OBSTRN", "WRECKS", "UWTROC", "ROCKS"})
+HAZARD_OBJECTS = frozenset({"OBSTRN", "WRECKS", "UWTROC", "ROCKS"})
+
+_NUMBER = (int, float)
+
+# Attributes read with ``isinstance(v, (int, float))`` by :meth:`classify`,
+# per object class.
+_NUMERIC_ATTRS: Dict[str, Tuple[str, ...]] = {
+    "DEPARE": ("DRVAL1", "DRVAL2"),
+    "SOUNDG": ("VALSOU",),
+    **{objl: ("VALSOU",) for objl in HAZARD_OBJECTS},
+}
+
+
+def _parsed(value: Any, parse=float) -> float:
+    try:
+        return float(parse(value))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _objects(values: List[Any]) -> np.ndarray:
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+def batch_columns(objl: str, props: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Return the attribute columns :meth:`S52PreClassifier.classify_batch` reads.
+
+    Numeric attributes become ``float64`` arrays with ``NaN`` where a feature
+    lacks a usable value, parsed the same way :meth:`~S52PreClassifier.classify`
+    parses them.  ``SCAMIN`` (copied as-is into the output), navaid categories
+    and names stay object arrays with ``None`` for missing values.
+    """
+
+    nan = np.nan
+    cols: Dict[str, np.ndarray] = {
+        "SCAMIN": _objects(
+            [v if isinstance(v := p.get("SCAMIN"), _NUMBER) else None for p in props]
+        ),
+        "QUAPOS": np.array(
+            [v if isinstance(v := p.get("QUAPOS", 0), _NUMBER) else _parsed(v) for p in props],
+            dtype=float,
+        ),
+    }
+    for name in _NUMERIC_ATTRS.get(objl, ()):
+        cols[name] = np.array(
+            [v if isinstance(v := p.get(name), _NUMBER) else nan for p in props], dtype=float
+        )
+    if objl == "DEPCNT":
+        cols["VALDCO"] = np.array([float(p.get("VALDCO", -9999)) for p in props], dtype=float)
+    if objl in HAZARD_OBJECTS:
+        cols["WATLEV"] = np.array([_parsed(p.get("WATLEV"), int) for p in props], dtype=float)
+    if objl.startswith("BCN") or objl.startswith("BOY"):
+        cats = []
+        for p in props:
+            cat = None
+            for k, v in p.items():
+                if k.startswith("CAT"):
+                    cat = v
+                    break
+            cats.append(cat)
+        cols["CAT"] = _objects(cats)
+        cols["name"] = _objects([p.get("OBJNAM") or p.get("NOBJNM") for p in props])
+        cols["ORIENT"] = np.array(
+            [v if isinstance(v := p.get("ORIENT"), _NUMBER) else nan for p in props], dtype=float
+        )
+    if objl in {"CBLARE", "PIPARE"}:
+        cols["pattern"] = _objects([p.get("lnstl") or p.get("LSTYLE") for p in props])
+    return cols
+
+
+class BatchResult:
+    """Columnar output of :meth:`S52PreClassifier.classify_batch`.
+
+    ``columns`` maps each attribute to ``(values, present)`` arrays in the
+    order :meth:`S52PreClassifier.classify` would add it; ``present`` marks the
+    features that carry the attribute.
+    """
+
+    __slots__ = ("size", "columns")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def set(self, name: str, values: Any, present: Any = True) -> None:
+        values = np.broadcast_to(np.asarray(values), (self.size,))
+        present = np.broadcast_to(np.asarray(present, dtype=bool), (self.size,))
+        if present.any():
+            self.columns[name] = (values, present)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Return per-feature dictionaries equal to :meth:`classify` output."""
+
+        out: List[Dict[str, Any]] = [{} for _ in range(self.size)]
+        self.update(out)
+        return out
+
+    def update(self, props: Sequence[Dict[str, Any]]) -> None:
+        """Merge the results into ``props`` like ``props.update(classify(...))``."""
+
+        for name, (values, present) in self.columns.items():
+            vals = values.tolist()
+            if present.all():
+                for target, value in zip(props, vals):
+                    target[name] = value
+            else:
+                for i in np.flatnonzero(present).tolist():
+                    props[i][name] = vals[i]
+
+
 class S52PreClassifier:
-    """Apply a very small subset of S-52 conditional symbology rules."""
+    """Apply a very small subset of S-52 conditional symbology rules.
+
+    With ``agnostic`` set, attributes that depend on the mariner settings
+    (``isShallow``, ``depthBand``, ``fillToken``, safety roles and hazard icons)
+    are not emitted; the style evaluates the raw depth attributes instead so a
+    single tile serves every safety contour.
+    """
 
     def __init__(
         self,
         config: ContourConfig | float,
         colors: Dict[str, str],
         symbols: Optional[Dict[str, Dict[str, Any]]] = None,
+        agnostic: bool = False,
+        rules: Any = None,
     ):
         if isinstance(config, ContourConfig):
             self.cfg = config
@@ -30,10 +154,27 @@ class S52PreClassifier:
             self.cfg = ContourConfig(safety=sc, shallow=sc, deep=sc)
         self.colors = colors
         self.symbols = symbols or {}
+        self.agnostic = agnostic
+        # Compiled chartsymbols lookups (``s52_ruletable.RuleTable``).
+        self.rules = rules
         # State to track safety contour when exact match missing
         self._nearest_cnt: Optional[tuple[float, Dict[str, Any]]] = None
         self._has_exact_safety = False
 
+    def portray(
+        self, objl: str, props: Dict[str, Any], geom_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return lookup-table portrayal attributes (``symbol``, ``areaColor`` …).
+
+        The attributes come from the compiled chartsymbols rules and cover
+        every object class; :meth:`classify` adds the conditional symbology
+        on top.  Without rules nothing is returned.
+        """
+
+        if self.rules is None:
+            return {}
+        return self.rules.portrayal(objl, props, geom_type)
+
     def classify(self, objl: str, props: Dict[str, Any]) -> Dict[str, Any]:
         """Return style helper attributes based on object and properties."""
         result: Dict[str, Any] = {}
@@ -47,6 +188,9 @@ class S52PreClassifier:
         except (TypeError, ValueError):
             pass
 
+        if self.agnostic and objl in MARINER_OBJECTS:
+            return result
+
         if objl == "DEPARE":
             d1 = props.get("DRVAL1")
             d2 = props.get("DRVAL2")
@@ -140,6 +284,106 @@ class S52PreClassifier:
         # LNDARE/COALNE and other objects use static styling
         return result
 
+    def classify_batch(self, objl: str, cols: Mapping[str, np.ndarray]) -> BatchResult:
+        """Classify many features of class ``objl`` at once.
+
+        ``cols`` holds attribute columns as produced by :func:`batch_columns`.
+        The result matches calling :meth:`classify` on every feature, except
+        that the per-instance state used by :meth:`finalize` is not tracked;
+        tiles use :meth:`finalize_tile` instead.
+        """
+
+        size = len(cols["QUAPOS"])
+        res = BatchResult(size)
+        scamin = cols["SCAMIN"]
+        res.set("scamin", scamin, np.not_equal(scamin, None))
+        res.set("isLowAcc", True, cols["QUAPOS"] >= 2)
+        cfg = self.cfg
+
+        if self.agnostic and objl in MARINER_OBJECTS:
+            return res
+
+        if objl == "DEPARE":
+            d1, d2 = cols["DRVAL1"], cols["DRVAL2"]
+            with np.errstate(invalid="ignore"):
+                min_val = np.fmin(d1, d2)
+                max_val = np.fmax(d1, d2)
+            is_shallow = min_val < cfg.safety
+            shallow_token = "DEPVS" if "DEPVS" in self.colors else "DEPIT1"
+            deep = ~is_shallow & (max_val >= cfg.safety)
+            token = np.where(is_shallow, shallow_token, "DEPDW").astype(object)
+            band = np.where(
+                min_val < cfg.shallow, "VS", np.where(max_val >= cfg.deep, "DW", "IM")
+            ).astype(object)
+            res.set("isShallow", is_shallow)
+            res.set("depthBand", band)
+            res.set("fillToken", token, is_shallow | deep)
+            return res
+
+        if objl == "DEPCNT":
+            is_safety = cols["VALDCO"] == cfg.safety
+            res.set("isSafety", is_safety)
+            res.set("role", np.where(is_safety, "safety", "normal").astype(object))
+            if is_safety.any():
+                self._has_exact_safety = True
+            return res
+
+        if objl == "SOUNDG":
+            res.set("isShallow", cols["VALSOU"] < cfg.safety)
+            return res
+
+        if objl in HAZARD_OBJECTS:
+            watlev = cols["WATLEV"]
+            shallow = cols["VALSOU"] < cfg.safety
+            drying = (watlev == 1) | (watlev == 2)
+            if objl == "WRECKS":
+                icon = np.where(shallow, "DANGER51", "ISODGR51")
+            elif objl == "ROCKS":
+                icon = np.where(drying, "ISODGR51", "ROCKS01")
+            else:
+                icon = np.full(size, "ISODGR51")
+            has_icon = shallow | drying
+            if self.symbols:
+                has_icon &= np.isin(icon, list(self.symbols))
+            if not has_icon.any():
+                return res
+            res.set("hazardIcon", icon.astype(object), has_icon)
+            if cfg.hazardBuffer is not None:
+                res.set("hazardBuffer", cfg.hazardBuffer, has_icon)
+            offx = np.zeros(size, dtype=np.int64)
+            offy = np.zeros(size, dtype=np.int64)
+            anchored = np.zeros(size, dtype=bool)
+            for name in np.unique(icon[has_icon]).tolist():
+                meta = self.symbols.get(name) if self.symbols else None
+                if not (meta and meta.get("anchor")):
+                    continue
+                ax, ay = meta["anchor"]
+                rows = has_icon & (icon == name)
+                offx[rows] = int(round(meta.get("w", 0) / 2 - ax))
+                offy[rows] = int(round(meta.get("h", 0) / 2 - ay))
+                anchored |= rows
+            res.set("hazardOffX", offx, anchored)
+            res.set("hazardOffY", offy, anchored)
+            has_watlev = has_icon & ~np.isnan(watlev)
+            res.set("hazardWatlev", np.nan_to_num(watlev).astype(np.int64), has_watlev)
+            return res
+
+        if objl.startswith("BCN") or objl.startswith("BOY"):
+            icons = [objl if c is None else f"{objl}_{c}" for c in cols["CAT"].tolist()]
+            res.set("navaidIcon", _objects(icons))
+            orient = cols["ORIENT"]
+            res.set("orient", orient, ~np.isnan(orient))
+            names = cols["name"]
+            res.set("name", names, np.fromiter((bool(n) for n in names), bool, size))
+            return res
+
+        if objl in {"CBLARE", "PIPARE"}:
+            pattern = cols["pattern"]
+            res.set("linePattern", pattern, np.isin(pattern, ["dash", "dot", "dashdot"]))
+            return res
+
+        return res
+
     # ------------------------------------------------------------------
     @staticmethod
     def _geom_length(geom: Dict[str, Any]) -> float:
@@ -184,6 +428,35 @@ class S52PreClassifier:
         _, _, best_idx = min(pool)
         return {best_idx}
 
+    @staticmethod
+    def contour_candidates(contours: list[Dict[str, Any]]) -> None:
+        """Annotate contours with the neighbouring ``VALDCO`` values present.
+
+        Each contour gets ``cntPrev`` (next shallower value) and ``cntNext``
+        (next deeper value) when they exist.  A style can then pick the safety
+        contour for any depth ``S`` as the contour with ``cntPrev < S <= VALDCO``
+        or, when every contour is shallower than ``S``, the one without
+        ``cntNext`` – the depth :meth:`finalize_tile` would promote.
+        """
+
+        depths: list[float] = []
+        for feat in contours:
+            try:
+                depths.append(float(feat.get("properties", {}).get("VALDCO")))
+            except (TypeError, ValueError):
+                depths.append(float("nan"))
+        values = sorted({d for d in depths if d == d})
+        index = {v: i for i, v in enumerate(values)}
+        for feat, depth in zip(contours, depths):
+            i = index.get(depth)
+            if i is None:
+                continue
+            props = feat.setdefault("properties", {})
+            if i > 0:
+                props["cntPrev"] = values[i - 1]
+            if i + 1 < len(values):
+                props["cntNext"] = values[i + 1]
+
     def finalize(self) -> None:
         """Apply post-processing once all features have been classified."""
 
@@ -0,0 +1,156 @@
+"""Zoom-dependent geometry simplification for Python-rendered tiles.
+
+The SQL ``enc_mvt`` function simplifies geometries by zoom before encoding;
+the Python render path does the same in tile space.  After
+:func:`mvt_builder.tile_geometries` has projected and clipped a tile's
+geometries, lines and polygons are simplified with topology-preserving
+Douglas-Peucker at the tolerance configured for the zoom in
+``config/portrayal/simplify.yml`` (in tile units, 1/4096 of a tile).
+
+Projection, clipping and simplification do not depend on the mariner
+settings, so :class:`GeometryCache` keeps the result per dataset version and
+tile, bounded by tile count and by an estimate of the geometries' size.  Renders of the same tile for other safety depths or in agnostic mode
+reuse it and only classify and encode.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import shapely
+import yaml
+
+from metrics import (
+    tile_geometry_cache_bytes,
+    tile_geometry_cache_entries,
+    tile_geometry_cache_hits_total,
+    tile_geometry_cache_misses_total,
+)
+
+_BASE = Path(__file__).resolve().parent
+DEFAULT_CACHE_TILES = 512
+DEFAULT_CACHE_BYTES = 128 * 1024 * 1024
+# GEOS keeps three doubles per coordinate; each geometry also carries a
+# Python wrapper and a GEOS object.
+_COORD_BYTES = 24
+_GEOMETRY_OVERHEAD = 200
+
+with open(_BASE / "config" / "portrayal" / "simplify.yml", "r", encoding="utf-8") as f:
+    _TOLERANCES: List[Dict[str, float]] = sorted(yaml.safe_load(f) or [], key=lambda r: r["zmax"])
+
+
+def tolerance_for(z: int) -> float:
+    """Return the simplification tolerance in tile units for zoom ``z``."""
+
+    for rule in _TOLERANCES:
+        if z <= rule["zmax"]:
+            return float(rule["tolerance"])
+    return 0.0
+
+
+def simplify_geometries(geoms: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify ``geoms`` (an array of shapely geometries) in one call.
+
+    Points are returned unchanged; lines and polygons keep their topology
+    (rings do not self-intersect or collapse).
+    """
+
+    if tolerance <= 0 or not len(geoms):
+        return geoms
+    return shapely.simplify(geoms, tolerance, preserve_topology=True)
+
+
+def geometry_nbytes(geoms: np.ndarray) -> int:
+    """Return an estimate of the memory held by the geometries in ``geoms``."""
+
+    if not len(geoms):
+        return geoms.nbytes
+    coords = int(shapely.get_num_coordinates(geoms).sum())
+    return geoms.nbytes + len(geoms) * _GEOMETRY_OVERHEAD + coords * _COORD_BYTES
+
+
+class GeometryCache:
+    """LRU of per-tile geometry arrays keyed by dataset, version and tile.
+
+    Each entry also stores a fingerprint of the features it was built from
+    (their object classes); a lookup with a different fingerprint is a miss.
+    The cache holds at most ``max_tiles`` entries and ``max_bytes`` as
+    estimated by :func:`geometry_nbytes`.
+    """
+
+    def __init__(self, max_tiles: int = DEFAULT_CACHE_TILES, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_tiles = max_tiles
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, np.ndarray, int]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable, fingerprint: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None or entry[0] != fingerprint:
+            tile_geometry_cache_misses_total.inc()
+            return None
+        tile_geometry_cache_hits_total.inc()
+        return entry[1]
+
+    def put(self, key: Hashable, fingerprint: Hashable, geoms: np.ndarray) -> None:
+        if self.max_tiles <= 0:
+            return
+        size = geometry_nbytes(geoms)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (fingerprint, geoms, size)
+            self._bytes += size
+            while len(self._entries) > self.max_tiles or self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+            self._update()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._update()
+
+    def _update(self) -> None:
+        tile_geometry_cache_bytes.set(self._bytes)
+        tile_geometry_cache_entries.set(len(self._entries))
+
+
+def cache_from_env() -> GeometryCache:
+    """Create the geometry cache sized by ``TILE_GEOMETRY_CACHE_TILES`` and ``_BYTES``."""
+
+    return GeometryCache(
+        int(os.environ.get("TILE_GEOMETRY_CACHE_TILES", DEFAULT_CACHE_TILES)),
+        int(os.environ.get("TILE_GEOMETRY_CACHE_BYTES", DEFAULT_CACHE_BYTES)),
+    )
+
+
+__all__ = [
+    "tolerance_for",
+    "simplify_geometries",
+    "geometry_nbytes",
+    "GeometryCache",
+    "cache_from_env",
+    "DEFAULT_CACHE_TILES",
+    "DEFAULT_CACHE_BYTES",
+]
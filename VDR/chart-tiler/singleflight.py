@@ -0,0 +1,72 @@
+"""Coalesce concurrent calls for the same key into a single execution.
+
+When many clients request the same uncached tile at once only the first caller
+(the *leader*) runs the render function.  Every other caller arriving while the
+render is in flight blocks on the leader's result and shares its bytes.  The
+leader's exception is re-raised in every waiter so failures are not retried N
+times either.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Generic, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one in-flight call per key.
+
+    ``do`` returns ``(value, shared)`` where ``shared`` is ``True`` when the
+    caller waited on another thread's call instead of running ``fn`` itself.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call[T]] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True  # type: ignore[return-value]
+
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, False
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being computed."""
+
+        with self._lock:
+            return len(self._calls)
+
+
+__all__ = ["SingleFlight"]
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def styling_dist(tmp_path, monkeypatch) -> Path:
+    """Point the tile server's styling assets at a minimal ``dist`` in ``tmp_path``."""
+
+    import tileserver
+    from asset_cache import AssetCache
+
+    dist = tmp_path / "dist"
+    (dist / "sprites").mkdir(parents=True)
+    (dist / "assets" / "s52").mkdir(parents=True)
+    (dist / "sprites" / "s52-day.json").write_text("{}")
+    (dist / "assets" / "s52" / "chartsymbols.xml").write_text(
+        "<root><color-table name='DAY_BRIGHT'></color-table></root>"
+    )
+    monkeypatch.setattr(tileserver, "STYLING_DIST", dist)
+    monkeypatch.setattr(tileserver, "_asset_cache", AssetCache(dist))
+    monkeypatch.setattr(tileserver, "_chartsymbols_path", dist / "assets" / "s52" / "chartsymbols.xml")
+    monkeypatch.setattr(tileserver, "_rules_path", dist / "assets" / "s52" / "s52rules.bin")
+    return dist
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from mapbox_vector_tile import decode
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from registry import Dataset
+from s52_preclass import S52PreClassifier
+
+
+def _contour(val: float) -> dict:
+    return {
+        "geometry": {"type": "LineString", "coordinates": [[0, 0], [0, 1]]},
+        "properties": {"OBJL": "DEPCNT", "VALDCO": val},
+    }
+
+
+def test_contour_candidates() -> None:
+    feats = [_contour(v) for v in (20, 5, 10, 10)]
+    S52PreClassifier.contour_candidates(feats)
+    props = [f["properties"] for f in feats]
+    assert props[1].get("cntPrev") is None and props[1]["cntNext"] == 10
+    assert props[2]["cntPrev"] == 5 and props[2]["cntNext"] == 20
+    assert props[3]["cntPrev"] == 5
+    assert props[0]["cntPrev"] == 10 and "cntNext" not in props[0]
+
+
+def test_agnostic_classifier_keeps_raw_depths() -> None:
+    clf = S52PreClassifier(10.0, {}, agnostic=True)
+    assert clf.classify("DEPARE", {"DRVAL1": 2, "DRVAL2": 5}) == {}
+    assert clf.classify("WRECKS", {"VALSOU": 1}) == {}
+    assert clf.classify("DEPCNT", {"VALDCO": 10, "QUAPOS": 4}) == {"isLowAcc": True}
+
+
+def test_agnostic_tiles_share_cache(monkeypatch) -> None:
+    calls = []
+
+    def _query(ds, bbox, scale):
+        calls.append(bbox)
+        return [
+            {
+                "geometry": {"type": "LineString", "coordinates": [[bbox[0], bbox[1]], [bbox[2], bbox[3]]]},
+                "properties": {"OBJL": "DEPCNT", "VALDCO": val},
+            }
+            for val in (5.0, 10.0)
+        ]
+
+    dataset = Dataset("agn", "agn", Path("a.mbtiles"), [0, 0, 0, 0], 0, 16, 1.0)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", 1)
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+
+    first = client.get("/tiles/enc/agn/12/800/1200?mode=agnostic&safety=10")
+    second = client.get("/tiles/enc/agn/12/800/1200?mode=agnostic&safety=30")
+    assert first.status_code == 200
+    assert first.headers["X-Tile-Cache"] == "miss"
+    assert second.headers["X-Tile-Cache"] == "hit"
+    assert second.content == first.content
+    assert len(calls) == 1
+
+    layer = next(iter(decode(first.content).values()))
+    props = sorted((f["properties"] for f in layer["features"]), key=lambda p: p["VALDCO"])
+    assert props[0]["cntNext"] == 10 and props[1]["cntPrev"] == 5
+    assert not any("role" in p for p in props)
+
+    # mariner tiles still render per safety setting
+    client.get("/tiles/enc/agn/12/800/1200?safety=10")
+    assert len(calls) == 2
+    assert client.get("/tiles/enc/agn/12/800/1200?mode=other").status_code == 422
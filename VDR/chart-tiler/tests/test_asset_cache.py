@@ -0,0 +1,35 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from asset_cache import AssetCache
+
+
+def test_assets_are_cached_until_mtime_changes(tmp_path) -> None:
+    path = tmp_path / "style.json"
+    path.write_bytes(b"{}" * 400)
+    cache = AssetCache(tmp_path)
+    first = cache.get("style.json")
+    assert first.data == b"{}" * 400
+    assert first.gzip is not None
+    assert cache.get("style.json") is first
+
+    path.write_bytes(b"[]" * 400)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    second = cache.get("style.json")
+    assert second.data == b"[]" * 400
+    assert second.etag != first.etag
+
+
+def test_missing_and_uncompressed_assets(tmp_path) -> None:
+    cache = AssetCache(tmp_path)
+    assert cache.get("nope.json") is None
+    (tmp_path / "sprite.png").write_bytes(b"\x89PNG" * 300)
+    assert cache.get("sprite.png", compress=False).gzip is None
+    (tmp_path / "sprite.png").unlink()
+    assert cache.get("sprite.png") is None
+    assert len(cache) == 0
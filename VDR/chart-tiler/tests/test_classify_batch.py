@@ -0,0 +1,48 @@
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from s52_preclass import ContourConfig, S52PreClassifier, batch_columns
+
+_VALUES = [None, 0, 2, 5.5, 10, 12.0, 35, "7", "x", True]
+_ATTRS = ["SCAMIN", "QUAPOS", "VALSOU", "DRVAL1", "DRVAL2", "WATLEV", "ORIENT"]
+
+
+def _features(objl: str, n: int, rng: random.Random) -> list[dict]:
+    feats = []
+    for _ in range(n):
+        props = {name: rng.choice(_VALUES) for name in _ATTRS if rng.random() < 0.7}
+        if objl == "DEPCNT":
+            props["VALDCO"] = rng.choice([5, 10, 10.0, 20, "30"])
+        if objl.startswith("BOY"):
+            if rng.random() < 0.6:
+                props["CATLAM"] = rng.choice([1, 2, None])
+            props["OBJNAM"] = rng.choice(["", "Alpha", None])
+        if objl == "CBLARE":
+            props["lnstl"] = rng.choice(["dash", "solid", None])
+        feats.append(props)
+    return feats
+
+
+def test_batch_matches_per_feature() -> None:
+    rng = random.Random(7)
+    symbols = {"DANGER51": {"w": 10, "h": 8, "anchor": [2, 3]}, "ISODGR51": {"w": 6, "h": 6}}
+    classifiers = [
+        S52PreClassifier(ContourConfig(), {"DEPVS": "#fff"}),
+        S52PreClassifier(ContourConfig(safety=5.5, hazardBuffer=2.0), {}, symbols=symbols),
+        S52PreClassifier(ContourConfig(), {}, agnostic=True),
+    ]
+    objls = ["DEPARE", "DEPCNT", "SOUNDG", "WRECKS", "ROCKS", "OBSTRN", "BOYLAT", "CBLARE", "LNDARE"]
+    for clf in classifiers:
+        for objl in objls:
+            props = _features(objl, 200, rng)
+            expected = [clf.classify(objl, p) for p in props]
+            rows = clf.classify_batch(objl, batch_columns(objl, props)).rows()
+            assert rows == expected, objl
+            for row, exp in zip(rows, expected):
+                assert list(row) == list(exp)
+                assert [type(v) for v in row.values()] == [type(v) for v in exp.values()]
+
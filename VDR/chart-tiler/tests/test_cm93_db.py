@@ -15,16 +15,8 @@ FIX = Path(__file__).parent / "fixtures" / "cm93"
 
 
 def _conn():
-    c = sqlite3.connect(":memory:")
-    c.execute("CREATE TABLE cm93_pts(cell_id INTEGER, geom TEXT)")
-    c.execute("CREATE TABLE cm93_ln(cell_id INTEGER, geom TEXT)")
-    c.execute("CREATE TABLE cm93_ar(cell_id INTEGER, geom TEXT)")
-    c.execute("CREATE TABLE cm93_labels(cell_id INTEGER, text TEXT, geom TEXT)")
-    c.execute("CREATE TABLE cm93_lights(cell_id INTEGER, geom TEXT, attrs TEXT)")
-    c.execute(
-        "CREATE TABLE cm93_cells(cell_id INTEGER PRIMARY KEY, bbox TEXT, offset_dx REAL, offset_dy REAL, meta_hash TEXT)"
-    )
-    return c
+    # stream_to_db creates the cm93_store schema itself
+    return sqlite3.connect(":memory:")
 
 
 def _features():
@@ -36,15 +28,45 @@ def test_stream_to_db_reimport():
     feats = _features()
     offsets = _load_offsets(FIX / "offsets.csv")
     conn = _conn()
-    stream_to_db(feats, offsets, conn, bulk=True)
+    stream_to_db(feats, offsets, conn)
     # importing again should replace data rather than duplicate
-    stream_to_db(feats, offsets, conn, bulk=True)
+    stream_to_db(feats, offsets, conn)
     cur = conn.execute("SELECT COUNT(*) FROM cm93_cells")
     assert cur.fetchone()[0] == 2
     cur = conn.execute("SELECT COUNT(*) FROM cm93_ar")
     assert cur.fetchone()[0] == 2
+    cur = conn.execute("SELECT COUNT(*) FROM cm93_ar_rtree")
+    assert cur.fetchone()[0] == 2
     cur = conn.execute("SELECT bbox, offset_dx FROM cm93_cells WHERE cell_id=1")
     bbox, dx = cur.fetchone()
     nums = list(map(float, bbox.split(",")))
     assert all(abs(a - b) < 1e-6 for a, b in zip(nums, [0.0, 0.0, 1.0, 1.0]))
     assert abs(dx + 1113.1576) < 1e-4
+
+
+def test_stream_to_db_converts_wkt_tables():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE cm93_pts(cell_id INTEGER, geom TEXT)")
+    conn.execute("CREATE TABLE cm93_ln(cell_id INTEGER, geom TEXT)")
+    conn.execute("CREATE TABLE cm93_ar(cell_id INTEGER, geom TEXT)")
+    conn.execute("CREATE TABLE cm93_labels(cell_id INTEGER, text TEXT, geom TEXT)")
+    conn.execute("CREATE TABLE cm93_lights(cell_id INTEGER, geom TEXT, attrs TEXT)")
+    conn.execute(
+        "CREATE TABLE cm93_cells(cell_id INTEGER PRIMARY KEY, bbox TEXT, offset_dx REAL, offset_dy REAL, meta_hash TEXT)"
+    )
+    conn.execute("INSERT INTO cm93_pts VALUES (3, 'POINT (5 5)')")
+    conn.execute("INSERT INTO cm93_labels VALUES (3, 'Harbour', 'POINT (5 6)')")
+    conn.execute(
+        "INSERT INTO cm93_lights VALUES (3, 'POINT (6 6)', ?)",
+        (json.dumps({"cell_id": 3, "objl": "LIGHTS", "LITCHR": "Fl"}),),
+    )
+    conn.commit()
+
+    stream_to_db(_features(), _load_offsets(FIX / "offsets.csv"), conn)
+    assert conn.execute("SELECT COUNT(*) FROM cm93_ar_rtree").fetchone()[0] == 2
+    assert conn.execute("SELECT cell_id, objl FROM cm93_pts").fetchall() == [(3, "")]
+    assert conn.execute("SELECT minx, miny FROM cm93_pts_rtree").fetchall() == [(5.0, 5.0)]
+    assert conn.execute("SELECT text FROM cm93_labels").fetchall() == [("Harbour",)]
+    assert conn.execute("SELECT objl, attrs FROM cm93_lights").fetchall() == [("LIGHTS", '{"LITCHR": "Fl"}')]
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert not any(name.endswith("_legacy") for name in tables)
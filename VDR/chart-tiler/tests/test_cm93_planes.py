@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+
+
+def test_core_and_label_planes_share_one_build(monkeypatch) -> None:
+    calls = []
+    build = tileserver._build_features
+
+    def _build(cfg, z, x, y):
+        calls.append((z, x, y))
+        feats = build(cfg, z, x, y)
+        feats.append({"geometry": feats[-1]["geometry"], "properties": {"OBJL": 75, "text": "Fl(3)R.5s"}})
+        return feats
+
+    monkeypatch.setattr(tileserver, "_build_features", _build)
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+
+    core = client.get("/tiles/cm93-core/12/2100/1400.pbf")
+    label = client.get("/tiles/cm93-label/12/2100/1400.pbf")
+    assert core.headers["X-Tile-Cache"] == "miss"
+    assert label.headers["X-Tile-Cache"] == "hit"
+    assert calls == [(12, 2100, 1400)]
+
+    core_feats = mapbox_vector_tile.decode(core.content)["features"]["features"]
+    (text,) = mapbox_vector_tile.decode(label.content)["features"]["features"]
+    assert text["properties"] == {"OBJL": 75, "text": "Fl(3)R.5s"}
+    assert text in core_feats
+    assert client.get("/tiles/cm93-core/12/2100/1400.pbf").headers["X-Tile-Cache"] == "hit"
+    assert len(calls) == 1
@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from cm93_importer import stream_to_db
+from cm93_store import CM93Store
+
+Z, X, Y = 12, 2100, 1400
+
+
+def _feature(cell: int, geom: dict, **props) -> dict:
+    return {"type": "Feature", "geometry": geom, "properties": {"cell_id": cell, **props}}
+
+
+def _database(path: Path) -> Path:
+    west, south, east, north = tileserver._tile_bbox(Z, X, Y)
+    mx, my = (west + east) / 2, (south + north) / 2
+    ring = [[west, south], [mx, south], [mx, my], [west, my], [west, south]]
+    feats = [
+        _feature(1, {"type": "Polygon", "coordinates": [ring]}, objl="DEPARE", DRVAL1=0.0, DRVAL2=5.0),
+        _feature(1, {"type": "LineString", "coordinates": [[west, my], [east, my]]}, objl="DEPCNT", VALDCO=10.0),
+        _feature(1, {"type": "Point", "coordinates": [mx, my]}, objl="SOUNDG", VALSOU=3.5),
+        _feature(1, {"type": "Point", "coordinates": [mx, south]}, objl="LIGHTS", LITCHR="Fl", COLOUR="red", SIGPER="5s"),
+        _feature(1, {"type": "Point", "coordinates": [west, my]}, objl="LNDMRK", text="Tower"),
+    ]
+    # a whole cell of soundings far away from the tile
+    feats += [
+        _feature(2, {"type": "Point", "coordinates": [-60 + i / 100, -30]}, objl="SOUNDG", VALSOU=float(i))
+        for i in range(500)
+    ]
+    conn = sqlite3.connect(path)
+    stream_to_db(feats, {}, conn)
+    conn.close()
+    return path
+
+
+def test_query_is_pruned_by_rtree(tmp_path: Path) -> None:
+    store = CM93Store(_database(tmp_path / "cm93.sqlite"))
+    feats = store.features_for_tile(tileserver._tile_bbox(Z, X, Y), Z, X, Y)
+    assert sorted(f["properties"]["OBJL"] for f in feats) == ["DEPARE", "DEPCNT", "LIGHTS", "LNDMRK", "LNDMRK", "SOUNDG"]
+    assert {f["properties"].get("text") for f in feats} == {None, "Tower"}
+    assert len(store.query((-60.0, -30.0, -59.995, -30.0))) == 1
+    plan = " ".join(
+        row[-1]
+        for row in store._conn().execute(
+            "EXPLAIN QUERY PLAN SELECT t.geom FROM cm93_pts_rtree AS r JOIN cm93_pts AS t ON t.id = r.id"
+            " WHERE r.minx <= 1 AND r.maxx >= 0 AND r.miny <= 1 AND r.maxy >= 0"
+        )
+    )
+    assert "VIRTUAL TABLE INDEX" in plan and "INTEGER PRIMARY KEY" in plan
+
+
+def test_cm93_tiles_from_database(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(tileserver, "_cm93_store", CM93Store(_database(tmp_path / "cm93.sqlite")))
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+
+    core = mapbox_vector_tile.decode(client.get(f"/tiles/cm93-core/{Z}/{X}/{Y}.pbf").content)
+    codes = {f["properties"]["OBJL"] for f in core["features"]["features"]}
+    assert {tileserver._OBJL_CODES[o] for o in ("DEPARE", "DEPCNT", "SOUNDG", "LIGHTS")} <= codes
+    labels = mapbox_vector_tile.decode(client.get(f"/tiles/cm93-label/{Z}/{X}/{Y}.pbf").content)
+    texts = {f["properties"]["text"] for f in labels["features"]["features"]}
+    assert "Tower" in texts and len(texts) == 2  # plus the light character
+    far = client.get("/tiles/cm93-core/12/0/0.pbf")
+    assert far.status_code == 200
+    assert not mapbox_vector_tile.decode(far.content)["features"]["features"]
+
+
+def test_version_is_rechecked_per_interval(tmp_path: Path) -> None:
+    path = _database(tmp_path / "cm93.sqlite")
+    cached = CM93Store(path, check_interval=3600)
+    live = CM93Store(path, check_interval=0)
+    before = cached.version
+    assert live.version == before
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cached.version == before
+    assert live.version != before
+
+
+def test_cm93_planes_follow_the_database_version(tmp_path: Path, monkeypatch) -> None:
+    path = _database(tmp_path / "cm93.sqlite")
+    monkeypatch.setattr(tileserver, "_cm93_store", CM93Store(path, check_interval=0))
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+    url = f"/tiles/cm93-core/{Z}/{X}/{Y}.pbf"
+    first = client.get(url)
+    assert client.get(url).headers["X-Tile-Cache"] == "hit"
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    again = client.get(url)
+    assert again.headers["X-Tile-Cache"] == "miss"
+    assert again.headers["ETag"] != first.headers["ETag"]
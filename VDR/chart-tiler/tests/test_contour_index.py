@@ -0,0 +1,136 @@
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from mapbox_vector_tile import decode, encode
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from contour_index import ContourIndex, ContourIndexCache, write_contours
+from registry import Dataset
+
+
+def _mbtiles(path: Path, tiles: dict) -> Path:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE metadata (name TEXT PRIMARY KEY, value TEXT)")
+    conn.execute(
+        "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)"
+    )
+    for (z, x, y), data in tiles.items():
+        conn.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)", (z, x, y, data))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _tile(*depths: float) -> bytes:
+    feats = [
+        {"geometry": "LINESTRING(0 0, 10 10)", "properties": {"VALDCO": d}} for d in depths
+    ]
+    return encode([{"name": "features", "features": feats}])
+
+
+def test_neighbours() -> None:
+    index = ContourIndex([20, 5, 10, 10])
+    assert index.values == [5.0, 10.0, 20.0]
+    assert index.neighbours(7) == (5.0, 10.0)
+    assert index.safety_contour(7) == 10.0
+    assert index.safety_contour(10) == 10.0
+    assert index.safety_contour(30) == 20.0
+    assert index.safety_contour(1) == 5.0
+    assert ContourIndex().safety_contour(10) is None
+
+
+def test_from_mbtiles(tmp_path: Path) -> None:
+    # Older files are scanned at their highest zoom level.
+    path = _mbtiles(tmp_path / "a.mbtiles", {(3, 0, 0): _tile(99), (4, 0, 0): _tile(5, 10), (4, 1, 0): _tile(15)})
+    assert ContourIndex.from_mbtiles(path).values == [5.0, 10.0, 15.0]
+    # Imported files carry the values in their metadata.
+    write_contours(path, [2, 30])
+    assert ContourIndex.from_mbtiles(path).values == [2.0, 30.0]
+    assert len(ContourIndex.from_mbtiles(tmp_path / "missing.mbtiles")) == 0
+    assert not (tmp_path / "missing.mbtiles").exists()
+
+
+def test_cache_scans_in_the_background(tmp_path: Path) -> None:
+    path = _mbtiles(tmp_path / "scan.mbtiles", {(4, 0, 0): _tile(5, 10)})
+    cache = ContourIndexCache()
+    release = threading.Event()
+    builds = []
+
+    def _build() -> ContourIndex:
+        builds.append(threading.current_thread())
+        assert release.wait(5)
+        return ContourIndex.from_mbtiles(path)
+
+    load = lambda: ContourIndex.from_metadata(path)
+    # nothing stored: callers get None at once instead of waiting for the scan
+    assert cache.get("scan", 1, load, _build) is None
+    assert cache.get("scan", 1, load, _build) is None
+    release.set()
+    cache.wait("scan", 5)
+    assert cache.get("scan", 1, load, _build).values == [5.0, 10.0]
+    assert len(builds) == 1 and builds[0] is not threading.current_thread()
+
+    # stored contours are read directly, without a scan
+    write_contours(path, [7])
+    assert cache.get("scan", 2, load, _build).values == [7.0]
+    assert len(builds) == 1
+
+
+def test_scan_of_one_dataset_does_not_block_another(tmp_path: Path) -> None:
+    slow = _mbtiles(tmp_path / "slow.mbtiles", {})
+    fast = _mbtiles(tmp_path / "fast.mbtiles", {})
+    write_contours(fast, [3])
+    cache = ContourIndexCache()
+    release = threading.Event()
+
+    def _slow_scan() -> ContourIndex:
+        release.wait(5)
+        return ContourIndex()
+
+    assert cache.get("slow", 1, lambda: ContourIndex.from_metadata(slow), _slow_scan) is None
+    try:
+        index = cache.get("fast", 1, lambda: ContourIndex.from_metadata(fast), ContourIndex)
+        assert index.values == [3.0]
+    finally:
+        release.set()
+        cache.wait("slow", 5)
+
+
+def test_tiles_agree_on_safety_contour(tmp_path: Path, monkeypatch) -> None:
+    path = _mbtiles(tmp_path / "idx.mbtiles", {})
+    write_contours(path, [5, 15, 20])
+
+    def _query(ds, bbox, scale):
+        # The left tile only holds the 20 m contour, the right one 15 and 20.
+        depths = (20.0,) if bbox[0] < 0 else (15.0, 20.0)
+        return [
+            {
+                "geometry": {"type": "LineString", "coordinates": [[bbox[0], bbox[1]], [bbox[2], bbox[3]]]},
+                "properties": {"OBJL": "DEPCNT", "VALDCO": d},
+            }
+            for d in depths
+        ]
+
+    dataset = Dataset("idx", "idx", path, [0, 0, 0, 0], 0, 16, 1.0)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", 1)
+    tileserver._tile_cache.clear()
+    tileserver._contour_indexes.clear()
+    client = TestClient(tileserver.app)
+
+    roles = {}
+    for x in (2047, 2048):
+        resp = client.get(f"/tiles/enc/idx/12/{x}/1200?safety=12")
+        layer = next(iter(decode(resp.content).values()))
+        roles[x] = {f["properties"]["VALDCO"]: f["properties"].get("role") for f in layer["features"]}
+    # The dataset-wide substitute for 12 m is the 15 m contour, so the left
+    # tile must not promote its 20 m contour on its own.
+    assert roles[2047] == {20: "normal"}
+    assert roles[2048] == {15: "safety", 20: "normal"}
@@ -0,0 +1,109 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from disk_cache import DiskKey, DiskTileCache, partition_name
+from tile_cache import CachedTile, etag_for_bytes
+import tileserver
+
+
+def test_roundtrip_survives_restart(tmp_path) -> None:
+    key = DiskKey(partition_name("enc", "one"), 3, 2, 1, "v1", "10,5,30")
+    cache = DiskTileCache(tmp_path, max_bytes=1 << 20)
+    assert cache.get(key) is None
+    cache.put(key, CachedTile(b"tile", '"v1-etag"'))
+    assert cache.get(key) == CachedTile(b"tile", '"v1-etag"')
+
+    reopened = DiskTileCache(tmp_path, max_bytes=1 << 20)
+    assert reopened.get(key) == CachedTile(b"tile", '"v1-etag"')
+    assert reopened.nbytes == 4
+
+    path = tmp_path / f"{key.partition}.mbtiles"
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # rows are stored with TMS tile_row like regular MBTiles
+    assert conn.execute("SELECT tile_row FROM tiles").fetchone()[0] == 6
+    conn.close()
+
+
+def test_stale_version_is_a_miss(tmp_path) -> None:
+    cache = DiskTileCache(tmp_path, max_bytes=1 << 20)
+    old = DiskKey("p", 0, 0, 0, "v1")
+    cache.put(old, CachedTile(b"old", etag_for_bytes(b"old")))
+    assert cache.get(old._replace(version="v2")) is None
+    # the stale row is dropped
+    assert cache.get(old) is None
+    assert cache.nbytes == 0
+
+
+def test_evicts_oldest_rows_over_cap(tmp_path) -> None:
+    cache = DiskTileCache(tmp_path, max_bytes=2500)
+    for x in range(5):
+        data = bytes([x]) * 1000
+        cache.put(DiskKey("p", 4, x, 0, "v"), CachedTile(data, etag_for_bytes(data)))
+    assert cache.nbytes <= 2500
+    assert cache.get(DiskKey("p", 4, 0, 0, "v")) is None
+    assert cache.get(DiskKey("p", 4, 4, 0, "v")).data == b"\x04" * 1000
+
+
+def test_mariner_variants_share_one_partition(tmp_path) -> None:
+    cache = DiskTileCache(tmp_path, max_bytes=1 << 20, max_connections=2)
+    for safety in range(20):
+        key = DiskKey(partition_name("enc", "one"), 3, 2, 1, "v", f"{safety},5,30")
+        cache.put(key, CachedTile(bytes([safety]), etag_for_bytes(bytes([safety]))))
+    assert [p.name for p in tmp_path.glob("*.mbtiles")] == ["enc.one.mbtiles"]
+    assert cache.get(DiskKey("enc.one", 3, 2, 1, "v", "7,5,30")).data == b"\x07"
+    assert cache.get(DiskKey("enc.one", 3, 2, 1, "v", "99,5,30")) is None
+
+
+def test_connections_are_bounded(tmp_path) -> None:
+    cache = DiskTileCache(tmp_path, max_bytes=1 << 20, max_connections=2)
+    for n in range(5):
+        cache.put(DiskKey(f"p{n}", 0, 0, 0, "v"), CachedTile(b"t", etag_for_bytes(b"t")))
+        assert len(cache._conns) <= 2
+    # closed partitions are reopened on demand
+    assert cache.get(DiskKey("p0", 0, 0, 0, "v")).data == b"t"
+    assert cache.partitions == 5
+
+
+def test_eviction_removes_empty_partitions(tmp_path) -> None:
+    cache = DiskTileCache(tmp_path, max_bytes=2500)
+    big, small = b"o" * 2000, b"n" * 1000
+    cache.put(DiskKey("old", 0, 0, 0, "v"), CachedTile(big, etag_for_bytes(big)))
+    cache.put(DiskKey("new", 0, 0, 0, "v"), CachedTile(small, etag_for_bytes(small)))
+    # the largest partition lost its only tile and is gone
+    assert [p.name for p in tmp_path.glob("*.mbtiles")] == ["new.mbtiles"]
+    assert not (tmp_path / "old.mbtiles-wal").exists()
+    assert cache.nbytes == 1000
+    assert cache.get(DiskKey("new", 0, 0, 0, "v")).data == small
+
+
+def test_stale_row_removes_last_tile_partition(tmp_path) -> None:
+    cache = DiskTileCache(tmp_path, max_bytes=1 << 20)
+    key = DiskKey("p", 0, 0, 0, "v1")
+    cache.put(key, CachedTile(b"old", etag_for_bytes(b"old")))
+    assert cache.get(key._replace(version="v2")) is None
+    assert not (tmp_path / "p.mbtiles").exists()
+    assert cache.partitions == 0
+
+
+def test_tileserver_reads_through_disk_tier(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(tileserver, "_disk_cache", DiskTileCache(tmp_path, max_bytes=1 << 20))
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+    url = "/tiles/cm93/5/1/1?fmt=mvt&safety=12"
+    first = client.get(url)
+    assert first.headers["X-Tile-Cache"] == "miss"
+
+    # simulate a restart: memory is cold, disk is warm
+    tileserver._tile_cache.clear()
+    second = client.get(url)
+    assert second.headers["X-Tile-Cache"] == "disk"
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert client.get(url).headers["X-Tile-Cache"] == "hit"
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from empty_tiles import EmptyTileIndex, tile_outside_bounds
+from registry import Dataset
+
+
+def test_bounds_check() -> None:
+    bounds = [10.0, 50.0, 12.0, 52.0]
+    assert not tile_outside_bounds((11.0, 51.0, 11.5, 51.5), bounds)
+    assert not tile_outside_bounds((0.0, 0.0, 90.0, 85.0), bounds)
+    assert tile_outside_bounds((12.5, 51.0, 13.0, 51.5), bounds)
+    assert tile_outside_bounds((11.0, 40.0, 11.5, 45.0), bounds)
+    # unknown bounds never exclude
+    assert not tile_outside_bounds((12.5, 51.0, 13.0, 51.5), [0, 0, 0, 0])
+    # datasets crossing the antimeridian
+    assert not tile_outside_bounds((-179.0, 0.0, -178.0, 1.0), [170.0, -10.0, -170.0, 10.0])
+    assert tile_outside_bounds((0.0, 0.0, 1.0, 1.0), [170.0, -10.0, -170.0, 10.0])
+
+
+def test_index_is_exact_and_versioned() -> None:
+    index = EmptyTileIndex(max_blocks=2)
+    index.add("a", "v1", 14, 8000, 5000)
+    assert ("a", "v1", 14, 8000, 5000) in index
+    assert ("a", "v1", 14, 8001, 5000) not in index
+    assert ("a", "v1", 13, 8000, 5000) not in index
+    # a new dataset version forgets the old one
+    index.add("a", "v2", 14, 1, 1)
+    assert ("a", "v1", 14, 8000, 5000) not in index
+    # the block budget evicts the oldest block
+    index.add("b", "v1", 14, 1000, 1000)
+    index.add("c", "v1", 14, 2000, 2000)
+    assert len(index) == 2
+    assert ("a", "v2", 14, 1, 1) not in index
+
+
+def test_empty_tiles_skip_rendering(monkeypatch) -> None:
+    calls = []
+
+    def _query(ds, bbox, scale):
+        calls.append(bbox)
+        return []
+
+    dataset = Dataset("empty", "empty", Path("e.mbtiles"), [10.0, 50.0, 12.0, 52.0], 0, 16, 1.0)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", 1)
+    tileserver._empty_tiles.clear()
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+
+    outside = client.get("/tiles/enc/empty/10/0/0")
+    assert outside.headers["X-Tile-Cache"] == "empty"
+    assert outside.headers["Cache-Control"] == "public, max-age=86400"
+    assert outside.content == tileserver._EMPTY_MVT
+    assert calls == []
+
+    # z10 tile 543/342 lies inside the bounds but renders empty
+    first = client.get("/tiles/enc/empty/10/543/342")
+    assert first.headers["X-Tile-Cache"] == "miss"
+    assert len(calls) == 1
+    tileserver._tile_cache.clear()
+    second = client.get("/tiles/enc/empty/10/543/342")
+    assert second.headers["X-Tile-Cache"] == "empty"
+    assert second.content == first.content
+    assert len(calls) == 1
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from registry import Dataset
+
+
+def _setup(monkeypatch, size: int) -> list:
+    calls = []
+
+    def _query(ds, bbox, scale):
+        calls.append(bbox)
+        minx, miny, maxx, maxy = bbox
+        return [
+            {
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]],
+                },
+                "properties": {"OBJL": "DEPARE", "DRVAL1": 0.0, "DRVAL2": 10.0},
+            }
+        ]
+
+    dataset = Dataset("meta", "meta", Path("meta.mbtiles"), [-180, -85, 180, 85], 0, 16, 1.0)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", size)
+    tileserver._tile_cache.clear()
+    return calls
+
+
+def test_metatile_renders_block_from_one_query(monkeypatch) -> None:
+    calls = _setup(monkeypatch, 4)
+    client = TestClient(tileserver.app)
+    first = client.get("/tiles/enc/meta/6/9/18")
+    assert first.headers["X-Tile-Cache"] == "miss"
+    assert len(calls) == 1
+    west, south, east, north = calls[0]
+    assert (west, north) == tileserver._tile_bbox(6, 8, 16)[::3]
+
+    # every sibling in the 4x4 block is now cached
+    for x in range(8, 12):
+        for y in range(16, 20):
+            r = client.get(f"/tiles/enc/meta/6/{x}/{y}")
+            assert r.headers["X-Tile-Cache"] == "hit"
+            assert mapbox_vector_tile.decode(r.content)["features"]["features"]
+    assert len(calls) == 1
+    client.get("/tiles/enc/meta/6/12/16")
+    assert len(calls) == 2
+
+
+def test_metatile_clamped_at_low_zoom(monkeypatch) -> None:
+    calls = _setup(monkeypatch, 8)
+    client = TestClient(tileserver.app)
+    assert client.get("/tiles/enc/meta/1/1/0").status_code == 200
+    for x in range(2):
+        for y in range(2):
+            assert client.get(f"/tiles/enc/meta/1/{x}/{y}").status_code == 200
+    assert len(calls) == 1
@@ -0,0 +1,110 @@
+import gzip
+import sqlite3
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from mvt_builder import encode_mvt
+from registry import Dataset
+
+STORED = encode_mvt({"DEPARE": [{"geometry": {"type": "Point", "coordinates": [1, 1]}, "properties": {"DRVAL1": 5}}]})
+
+
+def _dataset(tmp_path: Path, stored: bytes | None = None) -> Dataset:
+    path = tmp_path / "pass.mbtiles"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    conn.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    # z2/1/1 in XYZ is TMS row 2
+    conn.execute("INSERT INTO tiles VALUES (2, 1, 2, ?)", (stored or gzip.compress(STORED),))
+    conn.commit()
+    conn.close()
+    return Dataset("pass", "pass", path, [-180, -85, 180, 85], 0, 14, path.stat().st_mtime)
+
+
+def _setup(monkeypatch, tmp_path: Path, stored: bytes | None = None) -> list:
+    rendered = []
+    dataset = _dataset(tmp_path, stored)
+
+    def _query(ds, bbox, scale):
+        rendered.append(bbox)
+        return []
+
+    monkeypatch.setattr(tileserver, "_ENC_PASSTHROUGH", True)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    tileserver._tile_cache.clear()
+    return rendered
+
+
+def test_stored_tiles_pass_through(monkeypatch, tmp_path) -> None:
+    rendered = _setup(monkeypatch, tmp_path)
+    client = TestClient(tileserver.app)
+
+    resp = client.get("/tiles/enc/pass/2/1/1", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["X-Tile-Cache"] == "mbtiles"
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["content-type"] == "application/x-protobuf"
+    assert resp.content == STORED  # decoded by the client
+
+    plain = client.get("/tiles/enc/pass/2/1/1", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.content == STORED
+    assert plain.headers["ETag"] == resp.headers["ETag"]
+
+    again = client.get("/tiles/enc/pass/2/1/1", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+    assert rendered == []
+
+
+def test_plain_stored_tiles_are_compressed_once(monkeypatch, tmp_path) -> None:
+    plain_tile = STORED * 64  # above the precompress threshold
+    rendered = _setup(monkeypatch, tmp_path, plain_tile)
+    client = TestClient(tileserver.app)
+
+    resp = client.get("/tiles/enc/pass/2/1/1", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["X-Tile-Cache"] == "mbtiles"
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.content == plain_tile
+    key = next(k for k in tileserver._tile_cache._data if k.startswith("mbtiles:pass:"))
+    cached = tileserver._tile_cache.get(key)
+    assert gzip.decompress(cached.gzip) == plain_tile
+
+    plain = client.get("/tiles/enc/pass/2/1/1", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.content == plain_tile
+    assert plain.headers["ETag"] == resp.headers["ETag"]
+    assert rendered == []
+
+
+def test_missing_tiles_and_overrides_render(monkeypatch, tmp_path) -> None:
+    rendered = _setup(monkeypatch, tmp_path)
+    client = TestClient(tileserver.app)
+
+    resp = client.get("/tiles/enc/pass/2/1/1?safety=10")
+    assert resp.status_code == 200
+    assert resp.headers["X-Tile-Cache"] != "mbtiles"
+    assert "DEPARE" not in mapbox_vector_tile.decode(resp.content)
+    assert len(rendered) == 1
+
+    missing = client.get("/tiles/enc/pass/2/2/1")
+    assert missing.headers["X-Tile-Cache"] != "mbtiles"
+    assert len(rendered) == 2
+
+
+def test_agnostic_mode_renders(monkeypatch, tmp_path) -> None:
+    rendered = _setup(monkeypatch, tmp_path)
+    client = TestClient(tileserver.app)
+
+    assert client.get("/tiles/enc/pass/2/1/1").headers["X-Tile-Cache"] == "mbtiles"
+    resp = client.get("/tiles/enc/pass/2/1/1?mode=agnostic")
+    assert resp.status_code == 200
+    assert resp.headers["X-Tile-Cache"] != "mbtiles"
+    assert len(rendered) == 1
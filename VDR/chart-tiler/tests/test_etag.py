@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+
+
+def test_tile_revalidation_returns_304() -> None:
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+    url = "/tiles/cm93/4/3/5?fmt=mvt&safety=7"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert etag.startswith('"') and etag.endswith('"')
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+    assert again.headers["Cache-Control"] == "public, max-age=60"
+
+    # weak validators and lists are matched too
+    listed = client.get(url, headers={"If-None-Match": f'"other", W/{etag}'})
+    assert listed.status_code == 304
+    other = client.get(url, headers={"If-None-Match": '"other"'})
+    assert other.status_code == 200
+    assert other.content == first.content
+
+
+def test_asset_revalidation_returns_304(styling_dist) -> None:
+    client = TestClient(tileserver.app)
+    first = client.get("/sprites/s52-day.json")
+    assert first.status_code == 200
+    second = client.get(
+        "/sprites/s52-day.json", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+def test_reimported_dataset_is_not_served_from_memory(monkeypatch) -> None:
+    from registry import Dataset
+
+    dataset = Dataset("reimp", "reimp", Path("reimp.mbtiles"), [-180, -85, 180, 85], 0, 16, 1.0)
+    calls = []
+
+    def _query(ds, bbox, scale):
+        calls.append(bbox)
+        return [{"geometry": {"type": "Point", "coordinates": [bbox[0], bbox[1]]}, "properties": {"OBJL": "BOYLAT"}}]
+
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", 1)
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+    url = "/tiles/enc/reimp/5/3/4?safety=10"
+
+    first = client.get(url)
+    assert client.get(url).headers["X-Tile-Cache"] == "hit"
+    monkeypatch.setattr(dataset, "updated_at", 2.0)
+    fresh = client.get(url)
+    assert fresh.headers["X-Tile-Cache"] == "miss"
+    assert fresh.headers["ETag"] != first.headers["ETag"]
+    assert len(calls) == 2
@@ -40,7 +40,7 @@ def _light_feature(monkeypatch):
             "properties": {"OBJL": "LIGHTS", **LIGHT_ATTRS},
         }
     monkeypatch.setattr(tileserver, "features_for_tile", _features)
-    tileserver._render_mvt.cache_clear()
+    tileserver._tile_cache.clear()
 
 
 def _decode(content: bytes):
@@ -0,0 +1,109 @@
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from datasource_mbtiles import MBTilesDataSource
+from metrics import REGISTRY
+from tile_cache import TileCache
+
+
+def _make_mbtiles(path: Path) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    conn.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    conn.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    conn.execute("INSERT INTO metadata VALUES ('name', 'grid')")
+    conn.executemany(
+        "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+        [(3, x, 7 - y, f"{x}/{y}".encode()) for x in range(8) for y in range(8) if (x + y) % 3],
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def mbtiles(tmp_path: Path) -> Path:
+    path = tmp_path / "grid.mbtiles"
+    _make_mbtiles(path)
+    return path
+
+
+def test_get_tiles_matches_get_tile(mbtiles: Path) -> None:
+    bulk = MBTilesDataSource(str(mbtiles), pool_size=2, cache=TileCache(1 << 20))
+    single = MBTilesDataSource(str(mbtiles), pool_size=2, cache=TileCache(1 << 20))
+    keys = [(3, x, y) for x in range(8) for y in range(8)] + [(9, 0, 0)]
+    tiles = bulk.get_tiles(keys)
+    assert tiles == {k: single.get_tile(*k) for k in keys if single.get_tile(*k) is not None}
+    assert tiles[(3, 1, 0)] == b"1/0"
+    assert (3, 0, 0) not in tiles and (9, 0, 0) not in tiles
+    # served from the cache on the second call
+    assert bulk.get_tiles(keys[:5]) == {k: tiles[k] for k in keys[:5] if k in tiles}
+    assert bulk.metadata() == {"name": "grid"}
+
+
+def test_pool_is_bounded_and_shared_across_threads(mbtiles: Path) -> None:
+    ds = MBTilesDataSource(str(mbtiles), pool_size=2, cache=TileCache(0))
+    before = REGISTRY.get_sample_value("mbtiles_pool_wait_seconds_count") or 0
+    errors = []
+
+    def _read() -> None:
+        try:
+            for y in range(8):
+                for x in range(8):
+                    ds.get_tile(3, x, y)
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_read) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert ds._pool._opened <= 2
+    assert REGISTRY.get_sample_value("mbtiles_pool_wait_seconds_count") == before + 6 * 64
+    ds.close()
+    assert ds._pool._opened == 0
+
+
+def test_connections_are_read_only(mbtiles: Path) -> None:
+    ds = MBTilesDataSource(str(mbtiles), pool_size=1)
+    with ds._pool.connection() as conn:
+        with pytest.raises(sqlite3.Error):
+            conn.execute("DELETE FROM tiles")
+    ds.close()
+
+
+def test_rewritten_file_is_seen_by_pooled_connections(mbtiles: Path) -> None:
+    ds = MBTilesDataSource(str(mbtiles), pool_size=1, cache=TileCache(0))
+    assert ds.get_tile(3, 1, 0) == b"1/0"
+    conn = sqlite3.connect(mbtiles)
+    conn.execute("UPDATE tiles SET tile_data = ? WHERE zoom_level = 3 AND tile_column = 1 AND tile_row = 7", (b"new",))
+    conn.commit()
+    conn.close()
+    assert ds.get_tile(3, 1, 0) == b"new"
+    ds.close()
+
+
+def test_close_closes_checked_out_connections(mbtiles: Path) -> None:
+    ds = MBTilesDataSource(str(mbtiles), pool_size=1, cache=TileCache(0))
+    waited = []
+    with ds._pool.connection() as conn:
+        waiter = threading.Thread(target=lambda: waited.append(ds.get_tile(3, 1, 0)))
+        waiter.start()
+        ds.close()
+        waiter.join(5)
+        assert not waiter.is_alive()
+        assert waited == [b"1/0"]
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert ds._pool._opened == 0
+    assert ds.get_tile(3, 2, 0) == b"2/0"
+    assert ds._pool._opened == 0
@@ -0,0 +1,89 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import pytest
+
+from contour_index import ContourIndex
+from datasource_mbtiles import MBTilesDataSource
+from mbtiles_store import compact, create_schema, is_deduplicated, prune_images, put_tiles
+from tile_cache import TileCache
+from tools import compact_mbtiles, make_mbtiles_fixture
+
+OCEAN = b"ocean" * 100
+LAND = b"land" * 100
+
+
+def _plain_mbtiles(path: Path) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    conn.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    conn.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    conn.execute("INSERT INTO metadata VALUES ('name', 'plain')")
+    conn.executemany(
+        "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+        [(4, x, y, OCEAN if x < 12 else LAND if y else f"{x}".encode()) for x in range(16) for y in range(16)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_put_tiles_stores_each_payload_once() -> None:
+    conn = sqlite3.connect(":memory:")
+    create_schema(conn)
+    put_tiles(conn, [(2, 0, 0, OCEAN), (2, 0, 1, OCEAN), (2, 1, 1, LAND)])
+    assert conn.execute("SELECT COUNT(*) FROM images").fetchone() == (2,)
+    assert conn.execute("SELECT tile_data FROM tiles WHERE tile_column=1").fetchone() == (LAND,)
+
+    put_tiles(conn, [(2, 1, 1, OCEAN)])
+    assert conn.execute("SELECT COUNT(*) FROM tiles").fetchone() == (3,)
+    assert prune_images(conn) == 1
+    assert conn.execute("SELECT COUNT(*) FROM images").fetchone() == (1,)
+
+
+def test_compact_converts_in_place(tmp_path) -> None:
+    path = tmp_path / "plain.mbtiles"
+    _plain_mbtiles(path)
+    reader = MBTilesDataSource(str(path), cache=TileCache(0))
+    keys = [(4, x, y) for x in range(16) for y in range(16)]
+    before = reader.get_tiles(keys)
+    reader.close()
+
+    stats = compact(path)
+    assert (stats.tiles, stats.images) == (256, 2 + 4)
+    assert stats.dedupe_ratio == pytest.approx(256 / 6)
+    assert stats.bytes_after < stats.bytes_before
+
+    conn = sqlite3.connect(path)
+    assert is_deduplicated(conn)
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name='tiles'").fetchone() == ("view",)
+    assert conn.execute("SELECT value FROM metadata WHERE name='name'").fetchone() == ("plain",)
+    conn.close()
+    reader = MBTilesDataSource(str(path), cache=TileCache(0))
+    assert reader.get_tiles(keys) == before
+    assert reader.get_tile(4, 15, 15) == f"{15}".encode()
+    reader.close()
+
+    again = compact(path)
+    assert (again.tiles, again.images, again.bytes_after) == (256, 6, stats.bytes_after)
+
+
+def test_fixture_tool_writes_deduplicated_schema(tmp_path, capsys) -> None:
+    path = tmp_path / "fixture.mbtiles"
+    make_mbtiles_fixture.make_fixture(path, include_scamin=True)
+    conn = sqlite3.connect(path)
+    assert is_deduplicated(conn)
+    conn.close()
+    assert MBTilesDataSource(str(path), cache=TileCache(0)).get_tile(0, 0, 0)
+    assert ContourIndex.from_mbtiles(path).values == [10.0]
+
+    plain = tmp_path / "plain.mbtiles"
+    _plain_mbtiles(plain)
+    assert compact_mbtiles.main([str(path), str(plain)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert lines[1].startswith(f"{plain}: 256 tiles, 6 images, dedupe 42.67x")
+    assert lines[2].startswith("total: 257 tiles, 7 images")
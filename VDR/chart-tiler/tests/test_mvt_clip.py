@@ -0,0 +1,70 @@
+import math
+import sys
+from pathlib import Path
+
+import pytest
+from mapbox_vector_tile import decode
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from mvt_builder import clip_to_tile, encode_mvt
+
+
+def _bbox(z: int, x: int, y: int) -> tuple:
+    n = 2.0 ** z
+    lat = lambda t: math.degrees(math.atan(math.sinh(math.pi - 2.0 * math.pi * t / n)))  # noqa: E731
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+BBOX = _bbox(12, 2100, 1400)
+
+
+def _circle(cx: float, cy: float, r: float, n: int = 2000) -> list:
+    ring = [[cx + r * math.cos(2 * math.pi * i / n), cy + r * math.sin(2 * math.pi * i / n)] for i in range(n)]
+    return [ring + [ring[0]]]
+
+
+@pytest.mark.parametrize("encoder", ["mapbox", "fast"])
+def test_projects_to_tile_space(encoder: str) -> None:
+    west, south, east, north = BBOX
+    feats = [
+        {"geometry": {"type": "Point", "coordinates": [west, north]}, "properties": {"c": "nw"}},
+        {"geometry": {"type": "Point", "coordinates": [east, south]}, "properties": {"c": "se"}},
+        {"geometry": {"type": "LineString", "coordinates": [[west, south], [east, north]]}},
+    ]
+    layer = decode(encode_mvt(feats, encoder=encoder, bbox=BBOX))["features"]
+    coords = [f["geometry"]["coordinates"] for f in layer["features"]]
+    assert coords == [[0, 4096], [4096, 0], [[0, 0], [4096, 4096]]]
+
+
+@pytest.mark.parametrize("encoder", ["mapbox", "fast"])
+def test_clips_to_buffer_and_drops_degenerates(encoder: str) -> None:
+    west, south, east, north = BBOX
+    w, h = east - west, north - south
+    feats = [
+        {"geometry": {"type": "Polygon", "coordinates": _circle(west + w / 2, south + h / 2, 10 * w)}, "properties": {"OBJL": 42}},
+        {"geometry": {"type": "Point", "coordinates": [east + w / 2, north]}, "properties": {"OBJL": 129}},
+        {
+            "geometry": {"type": "Polygon", "coordinates": [[[west, south], [west + w / 1e5, south], [west, south + h / 1e5], [west, south]]]},
+            "properties": {"OBJL": 71},
+        },
+        {"geometry": {"type": "LineString", "coordinates": [[west, south], [west + w / 1e5, south]]}, "properties": {"OBJL": 30}},
+    ]
+    data = encode_mvt(feats, encoder=encoder, bbox=BBOX, buffer=64)
+    (area,) = decode(data)["features"]["features"]
+    assert area["properties"] == {"OBJL": 42}
+    ring = area["geometry"]["coordinates"][0]
+    assert {tuple(p) for p in ring} == {(-64, -64), (4160, -64), (4160, 4160), (-64, 4160)}
+    unclipped = encode_mvt(feats[:1], encoder=encoder, bbox=BBOX, buffer=10 ** 6)
+    assert len(data) < len(unclipped) / 10
+
+
+def test_clip_keeps_properties_and_id() -> None:
+    west, south, east, north = BBOX
+    mid = math.degrees(math.atan(math.sinh(math.pi - 2.0 * math.pi * 1400.5 / 2 ** 12)))
+    feat = {"geometry": {"type": "Point", "coordinates": [(west + east) / 2, mid]}, "properties": {"a": 1}, "id": 5}
+    (out,) = clip_to_tile([feat], BBOX, buffer=0)
+    assert out["properties"] == {"a": 1} and out["id"] == 5
+    assert (out["geometry"].x, out["geometry"].y) == (2048, 2048)
+    assert feat["geometry"]["type"] == "Point"
@@ -0,0 +1,105 @@
+import math
+import random
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import mvt_builder
+import mvt_fast
+
+
+def _ring(cx: float, cy: float, r: float, n: int, clockwise: bool = False) -> list:
+    step = -1 if clockwise else 1
+    pts = [[cx + r * math.cos(step * 2 * math.pi * i / n), cy + r * math.sin(step * 2 * math.pi * i / n)] for i in range(n)]
+    return pts + [pts[0]]
+
+
+def _features() -> list:
+    rng = random.Random(7)
+    feats = [
+        {"geometry": {"type": "Point", "coordinates": [10.4, 20.6]}, "properties": {"a": 1, "b": "x", "c": True, "d": 1.5}, "id": 3},
+        {"geometry": {"type": "MultiPoint", "coordinates": [[1, 2], [3, 4], [3, 4]]}, "properties": {"a": 1.0, "e": None, "f": -5}},
+        {"geometry": {"type": "LineString", "coordinates": [[0, 0], [0.2, 0.1], [10, 10], [10, 10], [20, 5]]}, "properties": {"c": False}},
+        {"geometry": {"type": "LineString", "coordinates": [[0, 0], [0.2, 0.1]]}, "properties": {"dropped": 1}},
+        {"geometry": {"type": "MultiLineString", "coordinates": [[[0, 0], [5, 5]], [[5, 5], [5.1, 5.2]], [[7, 7], [9, 1]]]}},
+        {"geometry": {"type": "Polygon", "coordinates": [_ring(100, 100, 50, 12), _ring(100, 100, 20, 6)]}, "id": -1},
+        {
+            "geometry": {
+                "type": "MultiPolygon",
+                "coordinates": [[_ring(500, 500, 50, 8)], [_ring(800, 800, 100, 16), _ring(800, 800, 30, 5, True)]],
+            },
+            "properties": {"k": "v"},
+            "id": 7,
+        },
+        {"geometry": None, "properties": {"none": 1}},
+    ]
+    for _ in range(100):
+        line = [[rng.uniform(0, 4096), rng.uniform(0, 4096)] for _ in range(rng.randint(2, 30))]
+        feats.append({"geometry": {"type": "LineString", "coordinates": line}, "properties": {"n": rng.randint(0, 5)}})
+        ring = _ring(rng.uniform(0, 4000), rng.uniform(0, 4000), rng.uniform(5, 300), rng.randint(3, 40), rng.random() < 0.5)
+        feats.append({"geometry": {"type": "Polygon", "coordinates": [ring]}, "properties": {"v": rng.random()}})
+    return feats
+
+
+def test_matches_mapbox_vector_tile_bytes() -> None:
+    layers = [
+        {"name": "features", "features": _features()},
+        {"name": "points", "features": _features()[:2]},
+        {"name": "empty", "features": []},
+    ]
+    fast = mvt_fast.encode(layers, extents=4096)
+    assert fast == mapbox_vector_tile.encode(layers, default_options={"extents": 4096})
+    assert mapbox_vector_tile.decode(fast) == mapbox_vector_tile.decode(
+        mapbox_vector_tile.encode(layers, default_options={"extents": 4096})
+    )
+
+
+def test_quantize_bounds_round_trip() -> None:
+    bounds = (10.0, 50.0, 10.1, 50.1)
+    layers = [
+        {
+            "name": "enc",
+            "features": [
+                {"geometry": {"type": "Polygon", "coordinates": [[[10.01, 50.01], [10.09, 50.01], [10.09, 50.08], [10.01, 50.01]]]}},
+                {"geometry": {"type": "Point", "coordinates": [10.05, 50.05]}, "properties": {"OBJL": 129}},
+            ],
+        }
+    ]
+    expected = mapbox_vector_tile.encode(layers, default_options={"quantize_bounds": bounds})
+    assert mvt_fast.encode(layers, quantize_bounds=bounds) == expected
+    point = mapbox_vector_tile.decode(expected)["enc"]["features"][1]
+    assert point["geometry"]["coordinates"] == [2048, 2048]
+
+
+def test_layer_arrays_input() -> None:
+    layer = mvt_fast.LayerArrays(
+        "lines",
+        types=np.array([mvt_fast.LINESTRING]),
+        coords=np.array([[0.0, 0.0], [4.0, 4.0], [4.0, 0.0]]),
+        feature_parts=np.array([0, 2]),
+        part_offsets=np.array([0, 2, 3]),
+        exterior=np.zeros(2, dtype=bool),
+        properties=[{"OBJL": 43}],
+        ids=[None],
+    )
+    tile = mapbox_vector_tile.decode(mvt_fast.encode_layers([layer]))
+    (feat,) = tile["lines"]["features"]
+    # the one-point second part has no LineTo and is dropped
+    assert feat["geometry"] == {"type": "LineString", "coordinates": [[0, 0], [4, 4]]}
+    assert feat["properties"] == {"OBJL": 43}
+
+
+def test_encode_mvt_flag(monkeypatch) -> None:
+    feats = _features()[:8]
+    default = mvt_builder.encode_mvt(feats)
+    assert mvt_builder.encode_mvt(feats, encoder="fast") == default
+    monkeypatch.setattr(mvt_builder, "MVT_ENCODER", "fast")
+    calls = []
+    monkeypatch.setattr(mvt_fast, "encode", lambda *a, **kw: calls.append(a) or b"")
+    mvt_builder.encode_mvt({"features": feats})
+    assert len(calls) == 1
@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from metrics import REGISTRY
+from mvt_builder import encode_mvt
+from mvt_layers import LAYER_NAMES, layer_sizes, split_features
+from registry import Dataset
+from simplify import GeometryCache
+
+
+def _point(x: float, y: float) -> dict:
+    return {"type": "Point", "coordinates": [x, y]}
+
+
+def test_split_routes_by_class_property_and_geometry() -> None:
+    square = {"type": "Polygon", "coordinates": [[[0, 0], [9, 0], [9, 9], [0, 0]]]}
+    pairs = [
+        ("DEPARE", {"geometry": square, "properties": {"OBJL": 2, "fillToken": "DEPDW"}}),
+        ("SOUNDG", {"geometry": _point(1, 1), "properties": {"OBJL": 129, "VALSOU": 4.2, "symbol": "SOUNDG1"}}),
+        ("LIGHTS", {"geometry": _point(2, 2), "properties": {"OBJL": 75, "text": "Fl.G.3s"}}),
+        ("COALNE", {"geometry": {"type": "MultiLineString", "coordinates": [[[0, 0], [5, 5]]]}, "properties": {"OBJL": 30}}),
+        ("BOYLAT", {"geometry": _point(3, 3), "properties": {"OBJL": 17, "navaidIcon": "BOYLAT_1"}}),
+    ]
+    layers = split_features(pairs)
+    assert list(layers) == ["soundings", "labels", "areas", "lines", "points"]
+    (sounding,) = layers["soundings"]
+    assert sounding["properties"] == {"OBJL": 129, "VALSOU": 4.2}
+    assert pairs[1][1]["properties"]["symbol"] == "SOUNDG1"
+    assert layers["areas"][0]["properties"]["fillToken"] == "DEPDW"
+    assert split_features(pairs[:1]).keys() == {"areas"}
+
+
+def test_layer_sizes_cover_the_tile() -> None:
+    layers = {
+        "points": [{"geometry": _point(10, 10), "properties": {"OBJL": 17}}],
+        "lines": [{"geometry": {"type": "LineString", "coordinates": [[0, 0], [100, 100]]}, "properties": {}}],
+    }
+    data = encode_mvt(layers)
+    sizes = layer_sizes(data)
+    assert list(sizes) == ["points", "lines"]
+    assert sum(sizes.values()) == len(data)
+    assert layer_sizes(data + encode_mvt({"points": layers["points"]}))["points"] == 2 * sizes["points"]
+
+
+def test_enc_tiles_split_into_schema_layers(monkeypatch) -> None:
+    def _query(ds, bbox, scale):
+        west, south, east, north = bbox
+        mx, my = (west + east) / 2, (south + north) / 2
+        ring = [[west, south], [mx, south], [mx, my], [west, my], [west, south]]
+        return [
+            {"geometry": {"type": "Polygon", "coordinates": [ring]}, "properties": {"OBJL": "DEPARE", "DRVAL1": 0.0, "DRVAL2": 5.0}},
+            {"geometry": {"type": "LineString", "coordinates": [[west, my], [east, my]]}, "properties": {"OBJL": "DEPCNT", "VALDCO": 10.0}},
+            {"geometry": _point(mx, my), "properties": {"OBJL": "SOUNDG", "VALSOU": 3.0, "QUAPOS": 4}},
+            {"geometry": _point(mx, south + (north - south) / 4), "properties": {"OBJL": "BOYLAT", "CATLAM": 1}},
+        ]
+
+    dataset = Dataset("split", "split", Path("s.mbtiles"), [0, 0, 0, 0], 0, 16, 1.0)
+    monkeypatch.setattr(tileserver, "MVT_LAYERS", "split")
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", 1)
+    monkeypatch.setattr(tileserver, "_geometry_cache", GeometryCache())
+    tileserver._tile_cache.clear()
+    before = REGISTRY.get_sample_value("tile_layer_bytes_count", {"layer": "soundings"}) or 0
+
+    resp = TestClient(tileserver.app).get("/tiles/enc/split/12/2100/1400?safety=10")
+    assert resp.status_code == 200
+    tile = mapbox_vector_tile.decode(resp.content)
+    assert list(tile) == ["soundings", "areas", "lines", "points"]
+    assert set(tile) <= set(LAYER_NAMES)
+    (sounding,) = tile["soundings"]["features"]
+    assert sounding["properties"] == {
+        "OBJL": tileserver._OBJL_CODES["SOUNDG"],
+        "VALSOU": 3.0,
+        "isShallow": True,
+        "isLowAcc": True,
+    }
+    assert tile["lines"]["features"][0]["properties"]["isSafety"] is True
+    assert REGISTRY.get_sample_value("tile_layer_bytes_count", {"layer": "soundings"}) == before + 1
+
+
+def test_cm93_tiles_split(monkeypatch) -> None:
+    monkeypatch.setattr(tileserver, "MVT_LAYERS", "split")
+    tile = mapbox_vector_tile.decode(tileserver._render_mvt(tileserver.DEFAULT_CONFIG, 12, 2100, 1400))
+    assert list(tile) == ["soundings", "areas", "lines", "points"]
+    objls = {f["properties"]["OBJL"] for f in tile["points"]["features"]}
+    assert objls == {tileserver._OBJL_CODES["WRECKS"], tileserver._OBJL_CODES["OBSTRN"]}
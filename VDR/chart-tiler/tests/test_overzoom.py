@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from overzoom import overzoom_tile
+from registry import Dataset
+
+_OPTS = {"y_coord_down": True}
+
+
+def _tile(features) -> bytes:
+    return mapbox_vector_tile.encode(
+        [{"name": "features", "features": features}], default_options=_OPTS
+    )
+
+
+def test_overzoom_clips_and_rescales() -> None:
+    parent = _tile(
+        [
+            {"geometry": {"type": "LineString", "coordinates": [[0, 0], [4096, 4096]]}, "properties": {"k": 1}},
+            {"geometry": {"type": "Point", "coordinates": [3000, 1000]}, "properties": {"k": 2}},
+        ]
+    )
+    # bottom-right child only sees the diagonal line
+    child = mapbox_vector_tile.decode(overzoom_tile(parent, 1, 1, 1), default_options=_OPTS)
+    feats = child["features"]["features"]
+    assert [f["properties"]["k"] for f in feats] == [1]
+    assert feats[0]["geometry"]["coordinates"] == [[-64, -64], [4096, 4096]]
+
+    # top-right child gets the point rescaled into its own extent
+    child = mapbox_vector_tile.decode(overzoom_tile(parent, 1, 1, 0), default_options=_OPTS)
+    point = [f for f in child["features"]["features"] if f["properties"]["k"] == 2][0]
+    assert point["geometry"]["coordinates"] == [1904, 2000]
+
+
+def test_tiles_above_maxzoom_reuse_the_parent(monkeypatch) -> None:
+    calls = []
+
+    def _query(ds, bbox, scale):
+        calls.append(scale)
+        minx, miny, maxx, maxy = bbox
+        return [
+            {
+                "geometry": {"type": "LineString", "coordinates": [[minx, miny], [maxx, maxy]]},
+                "properties": {"OBJL": "COALNE"},
+            }
+        ]
+
+    dataset = Dataset("oz", "oz", Path("oz.mbtiles"), [-180, -85, 180, 85], 0, 10, 1.0)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", 1)
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+    for x in (800, 801, 802, 803):
+        assert client.get(f"/tiles/enc/oz/12/{x}/1200").status_code == 200
+    # all four z12 tiles share the z10 ancestor 200/300
+    assert calls == [2 ** 10]
+    assert client.get("/tiles/enc/oz/10/200/300").headers["X-Tile-Cache"] == "hit"
@@ -0,0 +1,127 @@
+import gzip
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from datasource_pmtiles import PMTilesDataSource
+from mvt_builder import encode_mvt
+from pmtiles_archive import (
+    Entry,
+    Header,
+    PMTilesWriter,
+    deserialize_directory,
+    mbtiles_to_pmtiles,
+    serialize_directory,
+    tileid_to_zxy,
+    write_pmtiles,
+    zxy_to_tileid,
+)
+
+OCEAN = encode_mvt({"DEPARE": [{"geometry": {"type": "Point", "coordinates": [1, 1]}, "properties": {"DRVAL1": 50}}]})
+
+
+def test_tile_ids_follow_the_spec() -> None:
+    # Values from the PMTiles v3 specification.
+    assert zxy_to_tileid(0, 0, 0) == 0
+    assert [zxy_to_tileid(1, x, y) for x, y in ((0, 0), (0, 1), (1, 1), (1, 0))] == [1, 2, 3, 4]
+    assert zxy_to_tileid(2, 0, 0) == 5
+    assert zxy_to_tileid(12, 3423, 1763) == 19078479
+    for tile_id in range(0, 50000, 13):
+        assert zxy_to_tileid(*tileid_to_zxy(tile_id)) == tile_id
+    with pytest.raises(ValueError):
+        zxy_to_tileid(1, 2, 0)
+
+
+def test_directory_and_header_round_trip() -> None:
+    entries = [Entry(0, 0, 10, 1), Entry(5, 10, 7, 3), Entry(9, 0, 10, 1), Entry(40, 17, 4, 0)]
+    assert deserialize_directory(serialize_directory(entries, 2), 2) == entries
+    header = Header(addressed_tiles=7, min_lon=-76.5, max_lat=39.25, center_zoom=9)
+    assert len(header.pack()) == 127
+    assert Header.unpack(header.pack()) == header
+
+
+def test_writer_deduplicates_and_uses_leaf_directories(tmp_path) -> None:
+    tiles = {}
+    for x in range(256):
+        for y in range(256):
+            tiles[(8, x, y)] = OCEAN if (x + y) % 5 else f"{x}/{y}".encode()
+    out = tmp_path / "grid.pmtiles"
+    header = write_pmtiles(out, [(z, x, y, data) for (z, x, y), data in tiles.items()], {"name": "grid"})
+    assert header.addressed_tiles == len(tiles)
+    assert header.tile_contents == 1 + sum(1 for k in tiles if sum(k[1:]) % 5 == 0)
+    assert header.tile_entries < header.addressed_tiles
+    assert header.leaf_length > 0
+    assert (header.min_zoom, header.max_zoom) == (8, 8)
+
+    source = PMTilesDataSource(str(out))
+    for key, data in tiles.items():
+        tile = source.get_tile(*key)
+        assert isinstance(tile, memoryview)
+        assert gzip.decompress(tile) == data
+    assert source.get_tile(6, 0, 0) is None
+    assert source.metadata() == {"name": "grid"}
+
+
+def test_mbtiles_conversion(tmp_path) -> None:
+    mb = tmp_path / "chart.mbtiles"
+    conn = sqlite3.connect(mb)
+    conn.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    conn.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    conn.executemany(
+        "INSERT INTO metadata VALUES (?, ?)",
+        [
+            ("name", "chart"),
+            ("format", "pbf"),
+            ("bounds", "-77,38,-76,39"),
+            ("minzoom", "1"),
+            ("maxzoom", "2"),
+            ("json", json.dumps({"vector_layers": [{"id": "DEPARE"}]})),
+        ],
+    )
+    # XYZ 1/0/0 and 2/1/1 stored as TMS rows, one gzipped, one plain.
+    conn.execute("INSERT INTO tiles VALUES (1, 0, 1, ?)", (gzip.compress(OCEAN),))
+    conn.execute("INSERT INTO tiles VALUES (2, 1, 2, ?)", (OCEAN,))
+    conn.commit()
+    conn.close()
+
+    header = mbtiles_to_pmtiles(mb, tmp_path / "chart.pmtiles")
+    assert (header.min_zoom, header.max_zoom) == (1, 2)
+    assert (header.min_lon, header.max_lat) == (-77.0, 39.0)
+    assert header.tile_contents == 1
+    source = PMTilesDataSource(str(tmp_path / "chart.pmtiles"))
+    assert gzip.decompress(source.get_tile(1, 0, 0)) == OCEAN
+    assert gzip.decompress(source.get_tile(2, 1, 1)) == OCEAN
+    assert source.metadata()["vector_layers"] == [{"id": "DEPARE"}]
+
+
+def test_pmtiles_route(monkeypatch, tmp_path) -> None:
+    writer = PMTilesWriter(tmp_path / "region.pmtiles")
+    writer.add_tile(3, 2, 5, OCEAN)
+    writer.finalize({"name": "region", "vector_layers": [{"id": "DEPARE"}]}, min_zoom=0, max_zoom=8)
+    monkeypatch.setattr(tileserver, "_PMTILES_DIR", tmp_path)
+    client = TestClient(tileserver.app)
+
+    resp = client.get("/tiles/pmtiles/region/3/2/5", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["X-Tile-Cache"] == "pmtiles"
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["content-type"] == "application/x-protobuf"
+    assert resp.content == OCEAN
+    again = client.get("/tiles/pmtiles/region/3/2/5", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+    assert client.get("/tiles/pmtiles/region/3/2/4").headers["X-Tile-Cache"] == "empty"
+    assert client.get("/tiles/pmtiles/region/3/9/4").status_code == 422
+    assert client.get("/tiles/pmtiles/missing/3/2/5").status_code == 404
+    tilejson = client.get("/tiles/pmtiles/region.json").json()
+    assert tilejson["tiles"] == ["/tiles/pmtiles/region/{z}/{x}/{y}"]
+    assert (tilejson["minzoom"], tilejson["maxzoom"]) == (0, 8)
+    assert tilejson["vector_layers"] == [{"id": "DEPARE"}]
@@ -0,0 +1,59 @@
+import gzip
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tile_cache
+import tileserver
+from tile_cache import precompress
+
+
+def test_precompress_builds_variants_once() -> None:
+    data = b"\x1a\x02" * 400
+    tile = precompress(data, '"e"')
+    assert gzip.decompress(tile.gzip) == data
+    assert tile.encoded("gzip, deflate") == (tile.gzip, "gzip")
+    assert tile.encoded("gzip;q=0, identity") == (data, "")
+    assert tile.encoded("") == (data, "")
+
+    # payloads that are already gzip encoded are not compressed again
+    again = precompress(tile.gzip, '"e"')
+    assert again.data == data
+    assert again.gzip == tile.gzip
+
+    small = precompress(b"x" * 10, '"s"')
+    assert small.gzip is None
+    assert small.encoded("gzip, br") == (b"x" * 10, "")
+
+
+def test_tile_served_with_stored_encoding(monkeypatch) -> None:
+    monkeypatch.setattr(tile_cache, "_MIN_COMPRESS_SIZE", 0)
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+    url = "/tiles/cm93/6/10/20?fmt=mvt&safety=11"
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["X-Tile-Cache"] == "miss"
+
+    packed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert packed.headers["X-Tile-Cache"] == "hit"
+    # decoding once yields the tile, so the middleware did not re-compress it
+    assert packed.content == plain.content
+    assert packed.headers["ETag"] == plain.headers["ETag"]
+
+
+def test_precompressed_routes_skip_the_gzip_middleware() -> None:
+    for path in (
+        "/tiles/cm93/3/1/2",
+        "/tiles/enc/ds/3/1/2",
+        "/tiles/cm93-core/3/1/2.pbf",
+        "/tiles/cm93-label/3/1/2.pbf",
+        "/tiles/pmtiles/region/3/1/2",
+    ):
+        assert tileserver._PRECOMPRESSED_ROUTE.match(path), path
+    assert not tileserver._PRECOMPRESSED_ROUTE.match("/tiles/cm93/3/1/2.png")
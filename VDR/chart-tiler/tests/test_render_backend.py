@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import multiprocessing
+import time
+
+import mapbox_vector_tile
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from metrics import REGISTRY
+import render_worker
+from render_pool import ProcessRenderBackend
+
+
+def test_process_backend_matches_inline_render() -> None:
+    backend = ProcessRenderBackend(workers=1, max_tasks_per_child=2)
+    try:
+        assert backend.check()
+        cfg = tileserver.DEFAULT_CONFIG
+        before = REGISTRY.get_sample_value("tile_render_worker_tasks_total", {"worker": "0"}) or 0
+        first = backend.render("cm93-mvt", cfg, 4, 3, 5)
+        assert mapbox_vector_tile.decode(first)["features"]["features"]
+        # more renders than max_tasks_per_child so the worker is recycled
+        for _ in range(2):
+            assert backend.render("cm93-mvt", cfg, 4, 3, 5) == first
+        after = REGISTRY.get_sample_value("tile_render_worker_tasks_total", {"worker": "0"})
+        assert after == before + 3
+        assert backend.check()
+        # a saturated pool is still healthy; the check does not queue
+        busy = backend._pool.submit(time.sleep, 2)
+        started = time.perf_counter()
+        assert backend.check()
+        assert time.perf_counter() - started < 1
+        busy.result()
+    finally:
+        backend.shutdown()
+
+
+def test_worker_slots_are_reused() -> None:
+    slots = multiprocessing.get_context("spawn").Array("b", 2)
+    assert render_worker._claim_slot(slots) == 0
+    assert render_worker._claim_slot(slots) == 1
+    render_worker._release_slot(slots, 0)
+    # a recycled worker's replacement takes the freed slot, not a new one
+    assert render_worker._claim_slot(slots) == 0
@@ -0,0 +1,155 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from metrics import REGISTRY
+from registry import Dataset
+from render_pool import RenderExecutor, RenderOverloaded
+
+
+def _occupy(pool: RenderExecutor) -> tuple[threading.Event, threading.Thread]:
+    release = threading.Event()
+    started = threading.Event()
+
+    def _slow() -> None:
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=pool.run, args=(_slow,))
+    worker.start()
+    assert started.wait(5)
+    return release, worker
+
+
+def test_sheds_when_queue_is_full() -> None:
+    pool = RenderExecutor(workers=1, max_queue=1)
+    release, first = _occupy(pool)
+    queued = threading.Thread(target=pool.run, args=(lambda: None,))
+    queued.start()
+    deadline = time.time() + 5
+    while pool.queue_depth < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert pool.queue_depth == 1
+
+    before = REGISTRY.get_sample_value("tile_render_rejected_total") or 0
+    with pytest.raises(RenderOverloaded):
+        pool.run(lambda: None)
+    assert REGISTRY.get_sample_value("tile_render_rejected_total") == before + 1
+
+    release.set()
+    first.join()
+    queued.join()
+    assert pool.run(lambda: 42) == 42
+    assert pool.queue_depth == 0
+    pool.shutdown()
+
+
+def _blocking_dataset(monkeypatch, maxzoom: int, metatile: int) -> tuple[threading.Event, threading.Event]:
+    """Serve a dataset whose feature query blocks until ``release`` is set."""
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def _query(ds, bbox, scale):
+        started.set()
+        assert release.wait(5)
+        minx, miny, maxx, maxy = bbox
+        return [
+            {
+                "geometry": {"type": "LineString", "coordinates": [[minx, miny], [maxx, maxy]]},
+                "properties": {"OBJL": "COALNE"},
+            }
+        ]
+
+    dataset = Dataset("pool", "pool", Path("pool.mbtiles"), [-180, -85, 180, 85], 0, maxzoom, 1.0)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", metatile)
+    monkeypatch.setattr(tileserver, "_ENC_PASSTHROUGH", False)
+    tileserver._tile_cache.clear()
+    return started, release
+
+
+def _get_concurrently(pool: RenderExecutor, started: threading.Event, release: threading.Event, *urls: str) -> list:
+    """Request ``urls`` in order while the first one's render holds the only worker."""
+
+    responses = [None] * len(urls)
+
+    def _get(i: int) -> None:
+        responses[i] = TestClient(tileserver.app).get(urls[i])
+
+    threads = [threading.Thread(target=_get, args=(i,)) for i in range(len(urls))]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    deadline = time.time() + 5
+    while tileserver._flight.in_flight() < len(urls) and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    # Followers wait on their own threads instead of queueing for the worker.
+    assert pool.queue_depth == 0
+    release.set()
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive()
+    return responses
+
+
+def test_overzoom_waits_for_parent_outside_the_pool(monkeypatch) -> None:
+    pool = RenderExecutor(workers=1, max_queue=4)
+    monkeypatch.setattr(tileserver, "_render_executor", pool)
+    started, release = _blocking_dataset(monkeypatch, maxzoom=10, metatile=1)
+    try:
+        parent, child = _get_concurrently(
+            pool, started, release, "/tiles/enc/pool/10/200/300", "/tiles/enc/pool/12/801/1202"
+        )
+    finally:
+        release.set()
+        pool.shutdown()
+    assert parent.status_code == child.status_code == 200
+    assert child.headers["X-Tile-Cache"] == "miss"
+
+
+def test_metatile_siblings_wait_outside_the_pool(monkeypatch) -> None:
+    pool = RenderExecutor(workers=1, max_queue=4)
+    monkeypatch.setattr(tileserver, "_render_executor", pool)
+    started, release = _blocking_dataset(monkeypatch, maxzoom=16, metatile=2)
+    try:
+        responses = _get_concurrently(
+            pool, started, release, "/tiles/enc/pool/8/10/10", "/tiles/enc/pool/8/11/10", "/tiles/enc/pool/8/10/11"
+        )
+    finally:
+        release.set()
+        pool.shutdown()
+    assert [r.status_code for r in responses] == [200, 200, 200]
+
+
+def test_overloaded_render_returns_503_but_hits_still_served(monkeypatch) -> None:
+    pool = RenderExecutor(workers=1, max_queue=0, retry_after=3)
+    monkeypatch.setattr(tileserver, "_render_executor", pool)
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+    cached_url = "/tiles/cm93/3/1/1?fmt=mvt"
+    assert client.get(cached_url).status_code == 200
+
+    release, worker = _occupy(pool)
+    try:
+        shed = client.get("/tiles/cm93/3/2/2?fmt=mvt")
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "3"
+        hit = client.get(cached_url)
+        assert hit.status_code == 200
+        assert hit.headers["X-Tile-Cache"] == "hit"
+    finally:
+        release.set()
+        worker.join()
+        pool.shutdown()
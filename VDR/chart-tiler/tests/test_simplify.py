@@ -0,0 +1,97 @@
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import shapely
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import tileserver
+from metrics import REGISTRY
+from mvt_builder import tile_geometries
+from registry import Dataset
+from simplify import GeometryCache, geometry_nbytes, tolerance_for
+
+
+def _wiggly(bbox, n=4000) -> dict:
+    west, south, east, north = bbox
+    mid = (south + north) / 2
+    amp = (north - south) / 4096 * 0.8  # below one tile unit
+    coords = [[west + (east - west) * i / n, mid + amp * math.sin(i)] for i in range(n + 1)]
+    return {"type": "LineString", "coordinates": coords}
+
+
+def test_tolerance_bands() -> None:
+    assert tolerance_for(5) == 8
+    assert tolerance_for(10) == 4
+    assert tolerance_for(12) == 2
+    assert tolerance_for(16) == 0
+
+
+def test_simplifies_in_tile_units() -> None:
+    bbox = tileserver._tile_bbox(12, 2100, 1400)
+    west, south, east, north = bbox
+    ring = [[west + (east - west) * (0.5 + 0.3 * math.cos(a / 100)), south + (north - south) * (0.5 + 0.3 * math.sin(a / 100))] for a in range(629)]
+    polygon = {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+    full_line, full_poly = tile_geometries([_wiggly(bbox), polygon], bbox)
+    line, poly = tile_geometries([_wiggly(bbox), polygon], bbox, tolerance=tolerance_for(12))
+    assert shapely.get_num_coordinates(line) == 2 < shapely.get_num_coordinates(full_line)
+    assert shapely.get_num_coordinates(poly) < shapely.get_num_coordinates(full_poly)
+    assert poly.is_valid and abs(poly.area - full_poly.area) / full_poly.area < 0.01
+
+
+def test_geometry_cache_lru_and_fingerprint() -> None:
+    cache = GeometryCache(max_tiles=1)
+    geoms_a = shapely.points([[0, 0]])
+    cache.put("a", (1,), geoms_a)
+    assert cache.get("a", (1,)) is geoms_a
+    assert cache.get("a", (2,)) is None
+    cache.put("b", (1,), shapely.points([[1, 1]]))
+    assert cache.get("a", (1,)) is None and len(cache) == 1
+
+
+def test_geometry_cache_is_bounded_by_size() -> None:
+    line = shapely.linestrings([[i, i] for i in range(1000)])
+    geoms = np.array([line])
+    size = geometry_nbytes(geoms)
+    assert size >= 1000 * 16
+    cache = GeometryCache(max_tiles=100, max_bytes=size * 2)
+    for key in "abc":
+        cache.put(key, (1,), geoms)
+    # only two tiles fit although the tile count would allow a hundred
+    assert len(cache) == 2 and cache.nbytes == size * 2
+    assert cache.get("a", (1,)) is None
+    assert REGISTRY.get_sample_value("tile_geometry_cache_bytes") == size * 2
+    # tiles larger than the whole budget are not cached at all
+    GeometryCache(max_bytes=size - 1).put("big", (1,), geoms)
+    cache.clear()
+    assert cache.nbytes == 0
+
+
+def test_mariner_settings_share_simplified_geometry(monkeypatch) -> None:
+    calls = []
+
+    def _query(ds, bbox, scale):
+        return [{"geometry": _wiggly(bbox, 200), "properties": {"OBJL": "DEPCNT", "VALDCO": 10.0}}]
+
+    def _tile_geometries(*args, **kwargs):
+        calls.append(kwargs.get("tolerance"))
+        return tile_geometries(*args, **kwargs)
+
+    dataset = Dataset("simp", "simp", Path("s.mbtiles"), [0, 0, 0, 0], 0, 16, 1.0)
+    monkeypatch.setattr(tileserver, "get_dataset", lambda ds: dataset)
+    monkeypatch.setattr(tileserver, "query_features", _query)
+    monkeypatch.setattr(tileserver, "tile_geometries", _tile_geometries)
+    monkeypatch.setattr(tileserver, "_ENC_METATILE", 1)
+    monkeypatch.setattr(tileserver, "_geometry_cache", GeometryCache())
+    tileserver._tile_cache.clear()
+    client = TestClient(tileserver.app)
+
+    for query in ("safety=5", "safety=10", "mode=agnostic"):
+        resp = client.get(f"/tiles/enc/simp/10/530/350?{query}")
+        assert resp.status_code == 200
+        assert resp.headers["X-Tile-Cache"] == "miss"
+    assert calls == [tolerance_for(10)]
@@ -0,0 +1,97 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from singleflight import SingleFlight
+
+
+def _run_concurrently(n: int, target) -> list:
+    results: list = [None] * n
+    barrier = threading.Barrier(n)
+
+    def worker(i: int) -> None:
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as exc:  # pragma: no cover - asserted by caller
+            results[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_calls_share_one_render() -> None:
+    flight: SingleFlight[bytes] = SingleFlight()
+    calls = []
+
+    def render() -> bytes:
+        calls.append(1)
+        time.sleep(0.05)
+        return b"tile"
+
+    results = _run_concurrently(8, lambda: flight.do("mvt:ds:1/2/3", render))
+    assert len(calls) == 1
+    assert all(data == b"tile" for data, _ in results)
+    assert sum(1 for _, shared in results if shared) == 7
+    assert flight.in_flight() == 0
+
+
+def test_error_propagates_to_waiters_and_is_not_cached() -> None:
+    flight: SingleFlight[bytes] = SingleFlight()
+
+    def boom() -> bytes:
+        time.sleep(0.05)
+        raise RuntimeError("render failed")
+
+    results = _run_concurrently(4, lambda: flight.do("k", boom))
+    assert all(isinstance(r, RuntimeError) for r in results)
+    # the failed call is forgotten so the next request retries
+    assert flight.do("k", lambda: b"ok") == (b"ok", False)
+
+
+def test_distinct_keys_do_not_coalesce() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+
+
+def test_leader_error_reraised() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("x", lambda: int("nope"))
+
+
+def test_tile_stored_by_a_finished_flight_is_not_rendered_again(monkeypatch) -> None:
+    import tileserver
+    from tile_cache import CachedTile, TileCache
+
+    class _LateCache(TileCache):
+        """Miss the first lookup as if the previous flight had not stored yet."""
+
+        def __init__(self) -> None:
+            super().__init__(1 << 20)
+            self.lookups = 0
+
+        def get(self, key, kind=""):
+            self.lookups += 1
+            return None if self.lookups == 1 else super().get(key, kind)
+
+    cache = _LateCache()
+    cache.put("mvt::1/2/3:agnostic@v", CachedTile(b"tile", '"e"'), kind="enc")
+    monkeypatch.setattr(tileserver, "_tile_cache", cache)
+
+    def render() -> bytes:  # pragma: no cover - must not run
+        raise AssertionError("rendered twice")
+
+    tile, state = tileserver._cached_tile("mvt::1/2/3:agnostic@v", "enc", render, shared_tier=False)
+    assert (tile.data, state) == (b"tile", "hit")
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from metrics import REGISTRY
+from tile_cache import TileCache, _ENTRY_OVERHEAD
+
+
+def _entry_size(key: str, value: bytes) -> int:
+    return len(value) + len(key) + _ENTRY_OVERHEAD
+
+
+def test_evicts_least_recently_used_by_bytes() -> None:
+    value = b"x" * 1000
+    cache: TileCache[bytes] = TileCache(max_bytes=_entry_size("a", value) * 2)
+    cache.put("a", value, kind="t-lru")
+    cache.put("b", value, kind="t-lru")
+    assert cache.get("a", "t-lru") == value  # "b" is now least recently used
+    cache.put("c", value, kind="t-lru")
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.nbytes <= cache.max_bytes
+    evictions = REGISTRY.get_sample_value("tile_cache_evictions_total", {"kind": "t-lru"})
+    assert evictions == 1
+
+
+def test_accounting_per_kind_and_dataset() -> None:
+    cache: TileCache[bytes] = TileCache(max_bytes=1 << 20)
+    cache.put("enc:one:0/0/0", b"a" * 100, kind="t-enc", dataset="one")
+    cache.put("enc:two:0/0/0", b"b" * 50, kind="t-enc", dataset="two")
+    cache.put("png:0/0/0", b"c" * 10, kind="t-png")
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["kinds"]["t-enc"]["entries"] == 2
+    assert stats["datasets"]["one"] == _entry_size("enc:one:0/0/0", b"a" * 100)
+    assert REGISTRY.get_sample_value("tile_cache_entries", {"kind": "t-enc"}) == 2
+
+    # replacing a key does not double count
+    cache.put("enc:one:0/0/0", b"a" * 10, kind="t-enc", dataset="one")
+    assert cache.stats()["datasets"]["one"] == _entry_size("enc:one:0/0/0", b"a" * 10)
+
+    cache.clear()
+    assert cache.nbytes == 0
+    assert REGISTRY.get_sample_value("tile_cache_bytes", {"kind": "t-enc"}) == 0
+
+
+def test_hits_misses_and_oversized_values() -> None:
+    cache: TileCache[bytes] = TileCache(max_bytes=_ENTRY_OVERHEAD + 10)
+    assert cache.get("missing", "t-hm") is None
+    cache.put("big", b"x" * 100, kind="t-hm")
+    assert "big" not in cache
+    cache.put("k", b"1", kind="t-hm")
+    assert cache.get("k", "t-hm") == b"1"
+    assert REGISTRY.get_sample_value("tile_cache_misses_total", {"kind": "t-hm"}) == 1
+    assert REGISTRY.get_sample_value("tile_cache_hits_total", {"kind": "t-hm"}) == 1
@@ -18,9 +18,9 @@ TILES = [
     (
         "/tiles/cm93/0/0/0?fmt=mvt&sc=10",
         300,
-        "1b890b03e9622ecaccd0809783b1824bbaf363325366b79da5cee0bdeffa87e9",
+        "10c0193e76dab980225c8222a9d4082c00278f4de743e498ff032cac37f9cabb",
     ),
-    ("/tiles/cm93-core/12/0/0.pbf", 300, "e4f074fc13a65fe58c0baf7fddfc2f0dd88c57d90388b9ae81b1f15cd0d4844b"),
+    ("/tiles/cm93-core/12/0/0.pbf", 450, "9a7bf0ff2a1fd0bc72a10122bf560c33281e27c15fcd6f50078c869237af1be0"),
 ]
 
 
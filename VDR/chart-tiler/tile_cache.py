@@ -0,0 +1,294 @@
+"""Byte-budgeted in-memory tile cache shared by all render paths.
+
+Entries are evicted in least-recently-used order once the summed size of the
+cached payloads exceeds ``max_bytes``.  Sizes are tracked per *kind* (``enc``,
+``cm93-mvt``, ``geotiff`` …) and per dataset so the ``/metrics`` endpoint can
+show where memory goes.  The default budget is read from the
+``TILE_CACHE_BYTES`` environment variable.
+
+Tiles are cached as :class:`CachedTile` entries which keep the HTTP ``ETag``
+next to the payload so responses never hash the bytes again.  Compressible
+tiles also carry gzip (and, when the optional ``brotli`` package is
+installed, brotli) variants built once by :func:`precompress`.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Generic, NamedTuple, Optional, TypeVar
+
+try:  # pragma: no cover - brotli optional
+    import brotli
+except Exception:  # pragma: no cover
+    brotli = None
+
+from metrics import (
+    tile_cache_bytes,
+    tile_cache_dataset_bytes,
+    tile_cache_entries,
+    tile_cache_evictions_total,
+    tile_cache_hits_total,
+    tile_cache_misses_total,
+)
+
+V = TypeVar("V")
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Rough per-entry bookkeeping overhead (key string, OrderedDict node, tuple).
+_ENTRY_OVERHEAD = 200
+_GZIP_MAGIC = b"\x1f\x8b"
+_GZIP_LEVEL = 6
+# Below this size compression saves nothing worth a Content-Encoding header.
+_MIN_COMPRESS_SIZE = 512
+_BROTLI_QUALITY = 5
+
+
+def etag_for_bytes(data: bytes) -> str:
+    """Return a quoted strong ETag derived from the payload itself."""
+
+    return '"%s"' % hashlib.sha1(data).hexdigest()
+
+
+def etag_for_version(*parts: object) -> str:
+    """Return a quoted strong ETag from values that fully determine a tile.
+
+    Use with the cache key and dataset/render version so the ETag is known
+    without hashing the rendered bytes.
+    """
+
+    raw = "|".join(str(p) for p in parts).encode("utf-8")
+    return '"%s"' % hashlib.sha1(raw).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedTile:
+    """Tile payload together with its precomputed ``ETag``.
+
+    ``gzip`` and ``br`` hold the encoded variants of ``data`` when the tile
+    was passed through :func:`precompress`.
+    """
+
+    data: bytes
+    etag: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            len(self.data)
+            + len(self.etag)
+            + len(self.gzip or b"")
+            + len(self.br or b"")
+        )
+
+    def encoded(self, accept_encoding: str) -> tuple[bytes, str]:
+        """Return ``(body, content_encoding)`` preferred by ``accept_encoding``.
+
+        ``content_encoding`` is ``""`` for the identity representation.
+        """
+
+        accepted = _accepted_encodings(accept_encoding)
+        if self.br is not None and "br" in accepted:
+            return self.br, "br"
+        if self.gzip is not None and "gzip" in accepted:
+            return self.gzip, "gzip"
+        return self.data, ""
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Return codings listed in ``Accept-Encoding`` with a non-zero q-value."""
+
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    if "*" in accepted:
+        accepted.update(("gzip", "br"))
+    return accepted
+
+
+def precompress(data: bytes, etag: str) -> CachedTile:
+    """Return a :class:`CachedTile` carrying gzip/brotli variants of ``data``.
+
+    Payloads that already arrive gzip-encoded (for example from the OpenCPN
+    bridge) are kept as the gzip variant instead of being compressed again.
+    """
+
+    if data[:2] == _GZIP_MAGIC:
+        packed = data
+        data = gzip.decompress(packed)
+    elif len(data) < _MIN_COMPRESS_SIZE:
+        return CachedTile(data, etag)
+    else:
+        # mtime=0 keeps the output deterministic for identical tiles.
+        packed = gzip.compress(data, compresslevel=_GZIP_LEVEL, mtime=0)
+    br = brotli.compress(data, quality=_BROTLI_QUALITY) if brotli is not None else None
+    return CachedTile(data, etag, packed, br)
+
+
+def is_gzipped(data: bytes | memoryview) -> bool:
+    """Return whether ``data`` starts with the gzip magic number."""
+
+    return data[:2] == _GZIP_MAGIC
+
+
+def stored_encoding(data: bytes, accept_encoding: str) -> tuple[bytes, str]:
+    """Return ``(body, content_encoding)`` for a tile stored as ``data``.
+
+    Stored tiles (e.g. MBTiles ``tile_data``) may already be gzip-encoded;
+    they are passed through untouched when the client accepts gzip and
+    decompressed otherwise.  Other payloads are returned as they are; pass
+    uncompressed vector tiles through :func:`precompress` instead.
+    """
+
+    if not is_gzipped(data):
+        return data, ""
+    if "gzip" in _accepted_encodings(accept_encoding):
+        return data, "gzip"
+    return gzip.decompress(data), ""
+
+
+def _sizeof(value: Any) -> int:
+    """Return the payload size in bytes of a cached value."""
+
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return len(value)
+
+
+class _Slot(NamedTuple):
+    value: Any
+    size: int
+    kind: str
+    dataset: str
+
+
+class TileCache(Generic[V]):
+    """Thread-safe LRU cache bounded by total payload bytes."""
+
+    def __init__(self, max_bytes: int | None = None) -> None:
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("TILE_CACHE_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, _Slot]" = OrderedDict()
+        self._bytes = 0
+        self._kind_bytes: Dict[str, int] = defaultdict(int)
+        self._kind_entries: Dict[str, int] = defaultdict(int)
+        self._dataset_bytes: Dict[str, int] = defaultdict(int)
+
+    # -- lookups -----------------------------------------------------------
+    def get(self, key: str, kind: str = "") -> Optional[V]:
+        """Return the cached value for ``key`` and mark it recently used."""
+
+        with self._lock:
+            slot = self._data.get(key)
+            if slot is None:
+                tile_cache_misses_total.labels(kind=kind).inc()
+                return None
+            self._data.move_to_end(key)
+        tile_cache_hits_total.labels(kind=slot.kind).inc()
+        return slot.value
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    # -- updates -----------------------------------------------------------
+    def put(self, key: str, value: V, *, kind: str, dataset: str = "") -> None:
+        """Insert ``value`` under ``key`` evicting old entries as needed."""
+
+        size = _sizeof(value) + len(key) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._account(old, -1)
+            slot = _Slot(value, size, kind, dataset)
+            self._data[key] = slot
+            self._account(slot, +1)
+            while self._bytes > self.max_bytes and self._data:
+                _, victim = self._data.popitem(last=False)
+                self._account(victim, -1)
+                tile_cache_evictions_total.labels(kind=victim.kind).inc()
+
+    def pop(self, key: str) -> Optional[V]:
+        with self._lock:
+            slot = self._data.pop(key, None)
+            if slot is None:
+                return None
+            self._account(slot, -1)
+            return slot.value
+
+    def clear(self) -> None:
+        with self._lock:
+            for slot in self._data.values():
+                self._account(slot, -1)
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the cache accounting."""
+
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "entries": len(self._data),
+                "kinds": {
+                    k: {"bytes": b, "entries": self._kind_entries[k]}
+                    for k, b in self._kind_bytes.items()
+                    if self._kind_entries[k]
+                },
+                "datasets": {d: b for d, b in self._dataset_bytes.items() if b},
+            }
+
+    # -- internals ---------------------------------------------------------
+    def _account(self, slot: _Slot, sign: int) -> None:
+        delta = sign * slot.size
+        self._bytes += delta
+        self._kind_bytes[slot.kind] += delta
+        self._kind_entries[slot.kind] += sign
+        tile_cache_bytes.labels(kind=slot.kind).set(self._kind_bytes[slot.kind])
+        tile_cache_entries.labels(kind=slot.kind).set(self._kind_entries[slot.kind])
+        if slot.dataset:
+            self._dataset_bytes[slot.dataset] += delta
+            tile_cache_dataset_bytes.labels(dataset=slot.dataset).set(
+                self._dataset_bytes[slot.dataset]
+            )
+
+
+__all__ = [
+    "CachedTile",
+    "TileCache",
+    "DEFAULT_MAX_BYTES",
+    "etag_for_bytes",
+    "etag_for_version",
+    "is_gzipped",
+    "precompress",
+    "stored_encoding",
+]
@@ -15,17 +15,16 @@ import json
 import logging
 import math
 import os
+import re
 import sys
 import time
 import xml.etree.ElementTree as ET
-from collections import OrderedDict
 from functools import lru_cache
 from pathlib import Path
-import hashlib
 import resource
 import sqlite3
 from registry import get_registry, ChartRecord, list_datasets, get_dataset
-from typing import Dict, Optional, List, Any
+from typing import Callable, Dict, Iterable, Optional, List, Any
 
 try:
     from rio_tiler.io import Reader  # type: ignore
@@ -46,8 +45,29 @@ from metrics import (
     tile_render_seconds,
     tile_bytes_total,
     tile_size_bytes,
+    tile_layer_bytes,
+    tile_coalesced_total,
+    tile_empty_total,
     process_resident_memory_bytes,
 )
+from singleflight import SingleFlight
+from render_pool import ProcessRenderBackend, RenderExecutor, RenderOverloaded, backend_from_env
+from asset_cache import AssetCache
+from tile_cache import (
+    CachedTile,
+    TileCache,
+    etag_for_bytes,
+    etag_for_version,
+    is_gzipped,
+    precompress,
+    stored_encoding,
+)
+from datasource_mbtiles import get_datasource
+import datasource_pmtiles
+import pmtiles_archive
+import disk_cache
+from disk_cache import DiskKey, partition_name
+import cm93_store
 
 try:  # pragma: no cover - redis optional
     import redis
@@ -59,11 +79,16 @@ try:
 except Exception:  # pragma: no cover - optional dependency
     def query_features(handle, bbox, scale):  # type: ignore
         return []
-from mvt_builder import encode_mvt
-from s52_preclass import S52PreClassifier, ContourConfig
+from mvt_builder import EXTENT, MVT_BUFFER, encode_mvt, tile_geometries
+from mvt_layers import MVT_LAYERS, layer_sizes, split_features, vector_layers
+from simplify import GeometryCache, cache_from_env as geometry_cache_from_env, tolerance_for
+from overzoom import overzoom_tile
+from empty_tiles import EmptyTileIndex, tile_outside_bounds
+from contour_index import ContourIndex, ContourIndexCache, contour_marks
+from s52_preclass import S52PreClassifier, ContourConfig, batch_columns
 from cm93_rules import apply_scamin
 from lights import build_light_sectors, build_light_character
-from shapely.geometry import Point, mapping
+from shapely.geometry import Point, mapping, shape
 from dict_builder import _MAPPING as _DICT_MAPPING
 try:  # pragma: no cover - optional pillow
     from raster_mvp import render_tile as render_raster, RasterMVPUnavailable
@@ -74,12 +99,38 @@ except Exception:  # pragma: no cover
 
 # Allow importing parsing helpers
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "server-styling"))
-from s52_xml import parse_day_colors, parse_symbols
+from s52_xml import parse_day_colors, parse_lookups
+import s52_ruletable
+from s52_ruletable import RuleTable
+
+
+class _GZipUnlessPrecompressed(GZipMiddleware):
+    """``GZipMiddleware`` that leaves precompressed tile routes untouched.
+
+    Vector tiles and static assets are stored gzip/brotli encoded once and served
+    with their own ``Content-Encoding``; compressing them again per request
+    would only burn CPU.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and _PRECOMPRESSED_ROUTE.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Routes whose payloads are precompressed by ``_cached_tile`` or the asset cache.
+_PRECOMPRESSED_ROUTE = re.compile(
+    r"^/(?:tiles/(?:cm93|enc(?:/[^/]+)?)/\d+/\d+/\d+"
+    r"|style/[^/]+\.json|sprites/[^/]+|glyphs/[^/]+/[^/]+\.pbf"
+    r"|tiles/pmtiles/[^/]+/\d+/\d+/\d+|tiles/cm93-(?:core|label)/\d+/\d+/\d+\.pbf"
+    r"|tiles/cm93/dict\.json|tiles/cm93-(?:core|label)\.tilejson)$"
+)
 
 
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"])
-app.add_middleware(GZipMiddleware, minimum_size=512)
+app.add_middleware(_GZipUnlessPrecompressed, minimum_size=512)
 logger = logging.getLogger("tileserver")
 
 
@@ -88,6 +139,15 @@ async def _http_exc_handler(_: Request, exc: HTTPException) -> JSONResponse:
     return JSONResponse({"error": exc.detail or "error"}, status_code=exc.status_code)
 
 
+@app.exception_handler(RenderOverloaded)
+async def _overloaded_handler(_: Request, exc: RenderOverloaded) -> JSONResponse:
+    return JSONResponse(
+        {"error": "render queue full"},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.exception_handler(Exception)
 async def _exc_handler(_: Request, exc: Exception) -> JSONResponse:  # pragma: no cover - defensive
     logger.exception("unhandled error: %s", exc)
@@ -100,6 +160,59 @@ _redis: Optional["redis.Redis"] = (
     redis.from_url(os.environ["REDIS_URL"]) if redis and "REDIS_URL" in os.environ else None
 )
 _redis_ttl = int(os.environ.get("REDIS_TTL", "0"))
+# One byte-budgeted cache (``TILE_CACHE_BYTES``) backs every render path.
+_tile_cache: TileCache[CachedTile] = globals().setdefault("_tile_cache", TileCache())
+# Optional write-through disk tier enabled by ``TILE_DISK_CACHE_DIR``.
+_disk_cache: Optional[disk_cache.DiskTileCache] = globals().setdefault(
+    "_disk_cache", disk_cache.from_env()
+)
+# Bump when rendering output changes so persisted tiles are not reused.
+_RENDER_VERSION = "5"
+if MVT_LAYERS == "split":
+    # Split-layer tiles must not be served from tiers filled with single-layer ones.
+    _RENDER_VERSION += "-split"
+# Kinds whose payload is an MVT; their per-layer sizes are recorded.
+_MVT_KINDS = frozenset({"enc", "cm93-mvt", "cm93-core", "cm93-label"})
+# ENC tiles are rendered in ``ENC_METATILE``×``ENC_METATILE`` blocks from one
+# bridge query; 1 renders each tile on its own.
+_ENC_METATILE = max(1, int(os.environ.get("ENC_METATILE", "1")))
+# Serve tiles stored in a dataset's MBTiles as-is unless mariner parameters
+# or ``mode=agnostic`` are given (``ENC_MBTILES_PASSTHROUGH=0`` always renders).
+_ENC_PASSTHROUGH = os.environ.get("ENC_MBTILES_PASSTHROUGH", "1") != "0"
+# Directory of ``<archive>.pmtiles`` files served by ``/tiles/pmtiles``.
+_PMTILES_DIR = Path(
+    os.environ.get("PMTILES_DIR")
+    or os.environ.get("ENC_DIR", Path(__file__).resolve().parent / "data" / "enc")
+)
+# Projected, clipped and simplified geometries per dataset version and tile.
+_geometry_cache: GeometryCache = globals().setdefault("_geometry_cache", geometry_cache_from_env())
+# Fraction of a tile's width kept around clipped metatile children.
+_METATILE_BUFFER = MVT_BUFFER / EXTENT
+# Concurrent misses for the same cache key share a single render.
+_flight: SingleFlight[tuple[CachedTile, str]] = globals().setdefault("_flight", SingleFlight())
+# Optional worker processes for CPU-heavy renders (``TILE_RENDER_BACKEND``).
+_render_backend: Optional[ProcessRenderBackend] = globals().setdefault(
+    "_render_backend", backend_from_env()
+)
+# Renders run here, bounded by ``TILE_RENDER_WORKERS``/``TILE_RENDER_QUEUE``.
+_render_executor: RenderExecutor = globals().setdefault(
+    "_render_executor",
+    RenderExecutor(workers=_render_backend.workers if _render_backend else None),
+)
+# Tiles known to be empty per dataset version (exact sparse bitset).
+_empty_tiles: EmptyTileIndex = globals().setdefault("_empty_tiles", EmptyTileIndex())
+_meta_flight: SingleFlight[Dict[tuple[int, int], bytes]] = globals().setdefault(
+    "_meta_flight", SingleFlight()
+)
+# CM93 core and label planes of a tile are built together (``_cm93_plane``).
+_planes_flight: SingleFlight[Dict[str, bytes]] = globals().setdefault(
+    "_planes_flight", SingleFlight()
+)
+# Optional SQLite CM93 database written by cm93_importer (``CM93_DB``); without
+# it CM93 tiles show the deterministic placeholder features.
+_cm93_store: Optional[cm93_store.CM93Store] = globals().setdefault("_cm93_store", cm93_store.from_env())
+# Dataset-wide contour depths so every tile promotes the same safety contour.
+_contour_indexes: ContourIndexCache = globals().setdefault("_contour_indexes", ContourIndexCache())
 
 
 def _rss_bytes() -> int:
@@ -135,6 +248,8 @@ async def _metrics_middleware(request: Request, call_next):
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 STYLING_DIST = BASE_DIR / "server-styling" / "dist"
+# Style, sprite, glyph and dict files, reloaded when their mtime changes.
+_asset_cache = AssetCache(STYLING_DIST)
 
 PNG_1X1 = base64.b64decode(
     b"iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/x8AAwMCAO+jP1kAAAAASUVORK5CYII="
@@ -142,11 +257,31 @@ PNG_1X1 = base64.b64decode(
 
 
 
-def _cache_key(fmt: str, cfg: ContourConfig, z: int, x: int, y: int, ds: str = "") -> str:
-    """Return a cache key incorporating format, dataset and mariner params."""
+def _cache_key(
+    fmt: str,
+    cfg: Optional[ContourConfig],
+    z: int,
+    x: int,
+    y: int,
+    ds: str = "",
+    version: str = "",
+) -> str:
+    """Return a cache key incorporating format, dataset, mariner params and version.
+
+    ``cfg`` is ``None`` for mariner-agnostic tiles, which share one key for
+    every safety setting.  ``version`` (render and dataset version) keeps
+    tiles of a re-imported chart from being served out of the memory tier.
+    """
+
+    return f"{fmt}:{ds}:{z}/{x}/{y}:{_mariner_variant(cfg)}@{version}"
 
-    mariner = f"{cfg.safety},{cfg.shallow},{cfg.deep}"
-    return f"{fmt}:{ds}:{z}/{x}/{y}:{mariner}"
+
+def _mariner_variant(cfg: Optional[ContourConfig]) -> str:
+    """Return the normalised mariner configuration used in cache keys."""
+
+    if cfg is None:
+        return "agnostic"
+    return f"{float(cfg.safety):g},{float(cfg.shallow):g},{float(cfg.deep):g}"
 
 
 def _tile_bbox(z: int, x: int, y: int) -> tuple[float, float, float, float]:
@@ -178,23 +313,59 @@ def _cfg_from_params(
 
 
 _chartsymbols_path = STYLING_DIST / "assets" / "s52" / "chartsymbols.xml"
-try:
-    _root = ET.parse(_chartsymbols_path).getroot()
-    _day_colors = parse_day_colors(_root)
-    _symbols = parse_symbols(_root)
-except FileNotFoundError:
-    _root = ET.Element("root")
-    _day_colors = {}
-_symbols = {}
+_rules_path = STYLING_DIST / "assets" / "s52" / "s52rules.bin"
+
+
+def _load_compiled_rules() -> Optional[Dict[str, Any]]:
+    """Return the compiled rule table unless chartsymbols.xml is newer."""
+
+    try:
+        if _chartsymbols_path.stat().st_mtime > _rules_path.stat().st_mtime:
+            return None
+    except FileNotFoundError:
+        pass
+    return s52_ruletable.load(_rules_path)
+
+
+_compiled_rules = _load_compiled_rules()
+if _compiled_rules is not None:
+    # Built by build_style_json.py; avoids parsing the XML at start-up.
+    _day_colors = _compiled_rules["colors"]
+    _rule_lookups = _compiled_rules["rules"]
+else:
+    try:
+        _root = ET.parse(_chartsymbols_path).getroot()
+        _day_colors = parse_day_colors(_root)
+        _rule_lookups = s52_ruletable.compile_lookups(parse_lookups(_root))
+    except FileNotFoundError:
+        _root = ET.Element("root")
+        _day_colors = {}
+        _rule_lookups = {}
+_rules = RuleTable(_rule_lookups)
+# Tiles portrayed with another rule table or colour set must not be reused.
+_RENDER_VERSION += f"-s52.{s52_ruletable.digest(_rule_lookups, _day_colors)}"
 DEFAULT_CONFIG = ContourConfig()
 
+# Shared tile for requests outside a dataset's coverage; outside the bounds
+# nothing will ever render so clients may keep it for a day.
+_EMPTY_MVT = encode_mvt({} if MVT_LAYERS == "split" else [])
+_EMPTY_TILE = precompress(_EMPTY_MVT, etag_for_bytes(_EMPTY_MVT))
+_EMPTY_MAX_AGE = 86400
+
+# Below this many features of one class the per-feature classifier is cheaper.
+_CLASSIFY_BATCH_MIN = 32
+
 # Reverse lookup for compact object codes used in tiles
 _OBJL_CODES: Dict[str, int] = {v: k for k, v in _DICT_MAPPING.items()}
 
 
 @lru_cache(maxsize=32)
-def _get_classifier(cfg: ContourConfig) -> S52PreClassifier:
-    return S52PreClassifier(cfg, _day_colors, symbols=_symbols)
+def _get_classifier(cfg: Optional[ContourConfig]) -> S52PreClassifier:
+    """Return the classifier for ``cfg``; ``None`` selects agnostic mode."""
+
+    if cfg is None:
+        return S52PreClassifier(DEFAULT_CONFIG, _day_colors, agnostic=True, rules=_rules)
+    return S52PreClassifier(cfg, _day_colors, rules=_rules)
 
 
 def _rect_polygon(x1: float, y1: float, x2: float, y2: float) -> List[List[List[float]]]:
@@ -279,19 +450,44 @@ def features_for_tile(bbox, z: int, x: int, y: int) -> List[Dict[str, Any]]:
     return feats
 
 
+def _cm93_features(bbox, z: int, x: int, y: int) -> List[Dict[str, Any]]:
+    """Return CM93 features for the tile from ``CM93_DB`` or the placeholders.
+
+    Database features carry shapely geometries, placeholders GeoJSON dicts.
+    """
+
+    if _cm93_store is not None:
+        return _cm93_store.features_for_tile(bbox, z, x, y)
+    return features_for_tile(bbox, z, x, y)
+
+
+def _cm93_version() -> str:
+    """Return the cache version of CM93 tiles."""
+
+    if _cm93_store is None:
+        return f"{_RENDER_VERSION}:cm93"
+    return f"{_RENDER_VERSION}:cm93:{_cm93_store.version}"
+
+
+def _geom_type(geom: Any) -> Optional[str]:
+    return geom.get("type") if isinstance(geom, dict) else geom.geom_type
+
+
 def _build_features(cfg: ContourConfig, z: int, x: int, y: int) -> List[Dict[str, Any]]:
     bbox = _tile_bbox(z, x, y)
     classifier = _get_classifier(cfg)
 
     feats: List[Dict[str, Any]] = []
     contours: List[Dict[str, Any]] = []
-    for feat in features_for_tile(bbox, z, x, y):
+    for feat in _cm93_features(bbox, z, x, y):
         props = dict(feat.get("properties", {}))
         objl = props.get("OBJL", "")
         if objl == "LIGHTS":
             if not apply_scamin(objl, z):
                 continue
-            sector = build_light_sectors(Point(feat["geometry"]["coordinates"]), props)
+            geom = feat["geometry"]
+            point = Point(geom["coordinates"]) if isinstance(geom, dict) else geom
+            sector = build_light_sectors(point, props)
             if sector.geom_type == "MultiPolygon":
                 exterior = list(sector.geoms[0].exterior.coords)[:2]
                 geom = {"type": "LineString", "coordinates": exterior}
@@ -314,6 +510,7 @@ def _build_features(cfg: ContourConfig, z: int, x: int, y: int) -> List[Dict[str
             continue
         if not apply_scamin(objl, z):
             continue
+        props.update(classifier.portray(objl, props, _geom_type(feat["geometry"])))
         props.update(classifier.classify(objl, props))
         props["OBJL"] = _OBJL_CODES.get(objl, 0)
         feat_dict = {"geometry": feat["geometry"], "properties": props}
@@ -328,43 +525,40 @@ def _build_features(cfg: ContourConfig, z: int, x: int, y: int) -> List[Dict[str
     return feats
 
 
-@lru_cache(maxsize=512)
-def _render_mvt(cfg: ContourConfig, z: int, x: int, y: int) -> bytes:
-    """Build a Mapbox Vector Tile for the requested tile."""
-    feats = _build_features(cfg, z, x, y)
-    return encode_mvt(feats)
-
-
-# SQLite-backed helpers used in tests to mimic the PostGIS SQL functions.
-_db = sqlite3.connect(":memory:", check_same_thread=False)
+def _objl_pairs(feats: List[Dict[str, Any]]) -> List[tuple[str, Dict[str, Any]]]:
+    """Return ``(objl, feature)`` pairs for features carrying OBJL codes."""
 
+    return [(_DICT_MAPPING.get(f["properties"].get("OBJL"), ""), f) for f in feats]
 
-def _cm93_mvt_core_py(z: int, x: int, y: int) -> bytes:
-    feats = _build_features(DEFAULT_CONFIG, z, x, y)
-    return sqlite3.Binary(encode_mvt(feats))
 
-
-def _cm93_mvt_label_py(z: int, x: int, y: int) -> bytes:
-    feats = [f for f in _build_features(DEFAULT_CONFIG, z, x, y) if "text" in f.get("properties", {})]
-    return sqlite3.Binary(encode_mvt(feats))
+def _render_mvt(cfg: ContourConfig, z: int, x: int, y: int) -> bytes:
+    """Build a Mapbox Vector Tile for the requested tile."""
+    feats = _build_features(cfg, z, x, y)
+    return _encode_tile(_objl_pairs(feats), _tile_bbox(z, x, y), z)
 
 
-_db.create_function("cm93_mvt_core", 3, _cm93_mvt_core_py)
-_db.create_function("cm93_mvt_label", 3, _cm93_mvt_label_py)
+def _render_cm93_planes(z: int, x: int, y: int) -> Dict[str, bytes]:
+    """Build a CM93 tile's features once and encode its core and label planes.
 
+    The label plane holds the features carrying ``text``; their geometries
+    are projected and clipped together with the core plane's.
+    """
 
-def _query_mvt(func: str, z: int, x: int, y: int) -> bytes:
-    row = _db.execute(f"SELECT {func}(?, ?, ?)", (z, x, y)).fetchone()
-    return bytes(row[0]) if row and row[0] is not None else b""
+    feats = _objl_pairs(_build_features(DEFAULT_CONFIG, z, x, y))
+    geoms = tile_geometries([f["geometry"] for _, f in feats], _tile_bbox(z, x, y), tolerance=tolerance_for(z))
+    kept = [(objl, {**feat, "geometry": geom}) for (objl, feat), geom in zip(feats, geoms) if geom is not None]
+    labels = [(objl, feat) for objl, feat in kept if "text" in feat["properties"]]
+    return {
+        "cm93-core": encode_mvt(_tile_layers(kept)),
+        "cm93-label": encode_mvt(_tile_layers(labels)),
+    }
 
 
-@lru_cache(maxsize=512)
 def _render_png(cfg: ContourConfig, z: int, x: int, y: int) -> bytes:  # pragma: no cover - trivial
     _ = (cfg, z, x, y)
     return PNG_1X1
 
 
-@lru_cache(maxsize=256)
 def _render_png_mvp(cfg: ContourConfig, z: int, x: int, y: int) -> bytes:
     if not render_raster:
         raise RasterMVPUnavailable("Pillow missing")
@@ -372,11 +566,13 @@ def _render_png_mvp(cfg: ContourConfig, z: int, x: int, y: int) -> bytes:
     classifier = _get_classifier(cfg)
     feats = []
     contours = []
-    for feat in features_for_tile(bbox, z, x, y):
+    for feat in _cm93_features(bbox, z, x, y):
         props = dict(feat.get("properties", {}))
         objl = props.get("OBJL", "")
+        geom = feat["geometry"]
+        props.update(classifier.portray(objl, props, _geom_type(geom)))
         props.update(classifier.classify(objl, props))
-        feat_dict = {"geometry": feat["geometry"], "properties": props}
+        feat_dict = {"geometry": geom if isinstance(geom, dict) else mapping(geom), "properties": props}
         feats.append(feat_dict)
         if objl == "DEPCNT":
             contours.append(feat_dict)
@@ -388,51 +584,349 @@ def _render_png_mvp(cfg: ContourConfig, z: int, x: int, y: int) -> bytes:
     return render_raster(z, x, y, feats, _day_colors)
 
 
-@lru_cache(maxsize=512)
-def _render_enc_mvt(ds: str, cfg: ContourConfig, z: int, x: int, y: int) -> bytes:
-    """Render an ENC tile by querying features and encoding to MVT."""
+def _classify_enc(
+    raw_feats: Iterable[Dict[str, Any]], cfg: Optional[ContourConfig], z: int
+) -> List[tuple[str, Dict[str, Any]]]:
+    """Return ``(objl, feature)`` pairs classified for zoom ``z``.
+
+    Features are grouped by object class; large groups (soundings, depth
+    areas) are classified column-wise with
+    :meth:`S52PreClassifier.classify_batch`.
+    """
 
-    bbox = _tile_bbox(z, x, y)
-    scale = 2 ** z
-    raw_feats = query_features(ds, bbox, scale)
     classifier = _get_classifier(cfg)
-    feats: List[Dict[str, Any]] = []
-    contours: List[Dict[str, Any]] = []
+    feats: List[tuple[str, Dict[str, Any]]] = []
+    groups: Dict[str, List[Dict[str, Any]]] = {}
     for feat in raw_feats:
         props = dict(feat.get("properties", {}))
         objl = props.get("OBJL", "")
         if not apply_scamin(objl, z):
             continue
-        props.update(classifier.classify(objl, props))
-        props["OBJL"] = _OBJL_CODES.get(objl, 0)
-        feat_dict = {"geometry": feat["geometry"], "properties": props}
-        feats.append(feat_dict)
-        if objl == "DEPCNT":
-            contours.append(feat_dict)
-    mark = S52PreClassifier.finalize_tile(contours, cfg)
+        props.update(classifier.portray(objl, props, feat["geometry"].get("type")))
+        groups.setdefault(objl, []).append(props)
+        feats.append((objl, {"geometry": feat["geometry"], "properties": props}))
+    for objl, group in groups.items():
+        if len(group) >= _CLASSIFY_BATCH_MIN:
+            classifier.classify_batch(objl, batch_columns(objl, group)).update(group)
+        else:
+            for props in group:
+                props.update(classifier.classify(objl, props))
+    for objl, feat in feats:
+        feat["properties"]["OBJL"] = _OBJL_CODES.get(objl, 0)
+    return feats
+
+
+def _encode_enc_tile(
+    feats: List[tuple[str, Dict[str, Any]]],
+    cfg: Optional[ContourConfig],
+    contour: Optional[float] = None,
+    bbox: Optional[tuple[float, float, float, float]] = None,
+    z: int = 0,
+    key: Optional[tuple] = None,
+) -> bytes:
+    """Promote the tile's safety contour and encode ``feats`` to MVT.
+
+    ``contour`` is the dataset-wide safety contour depth from the contour
+    index; without it the substitute is chosen from this tile's contours.
+    Agnostic tiles (``cfg`` is ``None``) instead carry the neighbouring contour
+    depths so the style can pick the safety contour itself.  Geometries go
+    through :func:`_encode_tile` for ``bbox``, ``z`` and ``key``.
+    """
+
+    contours = [feat for objl, feat in feats if objl == "DEPCNT"]
+    if cfg is None:
+        S52PreClassifier.contour_candidates(contours)
+        return _encode_tile(feats, bbox, z, key)
+    if contour is not None:
+        mark = contour_marks(contours, contour, cfg.safety)
+    else:
+        mark = S52PreClassifier.finalize_tile(contours, cfg)
     for idx in mark:
         props = contours[idx]["properties"]
         props["role"] = "safety"
         props["isSafety"] = True
-    return encode_mvt(feats)
+    return _encode_tile(feats, bbox, z, key)
+
+
+def _tile_layers(feats: List[tuple[str, Dict[str, Any]]]) -> Any:
+    """Return ``(objl, feature)`` pairs as layers for :func:`encode_mvt`.
+
+    With ``TILE_MVT_LAYERS=split`` features go to the schema layers of
+    :mod:`mvt_layers`; otherwise they share the single ``features`` layer.
+    """
+
+    if MVT_LAYERS == "split":
+        return split_features(feats)
+    return [feat for _, feat in feats]
+
+
+def _encode_tile(
+    feats: List[tuple[str, Dict[str, Any]]],
+    bbox: Optional[tuple[float, float, float, float]],
+    z: int,
+    key: Optional[tuple] = None,
+) -> bytes:
+    """Encode lon/lat ``(objl, feature)`` pairs for the tile ``bbox`` at zoom ``z``.
+
+    Geometries are projected, clipped and simplified for the zoom once per
+    ``key`` (dataset, version and tile); other mariner settings reuse them.
+    """
+
+    if bbox is None:
+        return encode_mvt(_tile_layers(feats))
+    fingerprint = tuple(f["properties"].get("OBJL") for _, f in feats)
+    geoms = _geometry_cache.get(key, fingerprint) if key is not None else None
+    if geoms is None:
+        geoms = tile_geometries([f["geometry"] for _, f in feats], bbox, tolerance=tolerance_for(z))
+        if key is not None:
+            _geometry_cache.put(key, fingerprint, geoms)
+    return encode_mvt(
+        _tile_layers(
+            [(objl, {**feat, "geometry": geom}) for (objl, feat), geom in zip(feats, geoms) if geom is not None]
+        )
+    )
 
 
-def _get_from_redis(key: str) -> Optional[bytes]:  # pragma: no cover - depends on redis
+def _render_enc_mvt(
+    ds: str,
+    cfg: Optional[ContourConfig],
+    z: int,
+    x: int,
+    y: int,
+    contour: Optional[float] = None,
+    version: Optional[str] = None,
+) -> bytes:
+    """Render an ENC tile by querying features and encoding to MVT.
+
+    With the dataset ``version`` the tile's simplified geometries are cached.
+    """
+
+    bbox = _tile_bbox(z, x, y)
+    scale = 2 ** z
+    raw_feats = query_features(ds, bbox, scale)
+    key = (ds, version, z, x, y) if version is not None else None
+    return _encode_enc_tile(_classify_enc(raw_feats, cfg, z), cfg, contour, bbox, z, key)
+
+
+def _metatile_origin(z: int, x: int, y: int) -> tuple[int, int, int]:
+    """Return ``(size, x0, y0)`` of the ENC metatile containing ``z/x/y``."""
+
+    size = max(1, min(_ENC_METATILE, 2 ** z))
+    return size, x - x % size, y - y % size
+
+
+def _render_enc_metatile(
+    ds: str,
+    cfg: Optional[ContourConfig],
+    z: int,
+    x0: int,
+    y0: int,
+    size: int,
+    contour: Optional[float] = None,
+    version: Optional[str] = None,
+) -> Dict[tuple[int, int], bytes]:
+    """Render a ``size``×``size`` block of ENC tiles from one bridge query.
+
+    Features are queried and classified once for the whole block. Each child
+    tile takes the features reaching into it (plus the clip buffer) for its
+    safety contour selection; :func:`encode_mvt` then clips them.
+    """
+
+    west, _, _, north = _tile_bbox(z, x0, y0)
+    _, south, east, _ = _tile_bbox(z, x0 + size - 1, y0 + size - 1)
+    classified = [
+        (objl, feat, shape(feat["geometry"]))
+        for objl, feat in _classify_enc(
+            query_features(ds, (west, south, east, north), 2 ** z), cfg, z
+        )
+    ]
+    tiles: Dict[tuple[int, int], bytes] = {}
+    for cx in range(x0, x0 + size):
+        for cy in range(y0, y0 + size):
+            tile_bbox = _tile_bbox(z, cx, cy)
+            minx, miny, maxx, maxy = tile_bbox
+            bx = (maxx - minx) * _METATILE_BUFFER
+            by = (maxy - miny) * _METATILE_BUFFER
+            minx, miny, maxx, maxy = minx - bx, miny - by, maxx + bx, maxy + by
+            child: List[tuple[str, Dict[str, Any]]] = []
+            for objl, feat, geom in classified:
+                gx0, gy0, gx1, gy1 = geom.bounds
+                if gx1 < minx or gx0 > maxx or gy1 < miny or gy0 > maxy:
+                    continue
+                # Properties are copied so each child gets its own safety role.
+                child.append((objl, {"geometry": geom, "properties": dict(feat["properties"])}))
+            key = (ds, version, z, cx, cy) if version is not None else None
+            tiles[(cx, cy)] = _encode_enc_tile(child, cfg, contour, tile_bbox, z, key)
+    return tiles
+
+
+def _get_from_redis(key: str) -> Optional[CachedTile]:  # pragma: no cover - depends on redis
     if _redis:
-        cached = _redis.get(key)
-        if cached:
+        data, etag = _redis.mget(key, f"{key}:etag")
+        if data:
             _cache_hits.inc()
-            return cached
+            return CachedTile(data, etag.decode() if etag else etag_for_bytes(data))
     return None
 
 
-def _set_redis(key: str, value: bytes) -> None:  # pragma: no cover - depends on redis
+def _set_redis(key: str, tile: CachedTile) -> None:  # pragma: no cover - depends on redis
     if _redis:
-        _redis.set(key, value, ex=_redis_ttl or None)
+        pipe = _redis.pipeline()
+        pipe.set(key, tile.data, ex=_redis_ttl or None)
+        pipe.set(f"{key}:etag", tile.etag, ex=_redis_ttl or None)
+        pipe.execute()
+
+
+def _store_tile(
+    key: str,
+    kind: str,
+    data: bytes,
+    *,
+    dataset: str = "",
+    version: str | None = None,
+    shared_tier: bool = True,
+    disk: DiskKey | None = None,
+    compress: bool = False,
+) -> CachedTile:
+    """Write freshly rendered ``data`` through every enabled cache tier."""
+
+    etag = etag_for_version(key, version) if version else etag_for_bytes(data)
+    tile = CachedTile(data, etag)
+    if kind in _MVT_KINDS:
+        for layer, size in layer_sizes(data).items():
+            tile_layer_bytes.labels(layer=layer).observe(size)
+    if shared_tier:
+        _set_redis(key, tile)
+    if disk is not None and _disk_cache is not None:
+        _disk_cache.put(disk, tile)
+    if compress:
+        tile = precompress(data, etag)
+    _tile_cache.put(key, tile, kind=kind, dataset=dataset)
+    return tile
+
+
+def _cached_tile(
+    key: str,
+    kind: str,
+    render: Callable[[], bytes],
+    *,
+    dataset: str = "",
+    version: str | None = None,
+    shared_tier: bool = True,
+    disk: DiskKey | None = None,
+    compress: bool = False,
+    pooled: bool = True,
+) -> tuple[CachedTile, str]:
+    """Return ``(tile, cache_state)`` for ``key`` rendering on a miss.
+
+    Lookups go to the in-memory cache first, then the disk tier when ``disk``
+    is given and enabled, then Redis when ``shared_tier`` is set, and finally
+    ``render`` on the render executor.  Lower tiers are filled write-through.  Concurrent misses for
+    the same key are coalesced so only one of them renders.  When ``version``
+    is given the ETag is derived from it and ``key`` instead of the payload.
+    With ``compress`` the memory tier keeps gzip/brotli variants built once
+    here so hits are served without recompressing.
+
+    Renders that wait on other in-flight work (an ancestor tile, a metatile
+    block) pass ``pooled=False``: ``render`` then runs on the calling thread
+    and submits only its CPU-bound step through :func:`_pooled`, so no pool
+    worker blocks on a render queued behind it.
+    """
+
+    tile = _tile_cache.get(key, kind)
+    if tile is not None:
+        _cache_hits.inc()
+        return tile, "hit"
+
+    disk_tier = _disk_cache if disk is not None else None
+
+    def _fill() -> tuple[CachedTile, str]:
+        # Another flight for ``key`` may have stored the tile since the lookup
+        # above; look again so it is not rendered twice.
+        if key in _tile_cache:
+            tile = _tile_cache.get(key, kind)
+            if tile is not None:
+                _cache_hits.inc()
+                return tile, "hit"
+        stored = disk_tier.get(disk) if disk_tier else None
+        if stored is not None:
+            tile, state = stored, "disk"
+        else:
+            cached = _get_from_redis(key) if shared_tier else None
+            if cached is None:
+                tile = _store_tile(
+                    key,
+                    kind,
+                    _render_executor.run(render) if pooled else render(),
+                    dataset=dataset,
+                    version=version,
+                    shared_tier=shared_tier,
+                    disk=disk,
+                    compress=compress,
+                )
+                return tile, "miss"
+            tile, state = cached, "hit"
+            if disk_tier:
+                disk_tier.put(disk, tile)
+        if compress:
+            tile = precompress(tile.data, tile.etag)
+        _tile_cache.put(key, tile, kind=kind, dataset=dataset)
+        return tile, state
+
+    (tile, state), shared = _flight.do(key, _fill)
+    if shared:
+        tile_coalesced_total.labels(kind=kind).inc()
+        return tile, "coalesced"
+    return tile, state
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Return ``True`` if the request's ``If-None-Match`` covers ``etag``."""
+
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison as required for If-None-Match (RFC 9110 13.1.2).
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _cached_response(
+    request: Request,
+    tile: CachedTile,
+    media_type: str,
+    headers: Dict[str, str],
+) -> Response:
+    """Return ``tile`` or an empty ``304`` if the client already has it."""
+
+    headers = {**headers, "ETag": tile.etag}
+    if _etag_matches(request, tile.etag):
+        return Response(status_code=304, headers=headers)
+    body, encoding = tile.encoded(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _bytes_response(
+    request: Request,
+    data: bytes,
+    media_type: str,
+    max_age: int,
+) -> Response:
+    """Return an uncached payload honouring ``If-None-Match``."""
+
+    headers = {
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    return _cached_response(request, CachedTile(data, etag_for_bytes(data)), media_type, headers)
 
 
 @app.get("/tiles/cm93/{z}/{x}/{y}.png")
 def tiles_png(
+    request: Request,
     z: int,
     x: int,
     y: str,
@@ -448,6 +942,7 @@ def tiles_png(
     except ValueError:
         return JSONResponse({"error": "invalid tile"}, status_code=422)
     return tiles(
+        request,
         z,
         x,
         y_int,
@@ -461,6 +956,7 @@ def tiles_png(
 
 @app.get("/tiles/cm93/{z}/{x}/{y}")
 def tiles(
+    request: Request,
     z: int,
     x: int,
     y: int,
@@ -472,36 +968,36 @@ def tiles(
 ) -> Response:
     start = time.perf_counter()
     cfg = _cfg_from_params(sc, safety, shallow, deep)
-    key = _cache_key(fmt, cfg, z, x, y, "")
-    cached = _get_from_redis(key)
-    if cached is not None:
-        data = cached
-        cache_state = "hit"
-        media_type = "image/png" if fmt == "png" else "application/x-protobuf"
-    else:
-        cache_state = "miss"
-        if fmt == "png-mvp" or (fmt == "png" and os.environ.get("RASTER_MVP") == "1"):
-            before = _render_png_mvp.cache_info().hits
+    version = _cm93_version()
+    key = _cache_key(fmt, cfg, z, x, y, "", version)
+    if fmt == "png-mvp" or (fmt == "png" and os.environ.get("RASTER_MVP") == "1"):
+        kind = "cm93-png-mvp"
+        media_type = "image/png"
+
+        def render() -> bytes:
             try:
-                data = _render_png_mvp(cfg, z, x, y)
+                return _offload("cm93-png-mvp", cfg, z, x, y)
             except RasterMVPUnavailable:
-                data = PNG_1X1
-            after = _render_png_mvp.cache_info().hits
-            media_type = "image/png"
-        elif fmt == "png":
-            before = _render_png.cache_info().hits
-            data = _render_png(cfg, z, x, y)
-            after = _render_png.cache_info().hits
-            media_type = "image/png"
-        else:
-            before = _render_mvt.cache_info().hits
-            data = _render_mvt(cfg, z, x, y)
-            after = _render_mvt.cache_info().hits
-            media_type = "application/x-protobuf"
-        if after > before:
-            cache_state = "hit"
-            _cache_hits.inc()
-        _set_redis(key, data)
+                return PNG_1X1
+
+    elif fmt == "png":
+        kind = "cm93-png"
+        media_type = "image/png"
+
+        def render() -> bytes:
+            return _render_png(cfg, z, x, y)
+
+    else:
+        kind = "cm93-mvt"
+        media_type = "application/x-protobuf"
+
+        def render() -> bytes:
+            return _offload("cm93-mvt", cfg, z, x, y)
+
+    disk = DiskKey(partition_name(kind, "cm93"), z, x, y, version, _mariner_variant(cfg))
+    tile, cache_state = _cached_tile(
+        key, kind, render, version=version, disk=disk, compress=kind == "cm93-mvt"
+    )
 
     duration_ms = (time.perf_counter() - start) * 1000
     logger.info(
@@ -514,14 +1010,12 @@ def tiles(
         cache_state,
         duration_ms,
     )
-    etag = hashlib.sha1(data).hexdigest()
     headers = {
         "X-Tile-Cache": cache_state,
         "Cache-Control": "public, max-age=60",
-        "ETag": etag,
         "Vary": "Accept-Encoding",
     }
-    return Response(content=data, media_type=media_type, headers=headers)
+    return _cached_response(request, tile, media_type, headers)
 
 
 # ---------------------------------------------------------------------------
@@ -529,8 +1023,194 @@ def tiles(
 # ---------------------------------------------------------------------------
 
 
+# Renderers addressable by name so render worker processes can run them.
+_RENDERERS: Dict[str, Callable[..., Any]] = {
+    "enc": _render_enc_mvt,
+    "enc-meta": _render_enc_metatile,
+    "cm93-mvt": _render_mvt,
+    "cm93-planes": _render_cm93_planes,
+    "cm93-png-mvp": _render_png_mvp,
+}
+
+
+# ``agnostic`` tiles leave safety contour and depth shading to the style.
+_ENC_MODES = ("mariner", "agnostic")
+
+
+def _offload(kind: str, *args: Any) -> Any:
+    """Run renderer ``kind`` on the process backend if enabled, else inline."""
+
+    if _render_backend is not None:
+        return _render_backend.render(kind, *args)
+    return _RENDERERS[kind](*args)
+
+
+def _pooled(kind: str, *args: Any) -> Any:
+    """Run renderer ``kind`` on the render executor (see :func:`_offload`)."""
+
+    return _render_executor.run(lambda: _offload(kind, *args))
+
+
+def _enc_disk_key(
+    ds: str, cfg: Optional[ContourConfig], z: int, x: int, y: int, version: str
+) -> DiskKey:
+    return DiskKey(partition_name("enc", ds), z, x, y, version, _mariner_variant(cfg))
+
+
+def _safety_contour(ds: str, cfg: Optional[ContourConfig], version: str) -> Optional[float]:
+    """Return the dataset-wide safety contour depth for ``cfg``, if known.
+
+    The dataset's contour index is loaded on first use per version; ``None``
+    (agnostic tiles, unknown datasets, no indexed contours, an index still
+    being scanned in the background) leaves the choice to each tile.
+    """
+
+    if cfg is None:
+        return None
+    dataset = get_dataset(ds)
+    if dataset is None:
+        return None
+    index = _contour_indexes.get(
+        ds,
+        version,
+        lambda: ContourIndex.from_metadata(dataset.path),
+        lambda: ContourIndex.from_mbtiles(dataset.path),
+    )
+    return index.safety_contour(cfg.safety) if index is not None else None
+
+
+def _render_enc_tile(
+    ds: str, cfg: Optional[ContourConfig], z: int, x: int, y: int, version: str
+) -> bytes:
+    """Render ``z/x/y`` alone or, with ``ENC_METATILE``, as part of its block.
+
+    In metatile mode the siblings rendered alongside the requested tile are
+    written to the cache tiers so neighbouring requests are hits.  Requests
+    for tiles of a block already being rendered wait for that render on
+    their own thread, not in a render worker.  Runs on the request thread
+    (``pooled=False``); the renders themselves go to the executor.
+    """
+
+    contour = _safety_contour(ds, cfg, version)
+    if _ENC_METATILE == 1:
+        data = _pooled("enc", ds, cfg, z, x, y, contour, version)
+        if data == _EMPTY_TILE.data:
+            _empty_tiles.add(ds, version, z, x, y)
+        return data
+    size, x0, y0 = _metatile_origin(z, x, y)
+    block, shared = _meta_flight.do(
+        _cache_key("meta", cfg, z, x0, y0, ds, version),
+        lambda: _pooled("enc-meta", ds, cfg, z, x0, y0, size, contour, version),
+    )
+    if not shared:
+        for (cx, cy), data in block.items():
+            if data == _EMPTY_TILE.data:
+                # Empty siblings only go to the negative cache.
+                _empty_tiles.add(ds, version, z, cx, cy)
+                continue
+            key = _cache_key("mvt", cfg, z, cx, cy, ds, version)
+            if (cx, cy) == (x, y) or key in _tile_cache:
+                continue
+            _store_tile(
+                key,
+                "enc",
+                data,
+                dataset=ds,
+                version=version,
+                disk=_enc_disk_key(ds, cfg, z, cx, cy, version),
+                compress=True,
+            )
+    return block[(x, y)]
+
+
+def _empty_tile_response(request: Request, max_age: int) -> Response:
+    headers = {
+        "X-Tile-Cache": "empty",
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    return _cached_response(request, _EMPTY_TILE, "application/x-protobuf", headers)
+
+
+def _render_enc_overzoom(
+    ds: str, cfg: Optional[ContourConfig], z: int, x: int, y: int, maxzoom: int, version: str
+) -> bytes:
+    """Derive ``z/x/y`` from its (cached) ancestor at the dataset's ``maxzoom``.
+
+    The ancestor is fetched on the request thread (``pooled=False``) and only
+    the clip and rescale runs on the render executor.
+    """
+
+    dz = z - maxzoom
+    px, py = x >> dz, y >> dz
+    parent, _ = _cached_tile(
+        _cache_key("mvt", cfg, maxzoom, px, py, ds, version),
+        "enc",
+        lambda: _render_enc_tile(ds, cfg, maxzoom, px, py, version),
+        dataset=ds,
+        version=version,
+        disk=_enc_disk_key(ds, cfg, maxzoom, px, py, version),
+        compress=True,
+        pooled=False,
+    )
+    return _render_executor.run(
+        lambda: overzoom_tile(parent.data, dz, x - (px << dz), y - (py << dz))
+    )
+
+
+def _stored_enc_tile(dataset: Any, z: int, x: int, y: int) -> Optional[bytes]:
+    """Return the tile stored in ``dataset``'s MBTiles file, if any.
+
+    Files that cannot be read as MBTiles yield ``None`` so the caller falls
+    back to rendering.
+    """
+
+    try:
+        return get_datasource(str(dataset.path), str(dataset.updated_at)).get_tile(z, x, y)
+    except sqlite3.Error:
+        return None
+
+
+def _stored_tile_response(
+    request: Request,
+    data: bytes | memoryview,
+    etag: str,
+    *,
+    key: str,
+    dataset: str = "",
+    media_type: str = "application/x-protobuf",
+    source: str = "mbtiles",
+) -> Response:
+    """Return stored tile bytes, compressing plain vector tiles only once.
+
+    Gzip-encoded payloads are passed through without re-encoding.  Plain
+    vector tiles go through :func:`precompress` and are kept in the memory
+    tier under ``key`` so clients accepting gzip or br get an encoded body.
+    """
+
+    headers = {
+        "X-Tile-Cache": source,
+        "Cache-Control": "public, max-age=60",
+        "Vary": "Accept-Encoding",
+        "ETag": etag,
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if media_type == "application/x-protobuf" and not is_gzipped(data):
+        tile = _tile_cache.get(key, "stored")
+        if tile is None or tile.etag != etag:
+            tile = precompress(bytes(data), etag)
+            _tile_cache.put(key, tile, kind="stored", dataset=dataset)
+        return _cached_response(request, tile, media_type, headers)
+    body, encoding = stored_encoding(data, request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
 @app.get("/tiles/enc/{ds}/{z}/{x}/{y}")
 def tiles_enc_dataset(
+    request: Request,
     ds: str,
     z: int,
     x: int,
@@ -540,29 +1220,64 @@ def tiles_enc_dataset(
     safety: float | None = None,
     shallow: float | None = None,
     deep: float | None = None,
+    mode: str = "mariner",
 ) -> Response:
     dataset = get_dataset(ds)
     if not dataset:
         return JSONResponse({"error": "dataset not found"}, status_code=404)
     if fmt != "mvt":
         return JSONResponse({"error": "unsupported format", "supported": ["mvt"]}, status_code=415)
+    if mode not in _ENC_MODES:
+        return JSONResponse({"error": "unsupported mode", "supported": list(_ENC_MODES)}, status_code=422)
     if z < 0 or x < 0 or y < 0 or x >= 2**z or y >= 2**z:
         return JSONResponse({"error": "invalid tile"}, status_code=422)
-    cfg = _cfg_from_params(sc, safety, shallow, deep)
-    key = _cache_key(fmt, cfg, z, x, y, ds)
+    version = f"{_RENDER_VERSION}:{dataset.updated_at}"
+    # A maxzoom of 0 means the MBTiles metadata did not declare one.
+    overzoom = 0 < dataset.maxzoom < z
+    if tile_outside_bounds(_tile_bbox(z, x, y), dataset.bounds):
+        tile_empty_total.labels(reason="bounds").inc()
+        return _empty_tile_response(request, _EMPTY_MAX_AGE)
+    dz = z - dataset.maxzoom if overzoom else 0
+    if (ds, version, z - dz, x >> dz, y >> dz) in _empty_tiles:
+        tile_empty_total.labels(reason="negative").inc()
+        return _empty_tile_response(request, 60)
+    # Stored tiles are mariner tiles with the default contours.
+    overrides = (sc, safety, shallow, deep) != (None, None, None, None) or mode != "mariner"
+    if _ENC_PASSTHROUGH and not overzoom and not overrides:
+        # Prebuilt tiles cost one indexed read; only missing ones are rendered.
+        stored = _stored_enc_tile(dataset, z, x, y)
+        if stored is not None:
+            logger.info("fmt=%s ds=%s z=%d x=%d y=%d cache=mbtiles", fmt, ds, z, x, y)
+            etag = etag_for_version("mbtiles", ds, z, x, y, dataset.updated_at)
+            key = f"mbtiles:{ds}:{z}/{x}/{y}@{dataset.updated_at}"
+            return _stored_tile_response(request, stored, etag, key=key, dataset=ds)
+    # Agnostic tiles ignore the mariner params; the style applies them.
+    cfg = None if mode == "agnostic" else _cfg_from_params(sc, safety, shallow, deep)
+    key = _cache_key(fmt, cfg, z, x, y, ds, version)
     start = time.perf_counter()
-    cached = _get_from_redis(key)
-    cache_state = "hit" if cached is not None else "miss"
-    if cached is not None:
-        data = cached
+    if overzoom:
+        # Overzoomed tiles are cheap to derive so only memory holds them.
+        tile, cache_state = _cached_tile(
+            key,
+            "enc",
+            lambda: _render_enc_overzoom(ds, cfg, z, x, y, dataset.maxzoom, version),
+            dataset=ds,
+            version=version,
+            shared_tier=False,
+            compress=True,
+            pooled=False,
+        )
     else:
-        before = _render_enc_mvt.cache_info().hits
-        data = _render_enc_mvt(ds, cfg, z, x, y)
-        after = _render_enc_mvt.cache_info().hits
-        if after > before:
-            cache_state = "hit"
-            _cache_hits.inc()
-        _set_redis(key, data)
+        tile, cache_state = _cached_tile(
+            key,
+            "enc",
+            lambda: _render_enc_tile(ds, cfg, z, x, y, version),
+            dataset=ds,
+            version=version,
+            disk=_enc_disk_key(ds, cfg, z, x, y, version),
+            compress=True,
+            pooled=False,
+        )
     duration_ms = (time.perf_counter() - start) * 1000
     logger.info(
         "fmt=%s ds=%s z=%d x=%d y=%d cache=%s ms=%.2f",
@@ -574,18 +1289,17 @@ def tiles_enc_dataset(
         cache_state,
         duration_ms,
     )
-    etag = hashlib.sha1(data).hexdigest()
     headers = {
         "X-Tile-Cache": cache_state,
         "Cache-Control": "public, max-age=60",
-        "ETag": etag,
         "Vary": "Accept-Encoding",
     }
-    return Response(content=data, media_type="application/x-protobuf", headers=headers)
+    return _cached_response(request, tile, "application/x-protobuf", headers)
 
 
 @app.get("/tiles/enc/{z}/{x}/{y}")
 def tiles_enc(
+    request: Request,
     z: int,
     x: int,
     y: int,
@@ -594,10 +1308,12 @@ def tiles_enc(
     safety: float | None = None,
     shallow: float | None = None,
     deep: float | None = None,
+    mode: str = "mariner",
 ) -> Response:
     datasets = list_datasets()
     if len(datasets) == 1:
         return tiles_enc_dataset(
+            request,
             datasets[0].id,
             z,
             x,
@@ -607,6 +1323,7 @@ def tiles_enc(
             safety=safety,
             shallow=shallow,
             deep=deep,
+            mode=mode,
         )
     return JSONResponse(
         {
@@ -617,6 +1334,70 @@ def tiles_enc(
     )
 
 
+_PMTILES_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+_PMTILES_MEDIA_TYPES = {
+    pmtiles_archive.TILE_TYPE_MVT: "application/x-protobuf",
+    pmtiles_archive.TILE_TYPE_PNG: "image/png",
+    pmtiles_archive.TILE_TYPE_JPEG: "image/jpeg",
+    pmtiles_archive.TILE_TYPE_WEBP: "image/webp",
+    pmtiles_archive.TILE_TYPE_AVIF: "image/avif",
+}
+
+
+def _pmtiles_archive(archive: str) -> tuple[datasource_pmtiles.PMTilesDataSource, int]:
+    """Return the mapped ``PMTILES_DIR/<archive>.pmtiles`` and its mtime."""
+
+    path = _PMTILES_DIR / f"{archive}.pmtiles"
+    if not _PMTILES_NAME.match(archive) or not path.is_file():
+        raise HTTPException(status_code=404, detail="archive not found")
+    mtime = path.stat().st_mtime_ns
+    return datasource_pmtiles.get_datasource(str(path), str(mtime)), mtime
+
+
+@app.get("/tiles/pmtiles/{archive}/{z}/{x}/{y}")
+def tiles_pmtiles(request: Request, archive: str, z: int, x: int, y: int) -> Response:
+    """Serve a tile of a PMTiles archive as a slice of its memory mapping."""
+
+    source, mtime = _pmtiles_archive(archive)
+    if z < 0 or x < 0 or y < 0 or x >= 2**z or y >= 2**z:
+        return JSONResponse({"error": "invalid tile"}, status_code=422)
+    data = source.get_tile(z, x, y)
+    tile_type = source.header.tile_type
+    if data is None:
+        if tile_type == pmtiles_archive.TILE_TYPE_MVT:
+            return _empty_tile_response(request, 60)
+        return JSONResponse({"error": "tile not found"}, status_code=404)
+    return _stored_tile_response(
+        request,
+        data,
+        etag_for_version("pmtiles", archive, z, x, y, mtime),
+        key=f"pmtiles:{archive}:{z}/{x}/{y}@{mtime}",
+        media_type=_PMTILES_MEDIA_TYPES.get(tile_type, "application/octet-stream"),
+        source="pmtiles",
+    )
+
+
+@app.get("/tiles/pmtiles/{archive}.json")
+def tiles_pmtiles_tilejson(request: Request, archive: str) -> Response:
+    """Return a TileJSON document for a PMTiles archive."""
+
+    source, _ = _pmtiles_archive(archive)
+    h = source.header
+    meta = source.metadata()
+    doc = {
+        "tilejson": "3.0.0",
+        "name": meta.get("name", archive),
+        "tiles": [f"/tiles/pmtiles/{archive}/{{z}}/{{x}}/{{y}}"],
+        "minzoom": h.min_zoom,
+        "maxzoom": h.max_zoom,
+        "bounds": [h.min_lon, h.min_lat, h.max_lon, h.max_lat],
+        "center": [h.center_lon, h.center_lat, h.center_zoom],
+    }
+    if "vector_layers" in meta:
+        doc["vector_layers"] = meta["vector_layers"]
+    return _bytes_response(request, json.dumps(doc).encode("utf-8"), "application/json", 60)
+
+
 @app.get("/config/contours")
 def get_contours_config() -> Dict[str, float | None]:
     from dataclasses import asdict
@@ -635,84 +1416,57 @@ def get_datasource_config() -> Dict[str, object]:
     return {"type": "stub"}
 
 
+_ASSET_HEADERS = {"Cache-Control": "public, max-age=3600", "Vary": "Accept-Encoding"}
+
+
+def _asset_response(
+    request: Request,
+    rel: str | Path,
+    media_type: str,
+    *,
+    detail: str = "asset not found",
+) -> Response:
+    """Serve ``rel`` below ``STYLING_DIST`` from the static asset cache."""
+
+    asset = _asset_cache.get(rel, compress=not media_type.startswith("image/"))
+    if asset is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return _cached_response(request, asset, media_type, _ASSET_HEADERS)
+
+
 @app.get("/style/s52.day.json")
-def style() -> Response:
-    path = STYLING_DIST / "style.s52.day.json"
-    data = path.read_bytes()
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "ETag": etag,
-        "Cache-Control": "public, max-age=3600",
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/json", headers=headers)
+def style(request: Request) -> Response:
+    return _asset_response(request, "style.s52.day.json", "application/json")
 
 
 @app.get("/style/s52.dusk.json")
-def style_dusk() -> Response:
-    path = STYLING_DIST / "style.s52.dusk.json"
-    data = path.read_bytes()
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "ETag": etag,
-        "Cache-Control": "public, max-age=3600",
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/json", headers=headers)
+def style_dusk(request: Request) -> Response:
+    return _asset_response(request, "style.s52.dusk.json", "application/json")
 
 
 @app.get("/style/s52.night.json")
-def style_night() -> Response:
-    path = STYLING_DIST / "style.s52.night.json"
-    data = path.read_bytes()
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "ETag": etag,
-        "Cache-Control": "public, max-age=3600",
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/json", headers=headers)
+def style_night(request: Request) -> Response:
+    return _asset_response(request, "style.s52.night.json", "application/json")
 
 
 @app.get("/sprites/s52-day.json")
-def sprite_json() -> Response:
-    path = STYLING_DIST / "sprites" / "s52-day.json"
-    data = path.read_bytes()
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "ETag": etag,
-        "Cache-Control": "public, max-age=3600",
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/json", headers=headers)
+def sprite_json(request: Request) -> Response:
+    return _asset_response(request, Path("sprites", "s52-day.json"), "application/json")
 
 
 @app.get("/sprites/s52-day.png")
-def sprite_png() -> Response:
-    path = STYLING_DIST / "assets" / "s52" / "rastersymbols-day.png"
-    data = path.read_bytes()
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "ETag": etag,
-        "Cache-Control": "public, max-age=3600",
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="image/png", headers=headers)
+def sprite_png(request: Request) -> Response:
+    return _asset_response(request, Path("assets", "s52", "rastersymbols-day.png"), "image/png")
 
 
 @app.get("/glyphs/{fontstack}/{rng}.pbf")
-def glyph_pbf(fontstack: str, rng: str) -> Response:
-    path = STYLING_DIST / "glyphs" / f"{rng}.pbf"
-    if not path.exists():
-        raise HTTPException(status_code=404, detail="glyph range not found")
-    data = path.read_bytes()
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "ETag": etag,
-        "Cache-Control": "public, max-age=3600",
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/x-protobuf", headers=headers)
+def glyph_pbf(request: Request, fontstack: str, rng: str) -> Response:
+    return _asset_response(
+        request,
+        Path("glyphs", f"{rng}.pbf"),
+        "application/x-protobuf",
+        detail="glyph range not found",
+    )
 
 
 @app.get("/metrics")
@@ -722,6 +1476,8 @@ def metrics() -> Response:
 
 @app.get("/healthz")
 def healthz() -> Response:
+    if _render_backend is not None and not _render_backend.check():
+        return Response("render workers unavailable", status_code=503)
     return Response("OK")
 
 # ---------------------------------------------------------------------------
@@ -847,8 +1603,6 @@ if os.environ.get("IMPORT_API_ENABLED") == "1":
 
 
 # --- GeoTIFF tiles via pseudo MapProxy -------------------------------------
-_GEO_CACHE_SIZE = int(os.environ.get("GEO_LRU_SIZE", "256"))
-_geo_cache: "OrderedDict[str, bytes]" = globals().setdefault("_geo_cache", OrderedDict())
 if "_geo_hits" not in globals():
     _geo_hits = Counter("geotiff_cache_hits", "GeoTIFF tile cache hits", registry=_prom_registry)
 if "_geo_errors" not in globals():
@@ -868,140 +1622,140 @@ def _render_geotiff(cid: str, z: int, x: int, y: int, fmt: str) -> bytes:
 
 
 @app.get("/titiler/tiles/{cid}/{z}/{x}/{y}.{fmt}")
-def titiler_tiles(cid: str, z: int, x: int, y: int, fmt: str = "png") -> Response:
+def titiler_tiles(
+    request: Request, cid: str, z: int, x: int, y: int, fmt: str = "png"
+) -> Response:
     fmt = fmt.lower()
     if fmt == "webp" and os.environ.get("GEO_WEBP") != "1":
         raise HTTPException(status_code=415, detail="unsupported format")
     data = _render_geotiff(cid, z, x, y, fmt)
     media = "image/webp" if fmt == "webp" else "image/png"
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "Cache-Control": "public, max-age=60",
-        "ETag": etag,
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type=media, headers=headers)
+    return _bytes_response(request, data, media, 60)
 
 
 @app.get("/tiles/geotiff/{cid}/{z}/{x}/{y}.{fmt}")
-def tiles_geotiff(cid: str, z: int, x: int, y: int, fmt: str = "png") -> Response:
+def tiles_geotiff(
+    request: Request, cid: str, z: int, x: int, y: int, fmt: str = "png"
+) -> Response:
     fmt = fmt.lower()
     if fmt == "webp" and os.environ.get("GEO_WEBP") != "1":
         raise HTTPException(status_code=415, detail="unsupported format")
     media = "image/webp" if fmt == "webp" else "image/png"
-    key = f"{cid}:{z}/{x}/{y}.{fmt}"
-    cached = _geo_cache.get(key)
-    if cached is not None:
-        _geo_cache.move_to_end(key)
+    key = f"geotiff:{cid}:{z}/{x}/{y}.{fmt}"
+    rec = reg.get(cid)
+    try:
+        tile, cache_state = _cached_tile(
+            key,
+            "geotiff",
+            lambda: _render_geotiff(cid, z, x, y, fmt),
+            dataset=cid,
+            version=str(rec.updatedAt) if rec else None,
+            shared_tier=False,
+        )
+    except RenderOverloaded:
+        raise
+    except Exception:
+        _geo_errors.inc()
+        # Another request may have filled the entry while this render failed.
+        cached = _tile_cache.get(key, "geotiff")
+        if cached is None:
+            raise HTTPException(status_code=502, detail="render error")
+        tile = cached
+        cache_state = "stale"
+    if cache_state == "hit":
         _geo_hits.inc()
-        data = cached
-        cache_state = "hit"
-    else:
-        try:
-            data = _render_geotiff(cid, z, x, y, fmt)
-            cache_state = "miss"
-            _geo_cache[key] = data
-            _geo_cache.move_to_end(key)
-            if len(_geo_cache) > _GEO_CACHE_SIZE:
-                _geo_cache.popitem(last=False)
-        except Exception:
-            _geo_errors.inc()
-            cached = _geo_cache.get(key)
-            if cached is None:
-                raise HTTPException(status_code=502, detail="render error")
-            data = cached
-            cache_state = "stale"
-    etag = hashlib.sha1(data).hexdigest()
     headers = {
         "X-Tile-Cache": cache_state,
         "Cache-Control": "public, max-age=60",
-        "ETag": etag,
         "Vary": "Accept-Encoding",
     }
-    return Response(data, media_type=media, headers=headers)
+    return _cached_response(request, tile, media, headers)
 
 
 # --- CM93 vector tiles ------------------------------------------------------
 
 
-@app.get("/tiles/cm93-core/{z}/{x}/{y}.pbf")
-def tiles_cm93_core(z: int, x: int, y: int) -> Response:
-    data = _query_mvt("cm93_mvt_core", z, x, y)
-    etag = hashlib.sha1(data).hexdigest()
+def _cm93_plane(request: Request, kind: str, z: int, x: int, y: int) -> Response:
+    """Serve the ``kind`` plane (``cm93-core``/``cm93-label``) of ``z/x/y``.
+
+    A miss builds both planes in one pass and stores the other one too, so
+    the client's request for the second plane is a cache hit.
+    """
+
+    version = _cm93_version()
+
+    def render() -> bytes:
+        planes, shared = _planes_flight.do(
+            _cache_key("cm93-planes", DEFAULT_CONFIG, z, x, y, "", version),
+            lambda: _pooled("cm93-planes", z, x, y),
+        )
+        if not shared:
+            for other, data in planes.items():
+                key = _cache_key(other, DEFAULT_CONFIG, z, x, y, "", version)
+                if other == kind or key in _tile_cache:
+                    continue
+                _store_tile(key, other, data, version=version, compress=True)
+        return planes[kind]
+
+    tile, cache_state = _cached_tile(
+        _cache_key(kind, DEFAULT_CONFIG, z, x, y, "", version),
+        kind,
+        render,
+        version=version,
+        compress=True,
+        pooled=False,
+    )
     headers = {
+        "X-Tile-Cache": cache_state,
         "Cache-Control": "public, max-age=60",
-        "ETag": etag,
         "Vary": "Accept-Encoding",
     }
-    return Response(data, media_type="application/x-protobuf", headers=headers)
+    return _cached_response(request, tile, "application/x-protobuf", headers)
+
+
+@app.get("/tiles/cm93-core/{z}/{x}/{y}.pbf")
+def tiles_cm93_core(request: Request, z: int, x: int, y: int) -> Response:
+    return _cm93_plane(request, "cm93-core", z, x, y)
 
 
 @app.get("/tiles/cm93-label/{z}/{x}/{y}.pbf")
-def tiles_cm93_label(z: int, x: int, y: int) -> Response:
-    data = _query_mvt("cm93_mvt_label", z, x, y)
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "Cache-Control": "public, max-age=60",
-        "ETag": etag,
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/x-protobuf", headers=headers)
+def tiles_cm93_label(request: Request, z: int, x: int, y: int) -> Response:
+    return _cm93_plane(request, "cm93-label", z, x, y)
 
 
 @app.get("/tiles/cm93/dict.json")
-def tiles_cm93_dict() -> Response:
-    path = STYLING_DIST / "dict.json"
-    if not path.exists():
-        raise HTTPException(status_code=404, detail="dict missing")
-    data = path.read_bytes()
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "Cache-Control": "public, max-age=3600",
-        "ETag": etag,
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/json", headers=headers)
+def tiles_cm93_dict(request: Request) -> Response:
+    return _asset_response(request, "dict.json", "application/json", detail="dict missing")
 
 
-@app.get("/tiles/cm93-core.tilejson")
-def tiles_cm93_core_tilejson() -> Response:
+def _cm93_tilejson(layer: str) -> CachedTile:
     data = json.dumps(
         {
             "tilejson": "3.0.0",
-            "tiles": ["/tiles/cm93-core/{z}/{x}/{y}.pbf"],
+            "tiles": [f"/tiles/{layer}/{{z}}/{{x}}/{{y}}.pbf"],
             "minzoom": 0,
             "maxzoom": 16,
             "bounds": [-180.0, -85.0511, 180.0, 85.0511],
             "attribution": "© OpenCPN",
-            "vector_layers": [{"id": "features"}],
+            "vector_layers": vector_layers() if MVT_LAYERS == "split" else [{"id": "features"}],
         }
     ).encode("utf-8")
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "Cache-Control": "public, max-age=3600",
-        "ETag": etag,
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/json", headers=headers)
+    return precompress(data, etag_for_bytes(data))
+
+
+# TileJSON documents never change at runtime so they are built once.
+_CM93_TILEJSON = {layer: _cm93_tilejson(layer) for layer in ("cm93-core", "cm93-label")}
+
+
+@app.get("/tiles/cm93-core.tilejson")
+def tiles_cm93_core_tilejson(request: Request) -> Response:
+    return _cached_response(
+        request, _CM93_TILEJSON["cm93-core"], "application/json", _ASSET_HEADERS
+    )
 
 
 @app.get("/tiles/cm93-label.tilejson")
-def tiles_cm93_label_tilejson() -> Response:
-    data = json.dumps(
-        {
-            "tilejson": "3.0.0",
-            "tiles": ["/tiles/cm93-label/{z}/{x}/{y}.pbf"],
-            "minzoom": 0,
-            "maxzoom": 16,
-            "bounds": [-180.0, -85.0511, 180.0, 85.0511],
-            "attribution": "© OpenCPN",
-            "vector_layers": [{"id": "features"}],
-        }
-    ).encode("utf-8")
-    etag = hashlib.sha1(data).hexdigest()
-    headers = {
-        "Cache-Control": "public, max-age=3600",
-        "ETag": etag,
-        "Vary": "Accept-Encoding",
-    }
-    return Response(data, media_type="application/json", headers=headers)
+def tiles_cm93_label_tilejson(request: Request) -> Response:
+    return _cached_response(
+        request, _CM93_TILEJSON["cm93-label"], "application/json", _ASSET_HEADERS
+    )
@@ -0,0 +1,89 @@
+"""Compare per-feature and columnar S-52 pre-classification.
+
+Generates synthetic soundings, depth areas and contours and reports the time
+spent by :meth:`S52PreClassifier.classify` and
+:meth:`S52PreClassifier.classify_batch`, alone and including building the
+attribute columns and merging the results back into the features.  With
+``--min-speedup`` the exit status is non-zero when ``classify_batch`` is not
+at least that many times faster than ``classify``, so a perf job can gate on
+it without a wall-clock assertion in the unit tests.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from s52_preclass import ContourConfig, S52PreClassifier, batch_columns  # noqa: E402
+
+
+def _features(objl: str, n: int, rng: random.Random) -> list[dict]:
+    feats = []
+    for _ in range(n):
+        props = {"QUAPOS": rng.choice([1, 2, 4]), "SCAMIN": rng.choice([None, 22000, 90000])}
+        if objl == "SOUNDG":
+            props["VALSOU"] = round(rng.uniform(0, 40), 1)
+        elif objl == "DEPARE":
+            lo = rng.choice([0, 2, 5, 10, 20])
+            props.update(DRVAL1=lo, DRVAL2=lo + rng.choice([2, 5, 10]))
+        else:
+            props["VALDCO"] = rng.choice([2, 5, 10, 20, 30])
+        feats.append(props)
+    return feats
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--features", type=int, default=10000, help="Features per object class")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-speedup", type=float, default=None, help="Fail unless classify_batch is this many times faster"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    clf = S52PreClassifier(ContourConfig(), {})
+    groups = {objl: _features(objl, args.features, rng) for objl in ("SOUNDG", "DEPARE", "DEPCNT")}
+    cols = {objl: batch_columns(objl, props) for objl, props in groups.items()}
+
+    # Both end-to-end variants merge the results into the feature properties
+    # the way the tile server does.
+    per_feature = _best(
+        lambda: [p.update(clf.classify(objl, p)) for objl, props in groups.items() for p in props],
+        args.repeat,
+    )
+    batch = _best(lambda: [clf.classify_batch(objl, c) for objl, c in cols.items()], args.repeat)
+    end_to_end = _best(
+        lambda: [
+            clf.classify_batch(objl, batch_columns(objl, props)).update(props)
+            for objl, props in groups.items()
+        ],
+        args.repeat,
+    )
+    total = sum(len(p) for p in groups.values())
+    print(f"features            {total}")
+    print(f"classify            {per_feature * 1000:8.2f} ms")
+    print(f"classify_batch      {batch * 1000:8.2f} ms  ({per_feature / batch:.1f}x)")
+    print(f"  + columns/update  {end_to_end * 1000:8.2f} ms  ({per_feature / end_to_end:.1f}x)")
+    if args.min_speedup is not None and per_feature / batch < args.min_speedup:
+        print(f"classify_batch speedup below {args.min_speedup:.1f}x", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
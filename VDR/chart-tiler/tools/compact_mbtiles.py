@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Convert MBTiles files to the deduplicated ``map``/``images`` schema in place.
+
+Each file's plain ``tiles`` table is replaced by one row per distinct tile
+payload plus a ``tiles`` view, then the file is vacuumed.  Files already in a
+view-based layout are left as they are.  A line per file reports the number
+of tiles, distinct payloads, the dedupe ratio and the size change; a final
+line totals them when several files are given.
+
+Example
+-------
+    $ python tools/compact_mbtiles.py data/enc/*.mbtiles
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mbtiles_store import CompactStats, compact  # noqa: E402
+
+
+def _report(name: str, stats: CompactStats) -> str:
+    saved = stats.bytes_before - stats.bytes_after
+    return (
+        f"{name}: {stats.tiles} tiles, {stats.images} images, "
+        f"dedupe {stats.dedupe_ratio:.2f}x, "
+        f"{stats.bytes_before / 1e6:.1f} MB -> {stats.bytes_after / 1e6:.1f} MB "
+        f"({saved / stats.bytes_before if stats.bytes_before else 0:.0%} smaller)"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("mbtiles", nargs="+", type=Path, help="MBTiles files to compact")
+    args = ap.parse_args(argv)
+
+    results = []
+    for path in args.mbtiles:
+        stats = compact(path)
+        results.append(stats)
+        print(_report(str(path), stats))
+    if len(results) > 1:
+        total = CompactStats(*(sum(values) for values in zip(*results)))
+        print(_report("total", total))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
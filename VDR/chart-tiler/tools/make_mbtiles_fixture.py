@@ -5,7 +5,8 @@ The fixture contains a single tile (z0/x0/y0) with a couple of synthetic
 features so that the vector tile is non-empty.  The goal is to provide a
 network-free sample for unit tests and local development when real ENC data is
 unavailable.  The resulting file is intentionally tiny and is not meant for
-navigation.
+navigation.  Tiles are written in the deduplicated ``map``/``images`` schema
+(see :mod:`mbtiles_store`).
 """
 
 from __future__ import annotations
@@ -15,6 +16,7 @@ import sqlite3
 from pathlib import Path
 from typing import List, Dict
 
+from mbtiles_store import create_schema, put_tiles  # type: ignore
 from mvt_builder import encode_mvt  # type: ignore
 
 
@@ -58,9 +60,8 @@ def make_fixture(path: Path, include_scamin: bool) -> None:
     feats = _build_features(include_scamin)
     tile = encode_mvt(feats)
     conn = sqlite3.connect(path)
+    create_schema(conn)
     cur = conn.cursor()
-    cur.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
-    cur.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
     cur.executemany(
         "INSERT INTO metadata VALUES (?,?)",
         [
@@ -71,7 +72,7 @@ def make_fixture(path: Path, include_scamin: bool) -> None:
             ("maxzoom", "14"),
         ],
     )
-    cur.execute("INSERT INTO tiles VALUES (0,0,0,?)", (sqlite3.Binary(tile),))
+    put_tiles(conn, [(0, 0, 0, tile)])
     conn.commit()
     conn.close()
 
@@ -14,8 +14,9 @@ import sys
 import shutil
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Any, Dict, List, Set
 
+import s52_ruletable
 from s52_xml import (
     parse_palette_colors,
     parse_lookups,
@@ -118,10 +119,57 @@ def build_layers(
     symbols: Dict[str, Dict[str, object]],
     linestyles: Dict[str, Dict[str, object]],
     labels: bool = False,
+    agnostic: bool = False,
+    global_state: bool = False,
 ) -> List[Dict[str, object]]:
-    """Construct and order Tier‑1 style layers for the chosen palette."""
+    """Construct and order Tier‑1 style layers for the chosen palette.
+
+    With ``agnostic`` the depth and hazard layers evaluate the safety contour
+    client-side so one set of mariner-agnostic tiles serves any setting.  They
+    compare against the literal ``sc`` unless ``global_state`` is set, in which
+    case they read the ``safetyContour`` global state (maplibre-gl 5.6 or
+    later) and ``sc`` becomes its default.
+    """
 
     layers: List[tuple[int, Dict[str, object]]] = []
+    safety: object = ["global-state", "safetyContour"] if agnostic and global_state else sc
+    valdco = ["to-number", ["get", "VALDCO"]]
+    if agnostic:
+        # Tiles carry the neighbouring contour depths (cntPrev/cntNext); the
+        # safety contour is the first at or below the safety depth, else the
+        # deepest contour in the tile.
+        safety_contour: List[object] = [
+            "any",
+            [
+                "all",
+                ["<", ["coalesce", ["get", "cntPrev"], -99999], safety],
+                ["<=", safety, valdco],
+            ],
+            ["all", ["!", ["has", "cntNext"]], ["<", valdco, safety]],
+        ]
+    else:
+        safety_contour = ["==", valdco, sc]
+    if agnostic:
+        # Agnostic tiles carry no hazardIcon; derive it from VALSOU/WATLEV the
+        # way s52_preclass does for mariner tiles.
+        hazard_shallow = ["<", ["to-number", ["coalesce", ["get", "VALSOU"], 99999]], safety]
+        hazard_drying = ["in", ["to-number", ["coalesce", ["get", "WATLEV"], 0]], ["literal", [1, 2]]]
+        hazard_icon: object = [
+            "case",
+            ["==", ["get", "OBJL"], "WRECKS"],
+            ["case", hazard_shallow, "DANGER51", "ISODGR51"],
+            ["==", ["get", "OBJL"], "ROCKS"],
+            ["case", hazard_drying, "ISODGR51", "ROCKS01"],
+            "ISODGR51",
+        ]
+        has_hazard: object = [
+            "all",
+            ["in", ["get", "OBJL"], ["literal", ["OBSTRN", "WRECKS", "UWTROC", "ROCKS"]]],
+            ["any", hazard_shallow, hazard_drying],
+        ]
+    else:
+        hazard_icon = ["get", "hazardIcon"]
+        has_hazard = ["has", "hazardIcon"]
 
     if "DEPVS" not in colors:
         print("Warning: DEPVS missing, using DEPIT1", file=sys.stderr)
@@ -160,7 +208,7 @@ def build_layers(
                 "filter": [
                     "all",
                     ["==", ["get", "OBJL"], "DEPARE"],
-                    ["<", ["coalesce", ["get", "DRVAL2"], ["get", "DRVAL1"], 99999], sc],
+                    ["<", ["coalesce", ["get", "DRVAL2"], ["get", "DRVAL1"], 99999], safety],
                 ],
                 "paint": {"fill-color": get_colour(colors, "DEPVS", "DEPIT1")},
                 "metadata": {"maplibre:s52": "DEPARE-AC(DEPVS)"},
@@ -181,7 +229,7 @@ def build_layers(
                     [
                         ">=",
                         ["coalesce", ["get", "DRVAL1"], ["get", "DRVAL2"], -99999],
-                        sc,
+                        safety,
                     ],
                 ],
                 "paint": {"fill-color": get_colour(colors, "DEPDW")},
@@ -238,7 +286,7 @@ def build_layers(
                 "filter": [
                     "all",
                     ["==", ["get", "OBJL"], "DEPCNT"],
-                    ["==", ["to-number", ["get", "VALDCO"]], sc],
+                    safety_contour,
                 ],
                 "paint": {
                     "line-color": get_colour(colors, "DEPSC"),
@@ -295,8 +343,8 @@ def build_layers(
                 "{SPRITE_PREFIX}",
                 [
                     "case",
-                    ["has", "hazardIcon"],
-                    ["get", "hazardIcon"],
+                    has_hazard,
+                    hazard_icon,
                     sym_name,
                 ],
             ],
@@ -504,12 +552,12 @@ def build_layers(
                         "{SPRITE_PREFIX}",
                         [
                             "case",
-                            ["has", "hazardIcon"],
+                            has_hazard,
                             [
                                 "case",
                                 ["==", ["get", "WATLEV"], 2],
-                                ["concat", ["get", "hazardIcon"], "-int"],
-                                ["get", "hazardIcon"],
+                                ["concat", hazard_icon, "-int"],
+                                hazard_icon,
                             ],
                             [
                                 "case",
@@ -586,7 +634,7 @@ def build_layers(
                         [
                             "<",
                             ["to-number", ["coalesce", ["get", "VALSOU"], ["get", "VAL"]]],
-                            sc,
+                            safety,
                         ],
                         get_colour(colors, "SNDG1", "#353535"),
                         get_colour(colors, "SNDG2", "#FFFFFF"),
@@ -845,6 +893,95 @@ def generate_layers_from_lookups(
     return layers
 
 
+# ---------------------------------------------------------------------------
+# Split source layers
+# ---------------------------------------------------------------------------
+
+# Layer schema shared with the tile server (chart-tiler/mvt_layers.py).
+MVT_LAYERS_SCHEMA = (
+    Path(__file__).resolve().parents[1] / "chart-tiler" / "config" / "mvt_layers.json"
+)
+
+
+def _filter_objls(expr: object) -> Set[str] | None:
+    """Return the OBJL values a filter is restricted to, or ``None``."""
+
+    if not isinstance(expr, list) or not expr:
+        return None
+    op = expr[0]
+    if op == "all":
+        found = [objls for objls in map(_filter_objls, expr[1:]) if objls is not None]
+        return set.intersection(*found) if found else None
+    if len(expr) == 3 and expr[1] == ["get", "OBJL"]:
+        if op == "==" and isinstance(expr[2], str):
+            return {expr[2]}
+        if op == "in" and isinstance(expr[2], list) and expr[2][:1] == ["literal"]:
+            return set(expr[2][1])
+    return None
+
+
+def _expr_properties(expr: object) -> Set[str]:
+    """Return every property name read with ``["get", name]`` in ``expr``."""
+
+    if isinstance(expr, dict):
+        return set().union(*map(_expr_properties, expr.values())) if expr else set()
+    if not isinstance(expr, list):
+        return set()
+    if len(expr) == 2 and expr[0] == "get" and isinstance(expr[1], str):
+        return {expr[1]}
+    return set().union(*map(_expr_properties, expr)) if expr else set()
+
+
+def split_source_layers(
+    layers: List[Dict[str, Any]],
+    schema: Dict[str, Any],
+    source_layer: str = "features",
+) -> List[Dict[str, Any]]:
+    """Point style layers reading ``source_layer`` at the schema's tile layers.
+
+    A style layer whose OBJL filter only selects classes of a schema layer
+    with ``objects`` (soundings), or whose layout reads a schema layer's
+    ``property`` (labels), goes to that layer alone.  Otherwise it goes to
+    every geometry layer listing its style type; the layer whose first style
+    type matches keeps the id and the other copies get a ``-<layer>`` suffix.
+    """
+
+    claimed: Set[str] = set()
+    for entry in schema["layers"]:
+        claimed.update(entry.get("objects", []))
+    out: List[Dict[str, Any]] = []
+    for lyr in layers:
+        if lyr.get("source-layer") != source_layer:
+            out.append(lyr)
+            continue
+        objls = _filter_objls(lyr.get("filter"))
+        reads = _expr_properties(lyr.get("layout", {}))
+        candidates = [entry for entry in schema["layers"] if lyr["type"] in entry["style"]]
+        targets = [
+            entry
+            for entry in candidates
+            if ("objects" in entry and objls and objls <= set(entry["objects"]))
+            or ("property" in entry and entry["property"] in reads)
+        ]
+        if not targets:
+            fully_claimed = bool(objls) and objls <= claimed
+            targets = [
+                entry
+                for entry in candidates
+                if "objects" not in entry and "property" not in entry and not fully_claimed
+            ]
+            targets.sort(key=lambda entry: entry["style"].index(lyr["type"]))
+        if not targets:
+            out.append(lyr)
+            continue
+        for i, entry in enumerate(targets):
+            copy = dict(lyr, **{"source-layer": entry["name"]})
+            if i:
+                copy["id"] = f"{lyr['id']}-{entry['name']}"
+            out.append(copy)
+    return out
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -862,6 +999,22 @@ def parse_args() -> argparse.Namespace:
     )
     p.add_argument("--safety-contour", type=float, default=0.0)
     p.add_argument("--labels", action="store_true", help="Render labels for certain features")
+    p.add_argument(
+        "--mariner-agnostic",
+        action="store_true",
+        help="Evaluate depth rules client-side for tiles served with mode=agnostic",
+    )
+    p.add_argument(
+        "--global-state",
+        action="store_true",
+        help="With --mariner-agnostic, read the safety contour from the style's "
+        "global state (requires maplibre-gl 5.6 or later)",
+    )
+    p.add_argument(
+        "--split-layers",
+        action="store_true",
+        help="Use the per-geometry tile layers served with TILE_MVT_LAYERS=split",
+    )
     p.add_argument(
         "--palette",
         choices=["day", "dusk", "night"],
@@ -890,6 +1043,8 @@ def _fail(msg: str) -> None:
 
 def main() -> None:  # pragma: no cover - CLI wrapper
     args = parse_args()
+    if args.global_state and not args.mariner_agnostic:
+        _fail("--global-state requires --mariner-agnostic")
     assets_dir = args.assets
     if not assets_dir:
         if args.chartsymbols:
@@ -919,6 +1074,8 @@ def main() -> None:  # pragma: no cover - CLI wrapper
         symbols,
         linestyles,
         labels=args.labels,
+        agnostic=args.mariner_agnostic,
+        global_state=args.global_state,
     )
 
     if args.auto_cover:
@@ -960,6 +1117,10 @@ def main() -> None:  # pragma: no cover - CLI wrapper
                     layers.append(lyr)
                     existing_ids.add(lyr["id"])
 
+    if args.split_layers:
+        with MVT_LAYERS_SCHEMA.open("r", encoding="utf-8") as f:
+            layers = split_source_layers(layers, json.load(f))
+
     if args.output:
         output_dir = args.output.parent
         style_path = args.output
@@ -982,6 +1143,8 @@ def main() -> None:  # pragma: no cover - CLI wrapper
         src = assets_dir / name
         if src.exists():
             shutil.copy2(src, dest_assets / name)
+    # Compiled lookup rules let the tile server skip parsing the XML.
+    s52_ruletable.write(root, dest_assets / "s52rules.bin")
 
     # Sprite manifest ------------------------------------------------------
     sprite_dir = output_dir / "sprites"
@@ -1017,6 +1180,9 @@ def main() -> None:  # pragma: no cover - CLI wrapper
         "layers": layers,
         "metadata": {"maplibre:s52.palette": args.palette},
     }
+    if args.mariner_agnostic and args.global_state:
+        # Clients change the safety contour with map.setGlobalStateProperty().
+        style["state"] = {"safetyContour": {"default": args.safety_contour}}
 
     # Basic validation ------------------------------------------------------
     if style.get("version") != 8:
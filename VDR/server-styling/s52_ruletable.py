@@ -0,0 +1,313 @@
+"""Compile ``chartsymbols.xml`` lookups into an S-52 rule dispatch table.
+
+Every lookup names an object class, a look-up table (``Plain``, ``Lines``,
+``Simplified`` …), optional attribute predicates such as ``CATDPG5`` or
+``DRVAL1?`` and an instruction string like ``AC(DEPVS);LS(SOLD,1,DEPSC)``.
+:func:`compile_chartsymbols` parses the instructions once and stores the
+rules, grouped by object class and table, together with the Day colours in
+a small binary file (``s52rules.bin``).  The tile server
+loads that file at start-up instead of parsing the XML, and
+:meth:`RuleTable.portrayal` turns a feature into portrayal attributes with a
+dictionary lookup and a predicate check.
+
+Usage::
+
+    python s52_ruletable.py chartsymbols.xml dist/assets/s52/s52rules.bin
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import struct
+import xml.etree.ElementTree as ET
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from s52_xml import parse_day_colors, parse_lookups
+
+Element = ET.Element
+
+MAGIC = b"S52R"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">4sH")
+
+# Look-up table used for each GeoJSON geometry type.
+TABLE_FOR_GEOMETRY = {
+    "Point": "Simplified",
+    "MultiPoint": "Simplified",
+    "LineString": "Lines",
+    "MultiLineString": "Lines",
+    "Polygon": "Plain",
+    "MultiPolygon": "Plain",
+}
+_TABLE_ORDER = ("Plain", "Simplified", "Lines", "Paper", "Symbolized")
+
+# Instruction -> portrayal attribute taking the instruction's first argument.
+_FIRST_ARG = {"SY": "symbol", "AC": "areaColor", "AP": "areaPattern", "LC": "lineComplex", "CS": "csProc"}
+
+Predicate = Tuple[str, Optional[Tuple[str, ...]]]
+
+
+def _split(text: str, sep: str) -> List[str]:
+    """Split ``text`` on ``sep`` outside quotes and parentheses."""
+
+    parts: List[str] = []
+    depth = 0
+    quote = ""
+    start = 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = ""
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_instruction(text: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Return ``(op, args)`` pairs for an S-52 instruction string."""
+
+    ops: List[Tuple[str, Tuple[str, ...]]] = []
+    for part in _split(text or "", ";"):
+        m = re.fullmatch(r"([A-Z]{2})\((.*)\)", part, re.S)
+        if not m:
+            continue
+        op, inner = m.group(1), m.group(2)
+        if op == "CS" and ";" in inner:
+            # Some lookups nest the following instructions inside CS(...).
+            inner, rest = inner.split(";", 1)
+            ops.append((op, (inner.strip(),)))
+            ops.extend(parse_instruction(rest))
+            continue
+        ops.append((op, tuple(a.strip("'\"") for a in _split(inner, ","))))
+    return ops
+
+
+def _norm(value: Any) -> str:
+    text = str(value).strip()
+    try:
+        return f"{float(text):g}"
+    except ValueError:
+        return text
+
+
+def parse_predicate(code: str) -> Predicate:
+    """Split an ``attrib-code`` into attribute and expected values.
+
+    ``None`` values (``DRVAL1?``) match features where the attribute is
+    missing or empty.
+    """
+
+    attr, value = code[:6], code[6:].strip()
+    if value == "?" or not value:
+        return attr, None
+    return attr, tuple(_norm(v) for v in value.split(","))
+
+
+def _attributes(ops: Sequence[Tuple[str, Tuple[str, ...]]], prio: Optional[int]) -> Dict[str, Any]:
+    attrs: Dict[str, Any] = {}
+    for op, args in ops:
+        name = _FIRST_ARG.get(op)
+        if name and args:
+            attrs.setdefault(name, args[0])
+        elif op == "LS" and args:
+            attrs.setdefault("lineStyle", ",".join(args))
+        elif op == "TX" and args:
+            attrs.setdefault("textAttr", args[0])
+        elif op == "TE" and len(args) > 1:
+            attrs.setdefault("textFormat", args[0])
+            attrs.setdefault("textAttr", args[1])
+    if prio is not None:
+        attrs["dispPrio"] = prio
+    return attrs
+
+
+def compile_lookups(lookups: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, List[list]]]:
+    """Return ``{objl: {table: [[predicates, attributes], ...]}}``.
+
+    Rules keep their order from the XML; instructions are reduced to the
+    portrayal attributes they produce.
+    """
+
+    rules: Dict[str, Dict[str, List[list]]] = {}
+    for lu in lookups:
+        m = re.search(r"(\d+)", lu.get("disp_prio", ""))
+        prio = int(m.group(1)) if m else None
+        preds = [parse_predicate(code) for code in lu.get("attributes", [])]
+        attrs = _attributes(parse_instruction(lu.get("instruction", "")), prio)
+        table = lu.get("table") or "Plain"
+        rules.setdefault(lu["objl"], {}).setdefault(table, []).append(
+            [[[a, list(v) if v is not None else None] for a, v in preds], attrs]
+        )
+    return rules
+
+
+def compile_chartsymbols(root: Element) -> Dict[str, Any]:
+    """Return the payload written to ``s52rules.bin`` for ``root``."""
+
+    try:
+        colors = parse_day_colors(root)
+    except ValueError:
+        colors = {}
+    return {
+        "rules": compile_lookups(parse_lookups(root)),
+        "colors": colors,
+    }
+
+
+def dumps(payload: Dict[str, Any]) -> bytes:
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return _HEADER.pack(MAGIC, FORMAT_VERSION) + zlib.compress(body, 9)
+
+
+def digest(rules: Dict[str, Any], colors: Dict[str, str]) -> str:
+    """Return a short content hash of compiled ``rules`` and Day ``colors``.
+
+    Rules compiled from the XML and rules loaded from ``s52rules.bin`` hash
+    alike, so the tile server can key its caches on the portrayal in use.
+    """
+
+    body = json.dumps({"colors": colors, "rules": rules}, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha1(body.encode()).hexdigest()[:12]
+
+
+def loads(data: bytes) -> Dict[str, Any]:
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("unsupported rule table")
+    return json.loads(zlib.decompress(data[_HEADER.size:]))
+
+
+class Rule(NamedTuple):
+    predicates: Tuple[Predicate, ...]
+    attributes: Dict[str, Any]
+
+
+class RuleTable:
+    """Dispatch table of compiled rules keyed by object class and table."""
+
+    def __init__(self, rules: Dict[str, Dict[str, List[list]]]) -> None:
+        self._rules: Dict[Tuple[str, str], Tuple[Rule, ...]] = {}
+        self._static: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._tables: Dict[str, str] = {}
+        for objl, tables in rules.items():
+            for table, entries in tables.items():
+                compiled = tuple(
+                    Rule(
+                        tuple((a, tuple(v) if v is not None else None) for a, v in preds),
+                        attrs,
+                    )
+                    for preds, attrs in entries
+                )
+                self._rules[(objl, table)] = compiled
+                if not any(rule.predicates for rule in compiled):
+                    self._static[(objl, table)] = compiled[0].attributes
+            self._tables[objl] = next((t for t in _TABLE_ORDER if t in tables), next(iter(tables)))
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self._rules.values())
+
+    @classmethod
+    def from_root(cls, root: Element) -> "RuleTable":
+        return cls(compile_lookups(parse_lookups(root)))
+
+    def match(self, objl: str, props: Dict[str, Any], table: Optional[str] = None) -> Optional[Rule]:
+        """Return the rule for ``objl`` whose predicates ``props`` satisfy.
+
+        The rule with the most matching predicates wins, earlier rules on
+        ties; rules without predicates act as the default.
+        """
+
+        rules = self._rules.get((objl, table or "")) or self._rules.get((objl, self._tables.get(objl, "")))
+        if not rules:
+            return None
+        best: Optional[Rule] = None
+        for rule in rules:
+            if best is not None and len(rule.predicates) <= len(best.predicates):
+                continue
+            if all(_matches(props.get(attr), expected) for attr, expected in rule.predicates):
+                best = rule
+        return best
+
+    def portrayal(
+        self, objl: str, props: Dict[str, Any], geom_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return portrayal attributes for a feature; ``{}`` if no rule applies."""
+
+        table = TABLE_FOR_GEOMETRY.get(geom_type or "")
+        key = (objl, table) if (objl, table) in self._rules else (objl, self._tables.get(objl, ""))
+        static = self._static.get(key)
+        if static is not None:
+            return static
+        rule = self.match(objl, props, key[1])
+        return rule.attributes if rule else {}
+
+
+def _matches(value: Any, expected: Optional[Tuple[str, ...]]) -> bool:
+    if expected is None:
+        return value is None or value == "" or value == []
+    if value is None:
+        return False
+    if isinstance(value, (list, tuple)):
+        values = tuple(_norm(v) for v in value)
+    else:
+        values = tuple(_norm(v) for v in str(value).split(","))
+    return values == expected or (len(expected) == 1 and expected[0] in values)
+
+
+def load(path: Path | str) -> Optional[Dict[str, Any]]:
+    """Return the payload stored at ``path`` or ``None`` if unusable."""
+
+    try:
+        return loads(Path(path).read_bytes())
+    except (OSError, ValueError, struct.error, zlib.error):
+        return None
+
+
+def write(root: Element, path: Path | str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(dumps(compile_chartsymbols(root)))
+    return path
+
+
+__all__ = [
+    "RuleTable",
+    "Rule",
+    "compile_lookups",
+    "compile_chartsymbols",
+    "digest",
+    "parse_instruction",
+    "parse_predicate",
+    "dumps",
+    "loads",
+    "load",
+    "write",
+    "TABLE_FOR_GEOMETRY",
+]
+
+
+def main() -> None:  # pragma: no cover - CLI wrapper
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("chartsymbols", type=Path)
+    parser.add_argument("output", type=Path)
+    args = parser.parse_args()
+    out = write(ET.parse(args.chartsymbols).getroot(), args.output)
+    print(f"Wrote {out} ({out.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -164,6 +164,11 @@ def parse_lookups(root: Element) -> List[Dict[str, Any]]:
         disp = lu.findtext("disp-prio", default="")
         instr = lu.findtext("instruction", default="")
         ltype = lu.findtext("type", default="")
+        attrs = [
+            (code.text or "").strip()
+            for code in sorted(lu.findall("attrib-code"), key=lambda e: _int(e.get("index")) or 0)
+            if (code.text or "").strip()
+        ]
         lookups.append(
             {
                 "objl": objl,
@@ -171,6 +176,7 @@ def parse_lookups(root: Element) -> List[Dict[str, Any]]:
                 "disp_prio": disp,
                 "instruction": instr,
                 "type": ltype,
+                "attributes": attrs,
             }
         )
     return lookups
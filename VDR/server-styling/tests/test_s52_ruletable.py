@@ -0,0 +1,107 @@
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "server-styling"))
+sys.path.insert(0, str(ROOT / "chart-tiler"))
+
+import s52_ruletable
+from s52_ruletable import RuleTable, parse_instruction, parse_predicate
+from s52_preclass import S52PreClassifier
+
+XML = """
+<root>
+  <color-table name='DAY_BRIGHT'>
+    <color name='DEPVS' r='1' g='2' b='3'/>
+  </color-table>
+  <lookups>
+    <lookup name='DEPARE'>
+      <type>Area</type><disp-prio>Group 1</disp-prio><table-name>Plain</table-name>
+      <attrib-code index='1'>DRVAL2?</attrib-code>
+      <attrib-code index='0'>DRVAL1?</attrib-code>
+      <instruction>AC(NODTA);AP(PRTSUR01);LS(SOLD,2,CHGRD)</instruction>
+    </lookup>
+    <lookup name='DEPARE'>
+      <type>Area</type><disp-prio>Group 1</disp-prio><table-name>Plain</table-name>
+      <instruction>CS(DEPARE01)</instruction>
+    </lookup>
+    <lookup name='BOYLAT'>
+      <type>Point</type><disp-prio>Point Symbol 4</disp-prio><table-name>Simplified</table-name>
+      <instruction>SY(BOYLAT01)</instruction>
+    </lookup>
+    <lookup name='BOYLAT'>
+      <type>Point</type><disp-prio>Point Symbol 4</disp-prio><table-name>Simplified</table-name>
+      <attrib-code index='0'>CATLAM1</attrib-code>
+      <attrib-code index='1'>COLOUR3,4</attrib-code>
+      <instruction>SY(BOYLAT13);TE('No %s','OBJNAM',2,1,2,'15110',0,0,CHBLK,21)</instruction>
+    </lookup>
+    <lookup name='LNDARE'>
+      <type>Point</type><table-name>Simplified</table-name>
+      <instruction>SY(LNDARE01);CS(QUAPOS01;TX(OBJNAM,1,2,3,'15118',-1,-1,CHBLK,26))</instruction>
+    </lookup>
+  </lookups>
+</root>
+"""
+
+
+def test_parse_instruction_and_predicates() -> None:
+    assert parse_instruction("LS(SOLD,2,CHGRD);TX('a,b',1)") == [
+        ("LS", ("SOLD", "2", "CHGRD")),
+        ("TX", ("a,b", "1")),
+    ]
+    assert parse_instruction("CS(QUAPOS01;SY(X))") == [("CS", ("QUAPOS01",)), ("SY", ("X",))]
+    assert parse_predicate("DRVAL1?") == ("DRVAL1", None)
+    assert parse_predicate("CATLAM1") == ("CATLAM", ("1",))
+
+
+def test_rule_table_roundtrip(tmp_path: Path) -> None:
+    path = s52_ruletable.write(ET.fromstring(XML), tmp_path / "s52rules.bin")
+    payload = s52_ruletable.load(path)
+    assert payload["colors"] == {"DEPVS": "#010203"}
+    table = RuleTable(payload["rules"])
+    assert len(table) == 5
+
+    assert table.portrayal("DEPARE", {}, "Polygon") == {
+        "areaColor": "NODTA",
+        "areaPattern": "PRTSUR01",
+        "lineStyle": "SOLD,2,CHGRD",
+        "dispPrio": 1,
+    }
+    assert table.portrayal("DEPARE", {"DRVAL1": 2.0}, "Polygon") == {"csProc": "DEPARE01", "dispPrio": 1}
+    assert table.portrayal("BOYLAT", {"CATLAM": 1, "COLOUR": "3,4"}, "Point")["symbol"] == "BOYLAT13"
+    assert table.portrayal("BOYLAT", {"CATLAM": "1.0", "COLOUR": [3, 4]})["textFormat"] == "No %s"
+    assert table.portrayal("BOYLAT", {"CATLAM": 2}, "Point") == {"symbol": "BOYLAT01", "dispPrio": 4}
+    assert table.portrayal("LNDARE", {}, "Point") == {
+        "symbol": "LNDARE01",
+        "csProc": "QUAPOS01",
+        "textAttr": "OBJNAM",
+    }
+    assert table.portrayal("UNKNOWN", {}) == {}
+    assert s52_ruletable.load(tmp_path / "missing.bin") is None
+
+    root = ET.fromstring(XML)
+    rules = s52_ruletable.compile_lookups(s52_ruletable.parse_lookups(root))
+    assert s52_ruletable.digest(payload["rules"], payload["colors"]) == s52_ruletable.digest(
+        rules, {"DEPVS": "#010203"}
+    )
+    assert s52_ruletable.digest(payload["rules"], {}) != s52_ruletable.digest(rules, payload["colors"])
+
+
+def test_classifier_portrayal() -> None:
+    table = RuleTable.from_root(ET.fromstring(XML))
+    clf = S52PreClassifier(10.0, {}, rules=table)
+    assert clf.portray("DEPARE", {"DRVAL1": 3}, "Polygon")["csProc"] == "DEPARE01"
+    assert S52PreClassifier(10.0, {}).portray("DEPARE", {}) == {}
+
+
+def test_build_writes_rule_table(tmp_path: Path) -> None:
+    (tmp_path / "chartsymbols.xml").write_text(XML)
+    (tmp_path / "rastersymbols-day.png").write_bytes(b"")
+    build = ROOT / "server-styling" / "build_style_json.py"
+    subprocess.check_call(
+        [sys.executable, str(build), "--assets", str(tmp_path), "--output", str(tmp_path / "out" / "style.json")]
+    )
+    payload = s52_ruletable.load(tmp_path / "out" / "assets" / "s52" / "s52rules.bin")
+    assert set(payload["rules"]) == {"DEPARE", "BOYLAT", "LNDARE"}
@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+
+def _build_style(tmp_path: Path, *extra: str) -> dict:
+    chartsymbols = tmp_path / "chartsymbols.xml"
+    chartsymbols.write_text(
+        """
+<root><color-table name='DAY_BRIGHT'>
+  <color name='DEPVS' r='1' g='1' b='1'/>
+  <color name='DEPDW' r='2' g='2' b='2'/>
+  <color name='DEPSC' r='3' g='3' b='3'/>
+</color-table></root>
+"""
+    )
+    (tmp_path / "rastersymbols-day.png").write_bytes(b"")
+    out = tmp_path / "style.json"
+    build = Path(__file__).resolve().parents[2] / "server-styling" / "build_style_json.py"
+    cmd = [
+        sys.executable,
+        str(build),
+        "--assets",
+        str(tmp_path),
+        "--safety-contour",
+        "10",
+        *extra,
+        "--output",
+        str(out),
+    ]
+    subprocess.check_call(cmd)
+    return json.loads(out.read_text())
+
+
+def test_agnostic_style_uses_global_state(tmp_path: Path) -> None:
+    style = _build_style(tmp_path, "--mariner-agnostic", "--global-state")
+    assert style["state"] == {"safetyContour": {"default": 10.0}}
+    layers = {lyr["id"]: lyr for lyr in style["layers"]}
+    state = ["global-state", "safetyContour"]
+    assert state in layers["DEPARE-shallow"]["filter"][2]
+    safety = json.dumps(layers["DEPCNT-safety"]["filter"])
+    assert "cntPrev" in safety and "cntNext" in safety
+    assert json.dumps(state) in json.dumps(layers["SOUNDG"]["paint"]["text-color"])
+    assert json.dumps(state) in json.dumps(layers["udw-hazards"]["layout"]["icon-image"])
+
+
+def test_agnostic_style_without_global_state(tmp_path: Path) -> None:
+    # The default agnostic style runs on maplibre-gl releases without global-state.
+    style = _build_style(tmp_path, "--mariner-agnostic")
+    assert "state" not in style
+    assert "global-state" not in json.dumps(style)
+    layers = {lyr["id"]: lyr for lyr in style["layers"]}
+    assert "cntPrev" in json.dumps(layers["DEPCNT-safety"]["filter"])
+
+
+def test_agnostic_hazards_are_derived_from_soundings(tmp_path: Path) -> None:
+    style = _build_style(tmp_path, "--mariner-agnostic")
+    hazard = next(lyr for lyr in style["layers"] if lyr["id"] == "udw-hazards")
+    icon = json.dumps(hazard["layout"]["icon-image"])
+    # the tiles carry no hazardIcon, so it is computed from VALSOU/WATLEV
+    assert "hazardIcon" not in icon
+    assert "VALSOU" in icon and "WATLEV" in icon
+    assert '["<", ["to-number", ["coalesce", ["get", "VALSOU"], 99999]], 10.0]' in icon
+
+
+def test_default_style_keeps_literal_safety(tmp_path: Path) -> None:
+    style = _build_style(tmp_path)
+    assert "state" not in style
+    safety = next(lyr for lyr in style["layers"] if lyr["id"] == "DEPCNT-safety")
+    assert safety["filter"][2] == ["==", ["to-number", ["get", "VALDCO"]], 10.0]
@@ -0,0 +1,52 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "server-styling"))
+from build_style_json import MVT_LAYERS_SCHEMA, split_source_layers
+
+
+def _build_style(tmp_path: Path, *extra: str) -> dict:
+    (tmp_path / "chartsymbols.xml").write_text(
+        "<root><color-table name='DAY_BRIGHT'><color name='DEPDW' r='2' g='2' b='2'/></color-table></root>"
+    )
+    (tmp_path / "rastersymbols-day.png").write_bytes(b"")
+    out = tmp_path / "style.json"
+    build = ROOT / "server-styling" / "build_style_json.py"
+    cmd = [sys.executable, str(build), "--assets", str(tmp_path), *extra, "--output", str(out)]
+    subprocess.check_call(cmd)
+    return json.loads(out.read_text())
+
+
+def test_split_layers_follow_schema(tmp_path: Path) -> None:
+    single = _build_style(tmp_path)
+    style = _build_style(tmp_path, "--split-layers")
+    layers = {lyr["id"]: lyr for lyr in style["layers"]}
+    names = {entry["name"] for entry in json.loads(MVT_LAYERS_SCHEMA.read_text())["layers"]}
+    assert {lyr["source-layer"] for lyr in style["layers"] if "source-layer" in lyr} <= names
+    assert layers["SOUNDG"]["source-layer"] == "soundings"
+    assert layers["LNDARE"]["source-layer"] == "areas"
+    assert layers["DEPCNT-base"]["source-layer"] == "lines"
+    assert layers["DEPCNT-base-areas"]["source-layer"] == "areas"
+    # Every single-layer style layer survives with its id.
+    assert {lyr["id"] for lyr in single["layers"]} <= set(layers)
+
+
+def test_label_and_unknown_filters() -> None:
+    schema = {
+        "layers": [
+            {"name": "soundings", "objects": ["SOUNDG"], "style": ["symbol"]},
+            {"name": "labels", "property": "text", "style": ["symbol"]},
+            {"name": "points", "geometry": ["Point"], "style": ["symbol", "circle"]},
+        ]
+    }
+    layers = [
+        {"id": "lights", "type": "symbol", "source-layer": "features", "layout": {"text-field": ["get", "text"]}},
+        {"id": "names", "type": "symbol", "source-layer": "features", "filter": ["has", "OBJNAM"]},
+        {"id": "snd", "type": "symbol", "source-layer": "features", "filter": ["all", ["in", ["get", "OBJL"], ["literal", ["SOUNDG"]]]]},
+        {"id": "bg", "type": "background"},
+    ]
+    out = {lyr["id"]: lyr.get("source-layer") for lyr in split_source_layers(layers, schema)}
+    assert out == {"lights": "labels", "names": "points", "snd": "soundings", "bg": None}